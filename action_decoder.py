@@ -0,0 +1,266 @@
+"""
+Streaming decoder for the inference.py JSON action protocol
+The model answers {"actions": [{"function": ..., "args": [...]}, ...]}.
+Instead of waiting for the whole reply, the text deltas are scanned as
+they arrive and each action object is emitted as soon as its closing
+brace is read: assistantSpeaking can go to TTS and navigateToPage fire
+while the rest of the list is still being generated.
+Tolerated: text or ```json fences around the JSON, a bare list or a
+single action object, # and // comments and {{ }} (the prompt's example
+has them), trailing commas, raw newlines in strings. An object that still
+does not parse is skipped; one cut off by the end of the stream is
+closed and emitted with partial=True.
+    async for action in stream_actions(stream):
+        HANDLERS[action.function](*action.args)
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("action-decoder")
+
+ACTIONS_KEY = re.compile(r'"actions"\s*:\s*$')
+
+
+class Action:
+    __slots__ = ("function", "args", "index", "partial", "at")
+
+    def __init__(self, function: str, args: List[Any], index: int):
+        self.function = function
+        self.args = args
+        self.index = index
+        self.partial = False
+        self.at = 0.0  # seconds from the decoder's start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"function": self.function, "args": self.args}
+
+    def __repr__(self):
+        return f"Action({self.function}, {self.args!r})"
+
+
+def _repair(text: str) -> str:
+    """Drop comments and trailing commas outside strings"""
+    out: List[str] = []
+    in_string = escape = comment = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if comment:
+            if ch == "\n":
+                comment = False
+                out.append(ch)
+        elif in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch == "#" or text.startswith("//", i):
+            comment = True
+        elif ch in "}]":
+            # ", }" -> " }"
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def loads_lenient(text: str) -> Optional[Any]:
+    """json.loads, then again after _repair; None if both fail"""
+    candidates = [text, _repair(text)]
+    if text.startswith("{{") and text.endswith("}}"):
+        # The prompt's template braces, copied as is
+        candidates.append(_repair(text[1:-1]))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate, strict=False)
+        except ValueError:
+            continue
+    return None
+
+
+class ActionDecoder:
+    """Incremental scanner over the streamed reply text"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._comment = False
+        self._list_depth: Optional[int] = None  # stack size in the list
+        self._action_start: Optional[int] = None
+        self._top_start: Optional[int] = None
+        self._top_emitted = 0  # actions emitted inside the top object
+
+        # Stats
+        self.actions = 0
+        self.malformed = 0
+        self.salvaged = 0
+        self.first_action: Optional[float] = None
+        self.done: Optional[float] = None
+
+    def feed(self, fragment: str) -> List[Action]:
+        """Scan a text delta, return the actions it completed"""
+        self._text += fragment
+        ready: List[Action] = []
+        stack = self._stack
+        for pos in range(self._pos, len(self._text)):
+            ch = self._text[pos]
+            if self._comment:
+                self._comment = ch != "\n"
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "#" or (ch == "/" and self._text.startswith("//", pos)):
+                self._comment = True
+            elif ch == "[":
+                if self._list_depth is None and (
+                    len(stack) <= 1
+                    or ACTIONS_KEY.search(self._text[max(0, pos - 40) : pos])
+                ):
+                    # {"actions": [ or a bare [
+                    self._list_depth = len(stack) + 1
+                stack.append(ch)
+            elif ch == "{":
+                if not stack:
+                    self._top_start = pos
+                    self._top_emitted = 0
+                elif (
+                    self._action_start is None
+                    and len(stack) == self._list_depth
+                    and stack[-1] == "["
+                ):
+                    self._action_start = pos
+                stack.append(ch)
+            elif ch in "}]":
+                if stack:
+                    stack.pop()
+                if ch == "]" and len(stack) < (self._list_depth or 0):
+                    self._list_depth = None
+                elif ch == "}":
+                    self._close_object(pos, ready)
+        self._pos = len(self._text)
+        return ready
+
+    def _close_object(self, pos: int, ready: List[Action]):
+        stack = self._stack
+        if self._action_start is not None and len(stack) == self._list_depth:
+            text = self._text[self._action_start : pos + 1]
+            self._action_start = None
+            self._emit(loads_lenient(text), ready)
+            self._top_emitted += 1
+        elif not stack and self._top_start is not None:
+            # A single action object without the list around it
+            text = self._text[self._top_start : pos + 1]
+            self._top_start = None
+            if self._top_emitted == 0:
+                value = loads_lenient(text)
+                if isinstance(value, dict) and "function" in value:
+                    self._emit(value, ready)
+
+    def _emit(self, value: Any, ready: List[Action], partial=False):
+        if not isinstance(value, dict) or not isinstance(
+            value.get("function"), str
+        ):
+            self.malformed += 1
+            logger.warning("skipping malformed action: %r", value)
+            return
+        args = value.get("args", [])
+        if not isinstance(args, list):
+            args = [] if args is None else [args]
+        action = Action(value["function"], args, self.actions)
+        action.partial = partial
+        action.at = time.perf_counter() - self.start
+        if self.first_action is None:
+            self.first_action = action.at
+        self.actions += 1
+        ready.append(action)
+
+    def finish(self) -> List[Action]:
+        """End of stream: salvage an action cut off mid-object"""
+        self.done = time.perf_counter() - self.start
+        ready: List[Action] = []
+        if self._action_start is None:
+            return ready
+        text = self._text[self._action_start :]
+        if self._in_string:
+            text += '"'
+        # Close what the action opened, innermost first
+        depth = self._list_depth or 0
+        text += "".join(
+            "}" if ch == "{" else "]" for ch in reversed(self._stack[depth:])
+        )
+        self._action_start = None
+        value = loads_lenient(text)
+        if isinstance(value, dict) and "function" in value:
+            self.salvaged += 1
+            self._emit(value, ready, partial=True)
+        else:
+            self.malformed += 1
+        return ready
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "actions": self.actions,
+            "malformed": self.malformed,
+            "salvaged": self.salvaged,
+            "chars": len(self._text),
+            "first_action_ms": (self.first_action or 0.0) * 1000,
+            "done_ms": (self.done or 0.0) * 1000,
+        }
+
+
+def _delta_text(chunk) -> Optional[str]:
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+async def stream_actions(
+    stream, decoder: Optional[ActionDecoder] = None
+) -> AsyncIterator[Action]:
+    """Actions from an async SDK stream, as soon as each is complete"""
+    decoder = decoder or ActionDecoder()
+    async for chunk in stream:
+        text = _delta_text(chunk)
+        if text:
+            for action in decoder.feed(text):
+                yield action
+    for action in decoder.finish():
+        yield action
+
+
+def iter_actions(
+    stream, decoder: Optional[ActionDecoder] = None
+) -> Iterator[Action]:
+    """Same for a sync SDK stream (Groq(), OpenAI())"""
+    decoder = decoder or ActionDecoder()
+    for chunk in stream:
+        text = _delta_text(chunk)
+        if text:
+            yield from decoder.feed(text)
+    yield from decoder.finish()
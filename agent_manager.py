@@ -0,0 +1,308 @@
+"""
+AMNGR: dispatches turns to the per-application agents (MULTIAGENT)
+auto_gen.py builds a model client, a router and the sub-agents on every
+run, and every task goes through the router first. Here:
+  - one model client (one connection pool) for every agent
+  - agents are built once per application page and kept warm in pools,
+    a session takes one on first use and gives it back, reset, on close
+  - routing decisions are cached per normalized utterance, so repeated
+    commands skip the router LLM
+  - a _ultdir_ turn goes straight to the active page's agent, the page
+    the client reported on the "text" channel ({"type": "context"}).
+    Pages picked by the router or the cache are kept apart: they say
+    which agent answered, not what is on screen
+Install (AutoGen agents): pip install autogen-agentchat "autogen-ext[openai]"
+"""
+
+import logging
+import re
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from turn_tracing import SpanHistogram
+
+logger = logging.getLogger("agent-manager")
+
+# Application pages and what their agent is told
+PAGES = {
+    "chat": "Tu gères la messagerie : créer un chat, envoyer un message.",
+    "scribe": "Tu prends des notes et mets en forme ce que l'on te dicte.",
+    "trad": "Tu traduis les textes qu'on te donne.",
+    "recap": "Tu résumes les réunions et les conversations.",
+    "docs": "Tu cherches et ouvres les documents de l'utilisateur.",
+}
+ROUTER = "router"
+ROUTER_PROMPT = (
+    "Tu es le routeur d'une application vocale. Réponds uniquement par le "
+    "nom de l'application qui doit traiter la demande, parmi : {pages}."
+)
+
+
+def normalize(text: str) -> str:
+    """Routing cache key: case, punctuation and numbers do not matter"""
+    text = re.sub(r"\d+", "#", text.lower())
+    return " ".join(re.sub(r"[^\w#' ]+", " ", text).split())
+
+
+class AutoGenAgent:
+    """The agent interface AgentManager uses, over an AutoGen agent"""
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    async def run(self, text: str) -> str:
+        result = await self.agent.run(task=text)
+        return str(result.messages[-1].content)
+
+    async def reset(self):
+        from autogen_core import CancellationToken
+
+        await self.agent.on_reset(CancellationToken())
+
+
+def autogen_factory(model: str = "gpt-4.1", **client_kwargs):
+    """
+    factory(name, system_message) building AssistantAgents on one client.
+    AutoGen is imported and the client built with the first agent.
+    """
+    model_client = []
+    built = Counter()
+
+    def factory(name: str, system_message: str) -> AutoGenAgent:
+        from autogen_agentchat.agents import AssistantAgent
+
+        if not model_client:
+            from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+            model_client.append(
+                OpenAIChatCompletionClient(model=model, **client_kwargs)
+            )
+        built[name] += 1
+        return AutoGenAgent(
+            AssistantAgent(
+                f"{name}_{built[name]}",
+                model_client=model_client[0],
+                system_message=system_message,
+                description=name,
+                model_client_stream=True,
+            )
+        )
+
+    return factory
+
+
+class RoutingCache:
+    """LRU of normalized utterance -> page, entries expire after ttl"""
+
+    def __init__(self, size: int = 1024, ttl: float = 600.0):
+        self.size = size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, page: str):
+        self.entries[key] = (page, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class AgentPool:
+    """Warm instances of one agent, reset and reused across sessions"""
+
+    def __init__(self, factory: Callable, name: str, system_message: str):
+        self.factory = factory
+        self.name = name
+        self.system_message = system_message
+        self.spares: Deque = deque()
+        self.built = 0
+
+    def fill(self, n: int):
+        while len(self.spares) < n:
+            self.spares.append(self._build())
+
+    def _build(self):
+        self.built += 1
+        return self.factory(self.name, self.system_message)
+
+    def acquire(self):
+        return self.spares.popleft() if self.spares else self._build()
+
+    async def release(self, agent):
+        await agent.reset()
+        self.spares.append(agent)
+
+
+class AgentManager:
+    def __init__(
+        self,
+        factory: Callable,
+        pages: Dict[str, str] = PAGES,
+        default_page: str = "chat",
+        spares: int = 2,
+        cache_size: int = 1024,
+        cache_ttl: float = 600.0,
+    ):
+        self.pages = pages
+        self.default_page = default_page
+        self.spares = spares
+        self.pools = {
+            page: AgentPool(factory, page, system_message)
+            for page, system_message in pages.items()
+        }
+        self.router = AgentPool(
+            factory, ROUTER, ROUTER_PROMPT.format(pages=", ".join(pages))
+        )
+        self.cache = RoutingCache(cache_size, cache_ttl)
+        self.active: Dict[Any, str] = {}  # session -> page on screen
+        self.routed: Dict[Any, str] = {}  # session -> last routed page
+        self.agents: Dict[Any, Dict[str, Any]] = {}  # session -> page -> agent
+
+        # Stats
+        self.routes: Counter = Counter()  # direct / cache / router
+        self.router_latency = SpanHistogram()
+        self.dispatch_latency: Dict[str, SpanHistogram] = {
+            how: SpanHistogram() for how in ("direct", "cache", "router")
+        }
+
+    def start(self):
+        """Build the agents up front, before the first turn needs them"""
+        for pool in self.pools.values():
+            pool.fill(self.spares)
+        self.router.fill(self.spares)
+
+    def context_update(self, session, payload: Dict[str, Any]):
+        """The client's {"type": "context", "action": "update"} payload"""
+        page = payload.get("current_page")
+        if page in self.pages:
+            self.active[session] = page
+
+    def page(self, session) -> str:
+        return self.active.get(session, self.default_page)
+
+    async def route(
+        self, session, text: str, decision: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """(page, how): direct for _ultdir_, else cached or asked"""
+        start = time.perf_counter()
+        if decision == "_ultdir_":
+            how, page = "direct", self.page(session)
+        else:
+            key = normalize(text)
+            page = self.cache.get(key)
+            how = "cache"
+            if page is None:
+                how = "router"
+                page = await self._ask_router(text)
+                self.cache.put(key, page)
+        self.routed[session] = page
+        self.routes[how] += 1
+        self.dispatch_latency[how].observe(time.perf_counter() - start)
+        return page, how
+
+    async def _ask_router(self, text: str) -> str:
+        agent = self.router.acquire()
+        start = time.perf_counter()
+        try:
+            answer = (await agent.run(text)).lower()
+        finally:
+            self.router_latency.observe(time.perf_counter() - start)
+            await self.router.release(agent)
+        for page in self.pages:
+            if page in answer:
+                return page
+        return self.default_page
+
+    def agent(self, session, page: str):
+        agents = self.agents.setdefault(session, {})
+        if page not in agents:
+            agents[page] = self.pools[page].acquire()
+        return agents[page]
+
+    async def run(self, session, page: str, text: str) -> str:
+        return await self.agent(session, page).run(text)
+
+    async def forget(self, session):
+        """Session closed: its agents go back to the pools"""
+        self.active.pop(session, None)
+        self.routed.pop(session, None)
+        for page, agent in self.agents.pop(session, {}).items():
+            await self.pools[page].release(agent)
+
+    async def handle(self, turn: Dict[str, Any], ctx=None) -> Dict[str, Any]:
+        """pipeline_graph handler for AMNGR"""
+        page, how = await self.route(
+            ctx.scope, turn["text"], turn.get("decision")
+        )
+        return dict(turn, page=page, routed=how)
+
+    async def run_turn(self, turn: Dict[str, Any], ctx=None) -> Dict[str, Any]:
+        """pipeline_graph handler for MULTIAGENT"""
+        reply = await self.run(ctx.scope, turn["page"], turn["text"])
+        return dict(turn, reply=reply)
+
+    def attach(self, graph, concurrency: int = 64):
+        graph.set_handler(
+            "AMNGR",
+            self.handle,
+            router=lambda turn: "MULTIAGENT",
+            concurrency=concurrency,
+        )
+        # UI commands act on the client, the rest is spoken
+        return graph.set_handler(
+            "MULTIAGENT",
+            self.run_turn,
+            router=lambda turn: (
+                "VOICE CLIENT" if turn["routed"] == "direct" else "TTS Manager"
+            ),
+            concurrency=concurrency,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        hop = (
+            self.router_latency.total / self.router_latency.count
+            if self.router_latency.count
+            else 0.0
+        )
+        skipped = self.routes["direct"] + self.routes["cache"]
+        return {
+            "routes": dict(self.routes),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "router_hop_mean_ms": hop * 1000,
+            "router_hops_skipped": skipped,
+            "router_time_saved_s": skipped * hop,
+            "agents_built": {
+                name: pool.built
+                for name, pool in [*self.pools.items(), (ROUTER, self.router)]
+            },
+            "dispatch_ms": {
+                how: {q: v * 1000 for q, v in h.quantiles().items()}
+                for how, h in self.dispatch_latency.items()
+                if h.count
+            },
+        }
+
+
+def load_agent_manager(**kwargs) -> Optional[AgentManager]:
+    """
+    AgentManager on AutoGen agents, None without AutoGen. Nothing is
+    built yet: each page's agent on its first turn (start() prebuilds)
+    """
+    import importlib.util
+
+    if importlib.util.find_spec("autogen_agentchat") is None:
+        logger.warning("AutoGen not installed, no page agents")
+        return None
+    return AgentManager(autogen_factory(), **kwargs)
@@ -0,0 +1,269 @@
+"""
+WebRTC audio ingest shared by the voice servers and the offline bench
+processor.js sends mono audio over the "audio" data channel, either
+  - float32 render quanta (legacy pages), converted to PCM16, or
+  - with the "pcm16-frames" channel protocol, 20 ms int16 frames behind a
+    12-byte header (seq, capture ms, sample rate, samples), whose payload
+    goes to the recognizer as-is when the rate already matches.
+Audio is pushed to the Azure PushAudioInputStream (or any object with
+write(), like vad.VADGate) at the recognizer rate, which is negotiated
+per STT backend (negotiate_sample_rate) and sent back in the /offer
+answer so the worklet captures at that rate and nothing is resampled.
+Anything else is resampled once, with filter state kept across chunks.
+"""
+
+import logging
+import os
+import struct
+from math import gcd
+from typing import Dict, Sequence
+
+import numpy as np
+
+from log_setup import log_sampled
+from turn_tracing import AudioClock
+
+logger = logging.getLogger("audio-ingest")
+
+TARGET_SR = 48000
+
+FRAME_PROTOCOL = "pcm16-frames"
+# seq, capture time ms, sample rate, samples (little-endian, processor.js)
+FRAME_HEADER = struct.Struct("<IIHH")
+
+# PCM rates each STT backend accepts, preferred first: the rate its speech
+# models run at, anything higher only costs upstream bandwidth.
+# ALMA_STT_SAMPLE_RATE_<BACKEND> (e.g. ALMA_STT_SAMPLE_RATE_AZURE) overrides.
+STT_SAMPLE_RATES: Dict[str, Sequence[int]] = {
+    "azure": (16000, 8000, 48000),
+    "openai-realtime": (24000,),  # conf.json audio/pcm
+    "fake": (16000, 48000),  # voice_stubs.FakeRecognizer
+}
+
+
+def negotiate_sample_rate(backend: str, source_sr: int = 48000) -> int:
+    """Recognizer rate for `backend`, never above what the source captures"""
+    accepted = STT_SAMPLE_RATES[backend]
+    override = os.getenv(
+        "ALMA_STT_SAMPLE_RATE_" + backend.upper().replace("-", "_")
+    )
+    if override:
+        if int(override) not in accepted:
+            raise ValueError(
+                f"{backend} does not accept {override} Hz, only {accepted}"
+            )
+        return int(override)
+    for rate in accepted:
+        if rate <= source_sr:
+            return rate
+    return min(accepted)
+
+
+def float32_to_pcm16_resampled(float32_bytes, input_sr, target_sr=TARGET_SR):
+    """
+    Convert raw float32 audio bytes (mono) into PCM16 at target sample rate.
+    """
+    # Interpret as float32
+    audio = np.frombuffer(float32_bytes, dtype=np.float32)
+
+    # Handle silence or NaN
+    if audio.size == 0:
+        return b""
+    audio = np.nan_to_num(audio)
+
+    # If sample rates differ, resample
+    if input_sr != target_sr:
+        from scipy.signal import resample_poly
+
+        audio = resample_poly(audio, target_sr, input_sr)
+
+    # Clip to [-1,1]
+    audio = np.clip(audio, -1.0, 1.0)
+
+    # Convert to PCM16
+    pcm16 = (audio * 32767).astype(np.int16)
+    return pcm16.tobytes()
+
+
+def lowpass_taps(numtaps: int, cutoff: float, window: np.ndarray):
+    """
+    Windowed-sinc low-pass, cutoff relative to Nyquist, unit DC gain
+    (scipy.signal.firwin, without importing scipy at server start)
+    """
+    n = np.arange(numtaps) - (numtaps - 1) / 2
+    taps = cutoff * np.sinc(cutoff * n) * window
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming resampler for mono float32 chunks. Filter state is kept
+    between chunks, so 128-sample quanta resample as one signal
+    (resample_poly per chunk restarts its filter at every boundary and
+    rounds each chunk's length). Small ratios (48k <-> 16k/24k) use an
+    exact polyphase FIR, others (44.1k) a low-pass then linear
+    interpolation.
+    """
+
+    # Above this, zero-stuffing for the polyphase path costs too much
+    MAX_UP = 8
+
+    def __init__(self, input_sr: int, target_sr: int):
+        g = gcd(input_sr, target_sr)
+        self.up, self.down = target_sr // g, input_sr // g
+        self.passthrough = self.up == self.down
+        self.polyphase = self.up <= self.MAX_UP
+        if self.passthrough:
+            return
+        if self.polyphase:
+            factor = max(self.up, self.down)
+            numtaps = 20 * factor + 1
+            self.taps = lowpass_taps(
+                numtaps, 1 / factor, np.kaiser(numtaps, 5.0)
+            ) * np.float32(self.up)
+            self.phase = 0  # index of the next output sample to keep
+        else:
+            cutoff = min(1.0, target_sr / input_sr)
+            self.taps = lowpass_taps(63, cutoff * 0.9, np.hamming(63))
+            self.step = input_sr / target_sr
+            self.prev = np.float32(0)
+            self.t = 1.0  # next output position, 0 being self.prev
+        # Last len(taps) - 1 input samples, the FIR state across chunks
+        self.history = np.zeros(len(self.taps) - 1, dtype=np.float32)
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        if self.passthrough or audio.size == 0:
+            return audio
+        if self.polyphase:
+            if self.up > 1:
+                stuffed = np.zeros(len(audio) * self.up, dtype=np.float32)
+                stuffed[:: self.up] = audio
+                audio = stuffed
+            buffer = np.concatenate((self.history, audio))
+            self.history = buffer[len(audio) :]
+            filtered = np.convolve(buffer, self.taps, "valid")
+            out = filtered[self.phase :: self.down]
+            self.phase = (self.phase - len(audio)) % self.down
+            return out
+
+        buffer = np.concatenate((self.history, audio))
+        self.history = buffer[len(audio) :]
+        filtered = np.convolve(buffer, self.taps, "valid")
+        signal = np.concatenate(([self.prev], filtered))
+        last = len(signal) - 1
+        positions = np.arange(self.t, last + 1e-9, self.step)
+        out = np.interp(positions, np.arange(len(signal)), signal)
+        self.t = positions[-1] if len(positions) else self.t - self.step
+        self.t += self.step - last
+        self.prev = signal[-1]
+        return out.astype(np.float32)
+
+
+def parse_frame_header(message):
+    """(seq, capture_ms, sample_rate, n_samples) of a pcm16 frame"""
+    return FRAME_HEADER.unpack_from(message)
+
+
+class AudioIngest:
+    """One peer's "audio" data channel feeding its recognizer"""
+
+    def __init__(
+        self,
+        push_stream,
+        input_sr: int = 48000,
+        target_sr: int = TARGET_SR,
+    ):
+        self.push_stream = push_stream
+        # Azure's PushAudioInputStream.write goes through ctypes and wants
+        # bytes; our writers (vad.VADGate) take a frame's memoryview
+        self.takes_views = getattr(push_stream, "takes_views", False)
+        self.input_sr = input_sr
+        self.target_sr = target_sr
+        # Maps recognizer offsets back to arrival times (turn_tracing)
+        self.clock = AudioClock(target_sr)
+        self.chunks = 0
+        self.bytes_in = 0
+        self._resamplers: Dict[int, Resampler] = {}
+        # pcm16 frames only
+        self.next_seq = None
+        self.frames_lost = 0
+        self.frames_late = 0
+        self.frames_resampled = 0
+
+    def resampler(self, input_sr: int) -> Resampler:
+        resampler = self._resamplers.get(input_sr)
+        if resampler is None:
+            resampler = Resampler(input_sr, self.target_sr)
+            self._resamplers[input_sr] = resampler
+        return resampler
+
+    def handler_for(self, channel):
+        """Data channel "message" handler matching the channel protocol"""
+        if getattr(channel, "protocol", "") == FRAME_PROTOCOL:
+            return self.on_frame
+        return self.on_message
+
+    def on_message(self, message):
+        """Data channel "message" handler"""
+        if not isinstance(message, bytes):
+            logger.warning("Received non-bytes message: %s", message)
+            return
+        if len(message) % 4 != 0:
+            logger.error(
+                "Received chunk length %d is not a whole number of float32 "
+                "samples, dropped",
+                len(message),
+            )
+            return
+
+        log_sampled(logger, "audio chunk", "%d bytes", len(message))
+        audio = np.nan_to_num(np.frombuffer(message, dtype=np.float32))
+        audio = self.resampler(self.input_sr).process(audio)
+        pcm16 = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        self.push(pcm16.tobytes(), len(message))
+
+    def on_frame(self, message):
+        """Data channel "message" handler for FRAME_PROTOCOL channels"""
+        if not isinstance(message, bytes) or len(message) < FRAME_HEADER.size:
+            logger.warning("Received malformed audio frame: %r", message[:16])
+            return
+        seq, _, sample_rate, n_samples = FRAME_HEADER.unpack_from(message)
+        if len(message) != FRAME_HEADER.size + 2 * n_samples:
+            logger.error(
+                "Frame %d announces %d samples but carries %d bytes, dropped",
+                seq,
+                n_samples,
+                len(message) - FRAME_HEADER.size,
+            )
+            return
+
+        if self.next_seq is not None and seq != self.next_seq:
+            gap = (seq - self.next_seq) & 0xFFFFFFFF
+            if gap & 0x80000000:
+                # Older than expected: already replaced by what followed
+                self.frames_late += 1
+                return
+            self.frames_lost += gap
+            log_sampled(logger, "frame gap", "%d frames lost", gap)
+        self.next_seq = (seq + 1) & 0xFFFFFFFF
+
+        # No copy of the payload, read in place
+        pcm_bytes = memoryview(message)[FRAME_HEADER.size :]
+        if sample_rate != self.target_sr:
+            # Client did not follow the negotiated rate (old page)
+            audio = np.frombuffer(pcm_bytes, dtype=np.int16) * (1 / 32768)
+            audio = self.resampler(sample_rate).process(audio)
+            pcm16 = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+            pcm_bytes = pcm16.tobytes()
+            self.frames_resampled += 1
+        self.push(pcm_bytes, len(message))
+
+    def push(self, pcm_bytes, n_received):
+        if isinstance(pcm_bytes, memoryview) and not self.takes_views:
+            pcm_bytes = pcm_bytes.tobytes()
+        forwarded = self.push_stream.write(pcm_bytes)
+        # A VAD gate returns what actually reached the recognizer, whose
+        # offsets only count that audio
+        self.clock.push(len(pcm_bytes) if forwarded is None else forwarded)
+        self.chunks += 1
+        self.bytes_in += n_received
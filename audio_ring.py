@@ -0,0 +1,208 @@
+"""
+Single-producer / single-consumer PCM ring buffer for thread handoff
+The samples live in one preallocated NumPy array (optionally over an
+mmap / shared memory buffer), the indices in a 4-slot uint64 header:
+  [0] write index, only stored by the producer
+  [1] read index,  only stored by the consumer
+  [2] flush requests, only stored by the producer side (barge-in)
+  [3] last write, monotonic ns, only stored by the producer
+Indices only grow (position = index % capacity), each side publishes its
+index after copying the samples, so no lock and no per-chunk allocation
+is needed. In-process the GIL orders the stores. Across processes (mmap)
+aligned 8-byte stores are atomic, but only x86 (TSO) keeps them in
+program order: ARM64 may make the index visible before the samples, and
+no barrier is issued here, so share a ring across processes on x86 only.
+A full ring drops what does not fit, or with write(block=True) makes
+the producer wait for the device: Azure synthesizes faster than real
+time, so TTS callbacks block, which is the SDK's backpressure.
+Producers that must not block (cached replies) hand their audio to a
+RingWriter, the ring's one producer thread.
+Used for Azure TTS PushAudioOutputStream callbacks -> sounddevice.
+"""
+
+import mmap
+import queue
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+HEADER_BYTES = 32  # four uint64 slots
+# A short read this soon after a write is starvation, not the end
+STARVED_WITHIN = 0.2
+
+
+class AudioRing:
+    def __init__(self, capacity: int, dtype=np.int16, buffer=None):
+        """
+        capacity: samples. buffer: optional writable buffer of at least
+        nbytes(capacity, dtype) bytes (mmap, SharedMemory.buf, ...)
+        """
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity, dtype))
+        self._index = np.ndarray((4,), dtype=np.uint64, buffer=buffer)
+        self._data = np.ndarray(
+            (capacity,), dtype=self.dtype, buffer=buffer, offset=HEADER_BYTES
+        )
+        self._flushed = int(self._index[2])  # consumer's copy
+        # Each counter is only written by one side
+        self.overruns = 0  # producer: samples dropped, ring full
+        self.underruns = 0  # consumer: ran dry while audio was coming
+        self.poll = 0.005  # producer's wait for space, seconds
+
+    @staticmethod
+    def nbytes(capacity: int, dtype=np.int16) -> int:
+        return HEADER_BYTES + capacity * np.dtype(dtype).itemsize
+
+    @classmethod
+    def anonymous_mmap(cls, capacity: int, dtype=np.int16) -> "AudioRing":
+        """Ring over an anonymous mmap, shared with fork()ed children"""
+        return cls(capacity, dtype, mmap.mmap(-1, cls.nbytes(capacity, dtype)))
+
+    def readable(self) -> int:
+        return int(self._index[0]) - int(self._index[1])
+
+    def writable(self) -> int:
+        return self.capacity - self.readable()
+
+    # --- producer side ---
+
+    def write(self, samples, block: bool = False, timeout: float = 2.0):
+        """
+        Copy samples in (bytes-like or array), returns how many went in.
+        When full, the rest is dropped, or with block=True written as the
+        consumer frees space: until a flush(), or `timeout` seconds
+        without any progress (no consumer)
+        """
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=self.dtype)
+        flushes = int(self._index[2])
+        done = self._copy_in(samples)
+        progress = time.monotonic()
+        while block and done < len(samples) and int(self._index[2]) == flushes:
+            time.sleep(self.poll)
+            n = self._copy_in(samples[done:])
+            now = time.monotonic()
+            if n:
+                done += n
+                progress = now
+            elif now - progress > timeout:
+                break
+        if done < len(samples):
+            self.overruns += len(samples) - done
+        return done
+
+    def _copy_in(self, samples: np.ndarray) -> int:
+        w = int(self._index[0])
+        n = min(len(samples), self.capacity - (w - int(self._index[1])))
+        start = w % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start : start + first] = samples[:first]
+        self._data[: n - first] = samples[first:n]
+        self._index[0] = w + n  # publish after the copy
+        self._index[3] = time.monotonic_ns()
+        return n
+
+    def flush(self):
+        """Ask the consumer to drop what is buffered (barge-in)"""
+        self._index[2] = int(self._index[2]) + 1
+
+    # --- consumer side ---
+
+    def read_into(self, out: np.ndarray, pad: bool = True) -> int:
+        """Fill `out` in place, returns samples read (rest zeroed if pad)"""
+        r = int(self._index[1])
+        w = int(self._index[0])
+        flushes = int(self._index[2])
+        if flushes != self._flushed:
+            self._flushed = flushes
+            r = w
+        n = min(len(out), w - r)
+        start = r % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start : start + first]
+        out[first:n] = self._data[: n - first]
+        self._index[1] = r + n  # publish after the copy
+        if n < len(out):
+            # Idle between replies is not an underrun: the producer
+            # wrote recently, so the rest of the reply was late
+            since = time.monotonic_ns() - int(self._index[3])
+            if since < STARVED_WITHIN * 1e9:
+                self.underruns += 1
+            if pad:
+                out[n:] = 0
+        return n
+
+
+class RingWriter:
+    """
+    The single producer of an AudioRing, for audio that arrives from
+    several threads or must not block its caller: write() queues, one
+    daemon thread does the blocking AudioRing.write, in order
+    """
+
+    def __init__(self, ring: AudioRing):
+        self.ring = ring
+        self._queue: "queue.Queue" = queue.Queue()
+        self._generation = 0  # bumped by flush(), stale audio is skipped
+        self._thread = threading.Thread(
+            target=self._run, name="ring-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, samples):
+        self._queue.put((self._generation, samples))
+
+    def flush(self):
+        """Drop the queued audio and what the ring buffered (barge-in)"""
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self.ring.flush()
+
+    def _run(self):
+        while True:
+            generation, samples = self._queue.get()
+            if generation == self._generation:
+                self.ring.write(samples, block=True)
+
+
+class RingPlayer:
+    """
+    Plays an AudioRing on the default output device: the PortAudio
+    callback thread is the ring's consumer. Install: pip install sounddevice
+    """
+
+    def __init__(
+        self,
+        ring: AudioRing,
+        sample_rate: int,
+        blocksize: Optional[int] = None,
+    ):
+        import sounddevice as sd
+
+        self.ring = ring
+        self.stream = sd.OutputStream(
+            samplerate=sample_rate,
+            channels=1,
+            dtype=ring.dtype.name,
+            blocksize=blocksize or sample_rate // 100,  # 10 ms
+            callback=self._callback,
+        )
+
+    def _callback(self, outdata, frames, time_info, status):
+        self.ring.read_into(outdata[:, 0])
+
+    def start(self):
+        self.stream.start()
+        return self
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
@@ -0,0 +1,258 @@
+"""
+Local barge-in detection while TTS is playing
+Watches mic energy frame by frame, and once it has stayed above what the
+TTS echo explains for min_frames (120 ms, longer than a cough or a
+click), pauses playback, without a recognizer round trip.
+The STT partial then settles it:
+  - partial with text within confirm_timeout  -> confirmed, reply dropped
+  - no partial (cough, door, echo burst)      -> reverted, playback resumes
+Echo-aware threshold while playing:
+  max(noise floor + snr_db, TTS reference level + coupling + echo_margin_db)
+where the coupling (mic dB - reference dB) is learned during playback,
+freely in the first warmup_ms of a reply, when the detector is not armed.
+Like vad.VADGate it is a pass-through writer for the push stream chain:
+  AudioIngest -> BargeInDetector -> VADGate -> PushAudioInputStream
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("barge-in")
+
+IDLE, PENDING, CONFIRMED, REVERTED = "idle", "pending", "confirmed", "reverted"
+
+
+def frame_db(frames: np.ndarray) -> np.ndarray:
+    """Energy in dBFS of each row of int16 frames"""
+    x = frames.astype(np.float32) * (1 / 32768)
+    energy = np.einsum("ij,ij->i", x, x) / frames.shape[1]
+    return 10 * np.log10(energy + 1e-10)
+
+
+class BargeInDetector:
+    @property
+    def takes_views(self) -> bool:
+        """Frames are passed through: as long as downstream takes them"""
+        return getattr(self.downstream, "takes_views", False)
+
+    def __init__(
+        self,
+        downstream,
+        sample_rate: int,
+        frame_ms: int = 20,
+        snr_db: float = 12.0,
+        echo_margin_db: float = 8.0,
+        coupling_db: float = -15.0,
+        echo_window_ms: int = 300,
+        confirm_timeout: float = 0.8,
+        min_frames: int = 6,  # 120 ms loud in a row: longer than a cough
+        warmup_ms: int = 200,
+        reference_sr: Optional[int] = None,
+    ):
+        self.downstream = downstream
+        self.frame_len = sample_rate * frame_ms // 1000
+        # TTS output can run at another rate than the mic
+        self.reference_len = (reference_sr or sample_rate) * frame_ms // 1000
+        self.frame_seconds = frame_ms / 1000
+        self.snr_db = snr_db
+        self.echo_margin_db = echo_margin_db
+        self.coupling_db = coupling_db
+        self.echo_window = echo_window_ms / 1000
+        self.confirm_timeout = confirm_timeout
+        self.min_frames = min_frames
+        self.warmup = warmup_ms / 1000
+
+        self.noise_db = -60.0
+        # Playback end estimate, TTS chunks play back to back
+        self._play_until = 0.0
+        self._armed_at = 0.0
+        # (time, dB) of recent TTS output frames, the echo reference
+        self._reference: Deque[Tuple[float, float]] = deque()
+        self._pending = bytearray()
+        self._loud_run = 0
+        self._lock = threading.Lock()
+
+        self.state = IDLE
+        self.triggered_at: Optional[float] = None
+
+        self.pause_callbacks: List[Callable[[], None]] = []
+        self.confirm_callbacks: List[Callable[[], None]] = []
+        self.revert_callbacks: List[Callable[[], None]] = []
+
+        # Stats
+        self.triggers = 0
+        self.confirmed = 0
+        self.reverted = 0
+        self.cpu_seconds = 0.0
+
+    def on_pause(self, callback: Callable[[], None]):
+        self.pause_callbacks.append(callback)
+        return callback
+
+    def on_confirm(self, callback: Callable[[], None]):
+        self.confirm_callbacks.append(callback)
+        return callback
+
+    def on_revert(self, callback: Callable[[], None]):
+        self.revert_callbacks.append(callback)
+        return callback
+
+    # --- TTS side (may be called from the synthesizer's thread) ---
+
+    @property
+    def playing(self) -> bool:
+        # The room keeps echoing for a moment after the last frame played
+        return time.monotonic() < self._play_until + self.echo_window
+
+    def tts_audio(self, pcm_bytes: bytes):
+        """Audio queued for playback, used as the echo reference"""
+        samples = np.frombuffer(pcm_bytes, dtype=np.int16)
+        n_frames = len(samples) // self.reference_len
+        if not n_frames:
+            return
+        db = frame_db(
+            samples[: n_frames * self.reference_len].reshape(n_frames, -1)
+        )
+        with self._lock:
+            now = time.monotonic()
+            if not self.playing:
+                # New reply: learn its echo before listening for the user
+                self._armed_at = now + self.warmup
+            start = max(now, self._play_until)
+            for i, value in enumerate(db):
+                self._reference.append(
+                    (start + i * self.frame_seconds, float(value))
+                )
+            self._play_until = start + n_frames * self.frame_seconds
+
+    def tts_stopped(self):
+        """Playback was cut (barge-in, cancelled reply)"""
+        with self._lock:
+            self._play_until = 0.0
+            self._reference.clear()
+
+    def echo_db(self, now: float) -> Optional[float]:
+        """Loudest reference frame that can still be echoing at `now`"""
+        with self._lock:
+            while self._reference and self._reference[0][0] < (
+                now - self.echo_window
+            ):
+                self._reference.popleft()
+            levels = [db for t, db in self._reference if t <= now]
+        return max(levels) if levels else None
+
+    # --- STT side ---
+
+    def on_partial(self, text: str):
+        """Recognizer partial: confirms a pending barge-in"""
+        if not text.strip():
+            return
+        if self.state == PENDING:
+            self._settle(CONFIRMED)
+        elif self.playing:
+            # Missed by the energy detector (quiet speaker), today's path
+            self.state = PENDING
+            self.triggered_at = time.monotonic()
+            self._notify(self.pause_callbacks)
+            self._settle(CONFIRMED)
+
+    # --- mic side ---
+
+    def write(self, pcm_bytes: bytes):
+        start = time.perf_counter()
+        self._pending += pcm_bytes
+        frame_bytes = 2 * self.frame_len
+        n_frames = len(self._pending) // frame_bytes
+        if n_frames:
+            frames = np.frombuffer(
+                bytes(self._pending[: n_frames * frame_bytes]),
+                dtype=np.int16,
+            ).reshape(n_frames, -1)
+            del self._pending[: n_frames * frame_bytes]
+            now = time.monotonic()
+            echo = self.echo_db(now) if self.playing else None
+            for db in frame_db(frames):
+                self._step(float(db), echo, now)
+            if (
+                self.state == PENDING
+                and now - self.triggered_at > self.confirm_timeout
+            ):
+                self._settle(REVERTED)
+        self.cpu_seconds += time.perf_counter() - start
+        return self.downstream.write(pcm_bytes)
+
+    def threshold_db(self, echo: Optional[float]) -> float:
+        threshold = self.noise_db + self.snr_db
+        if echo is not None:
+            threshold = max(
+                threshold, echo + self.coupling_db + self.echo_margin_db
+            )
+        return threshold
+
+    def _step(self, db: float, echo: Optional[float], now: float):
+        if echo is not None and now < self._armed_at:
+            if db > self.noise_db + self.snr_db:
+                self.coupling_db += 0.3 * (db - echo - self.coupling_db)
+                self.coupling_db = min(0.0, max(-40.0, self.coupling_db))
+            return
+
+        loud = db > self.threshold_db(echo)
+        if not loud:
+            self._loud_run = 0
+            if echo is None:
+                # Noise floor: fast down, slow up
+                if db < self.noise_db:
+                    self.noise_db = db
+                else:
+                    self.noise_db += 0.05 * (db - self.noise_db)
+            elif db > self.noise_db + self.snr_db:
+                # Clearly echo: learn how much of the TTS reaches the mic
+                self.coupling_db += 0.1 * (db - echo - self.coupling_db)
+                self.coupling_db = min(0.0, max(-40.0, self.coupling_db))
+            return
+
+        self._loud_run += 1
+        if (
+            self.playing
+            and self.state != PENDING
+            and self._loud_run >= self.min_frames
+        ):
+            self.state = PENDING
+            self.triggered_at = time.monotonic()
+            self.triggers += 1
+            logger.debug(
+                "barge-in pending: mic %.1f dB, threshold %.1f dB",
+                db,
+                self.threshold_db(echo),
+            )
+            self._notify(self.pause_callbacks)
+
+    def _settle(self, state: str):
+        self.state = state
+        if state == CONFIRMED:
+            self.confirmed += 1
+            callbacks = self.confirm_callbacks
+        else:
+            self.reverted += 1
+            callbacks = self.revert_callbacks
+        logger.debug(
+            "barge-in %s after %.0f ms",
+            state,
+            (time.monotonic() - self.triggered_at) * 1000,
+        )
+        self._notify(callbacks)
+
+    def _notify(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("barge-in callback failed")
+
+    def close(self):
+        self.downstream.close()
@@ -0,0 +1,135 @@
+"""
+inference.py JSON actions: whole response vs ActionDecoder
+Replies in the protocol of inference.py are streamed by voice_stubs
+FakeLLM (--ttft, --tps), pretty-printed as the models write them. For
+each one, the time from the request to the first action (what TTS or
+navigateToPage can start on) against the time to the full response,
+where json.loads of the whole text could run.
+Then the same replies damaged the ways models damage them (prompt
+comments, trailing commas, fences, {{ }}, cut off) and how many actions
+json.loads of the whole text and the decoder still get.
+Run: python bench_action_decoder.py --ttft 0.3 --tps 250
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from action_decoder import ActionDecoder, stream_actions
+from log_setup import configure_logging
+from voice_stubs import FakeLLM
+
+REPLIES = [
+    [
+        ("assistantSpeaking", ["Bien sûr, je vous emmène sur Trad."]),
+        ("navigateToPage", ["trad"]),
+    ],
+    [
+        ("isRelatedToPreviousRequest", []),
+        (
+            "assistantSpeaking",
+            ["J'ouvre Scribe pour rédiger votre post LinkedIn sur la"
+             " cybersécurité."],
+        ),
+        ("navigateToPage", ["scribe"]),
+    ],
+    [
+        (
+            "assistantSpeaking",
+            ["Delos regroupe plusieurs applications : Chat pour discuter"
+             " avec un modèle, Explore pour chercher sur internet, Scribe"
+             " pour écrire, Trad pour traduire, Recap pour résumer vos"
+             " réunions, Docs pour vos documents et Actu pour les"
+             " nouvelles. Laquelle voulez-vous ouvrir ?"],
+        ),
+    ],
+    [("hideOpenSidebar", []), ("navigateToPage", ["docs"])],
+    [("stop", [])],
+]  # fmt: skip
+
+
+def reply_text(actions) -> str:
+    return json.dumps(
+        {"actions": [{"function": f, "args": a} for f, a in actions]},
+        ensure_ascii=False,
+        indent=2,
+    )
+
+
+DAMAGE = {
+    "clean": lambda text: text,
+    "comments": lambda text: text.replace(
+        '"function":', '"function": # the name of the function\n', 1
+    ).replace(',\n      "args"', ' ,\n      "args"'),
+    "trailing commas": lambda text: text.replace("]\n    }", "],\n    }"),
+    "fenced": lambda text: f"Voici les actions :\n```json\n{text}\n```",
+    "template braces": lambda text: text.replace("{", "{{").replace("}", "}}"),
+    "cut off": lambda text: text[: int(len(text) * 0.8)],
+}
+
+
+def whole_text(text: str) -> int:
+    """Actions json.loads gets from the full response"""
+    try:
+        return len(json.loads(text)["actions"])
+    except (ValueError, KeyError, TypeError):
+        return 0
+
+
+async def timing(args):
+    print(
+        f"{'reply':<6} {'actions':>7} {'first action ms':>15}"
+        f" {'full response ms':>16}"
+    )
+    firsts, fulls = [], []
+    for i, actions in enumerate(REPLIES):
+        text = reply_text(actions)
+        llm = FakeLLM(args.ttft, args.tps, text)
+        decoder = ActionDecoder()
+        stream = await llm.chat.completions.create()
+        async for _ in stream_actions(stream, decoder):
+            pass
+        # json.loads of the whole text runs after the last chunk anyway
+        start = time.perf_counter()
+        json.loads(text)
+        full = decoder.done + time.perf_counter() - start
+        firsts.append(decoder.first_action)
+        fulls.append(full)
+        print(
+            f"{i:<6} {decoder.actions:>7} {decoder.first_action * 1000:>15.0f}"
+            f" {full * 1000:>16.0f}"
+        )
+    print(
+        f"{'mean':<6} {'':>7} {sum(firsts) / len(firsts) * 1000:>15.0f}"
+        f" {sum(fulls) / len(fulls) * 1000:>16.0f}"
+    )
+
+
+def robustness():
+    print(
+        f"\n{'damage':<16} {'expected':>8} {'json.loads':>10} {'decoder':>8}"
+    )
+    for name, damage in DAMAGE.items():
+        expected = whole = decoded = 0
+        for actions in REPLIES:
+            text = damage(reply_text(actions))
+            expected += len(actions)
+            whole += whole_text(text)
+            decoder = ActionDecoder()
+            # Token-sized pieces, the boundaries do not matter
+            for i in range(0, len(text), 4):
+                decoder.feed(text[i : i + 4])
+            decoder.finish()
+            decoded += decoder.actions
+        print(f"{name:<16} {expected:>8} {whole:>10} {decoded:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=250.0)
+    configure_logging(level="ERROR")
+    args = parser.parse_args()
+    asyncio.run(timing(args))
+    robustness()
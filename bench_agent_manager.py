@@ -0,0 +1,134 @@
+"""
+AMNGR dispatch: router on every turn (auto_gen.py) vs AgentManager
+Stub agents answer after a fixed delay (the router's is the LLM hop
+being saved), N sessions send a mix of UI commands that PLANNER_AGENT
+marks _ultdir_, requests repeated with different numbers or punctuation,
+and one-off requests. Reports how turns were routed, dispatch latency
+per route, router time spent and saved, and agent instances built.
+Run: python bench_agent_manager.py --sessions 50 --turns 20 --router-ms 400
+"""
+
+import argparse
+import asyncio
+import random
+
+from agent_manager import PAGES, ROUTER, AgentManager
+
+UI_COMMANDS = [
+    "ferme cette fenêtre",
+    "ouvre le dernier message",
+    "affiche la page suivante",
+    "active le mode sombre",
+]
+# (template, page the router picks)
+REQUESTS = [
+    ("envoie un message à Paul pour {n} heures", "chat"),
+    ("traduis le paragraphe {n} en anglais", "trad"),
+    ("résume la réunion numéro {n}", "recap"),
+    ("note que le rendez-vous est à {n} heures", "scribe"),
+    ("ouvre le document {n}", "docs"),
+]
+KEYWORDS = {
+    "message": "chat",
+    "traduis": "trad",
+    "résume": "recap",
+    "note": "scribe",
+    "document": "docs",
+}
+
+
+class StubAgent:
+    def __init__(self, name: str, delay: float):
+        self.name = name
+        self.delay = delay
+
+    async def run(self, text: str) -> str:
+        await asyncio.sleep(self.delay * random.uniform(0.8, 1.3))
+        if self.name != ROUTER:
+            return "c'est fait"
+        for word, page in KEYWORDS.items():
+            if word in text:
+                return page
+        return "chat"
+
+    async def reset(self):
+        pass
+
+
+def utterance(rng: random.Random, args):
+    kind = rng.random()
+    if kind < args.ui:
+        return rng.choice(UI_COMMANDS), "_ultdir_"
+    if kind < args.ui + args.repeated:
+        template, _ = rng.choice(REQUESTS)
+        return template.format(n=rng.randint(1, 12)), "_dir_"
+    # One-off: nothing to reuse
+    return f"peux-tu vérifier le dossier {rng.random():.6f}", "_dir_"
+
+
+async def run(manager: AgentManager, args, direct: bool):
+    rng = random.Random(0)
+
+    async def session(i: int):
+        manager.context_update(i, {"current_page": rng.choice(list(PAGES))})
+        for _ in range(args.turns):
+            text, decision = utterance(rng, args)
+            page, how = await manager.route(
+                i, text, decision if direct else None
+            )
+            await manager.run(i, page, text)
+            await asyncio.sleep(args.think_ms / 1000 * rng.random())
+        await manager.forget(i)
+
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    return manager.stats()
+
+
+def report(label: str, stats: dict):
+    print(f"\n{label}")
+    print(f"  routes: {stats['routes']}")
+    for how, q in stats["dispatch_ms"].items():
+        print(
+            f"  dispatch {how:<7} p50 {q[0.5]:8.2f} ms  p99 {q[0.99]:8.2f} ms"
+        )
+    print(
+        f"  router hop mean {stats['router_hop_mean_ms']:.0f} ms,"
+        f" {stats['router_hops_skipped']} hops skipped,"
+        f" {stats['router_time_saved_s']:.1f} s of router time saved"
+    )
+    print(f"  agents built: {stats['agents_built']}")
+
+
+def main(args):
+    def factory(name: str, system_message: str):
+        delay = args.router_ms if name == ROUTER else args.agent_ms
+        return StubAgent(name, delay / 1000)
+
+    turns = args.sessions * args.turns
+    print(
+        f"{args.sessions} sessions x {args.turns} turns, router"
+        f" {args.router_ms:.0f} ms, agent {args.agent_ms:.0f} ms"
+    )
+    print(
+        f"auto_gen.py style would build {turns * (len(PAGES) + 1)} agents"
+        f" (router and sub-agents per task)"
+    )
+    baseline = AgentManager(factory, cache_size=0)
+    report(
+        "router on every turn", asyncio.run(run(baseline, args, direct=False))
+    )
+    manager = AgentManager(factory)
+    manager.start()
+    report("AgentManager", asyncio.run(run(manager, args, direct=True)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--router-ms", type=float, default=400.0)
+    parser.add_argument("--agent-ms", type=float, default=50.0)
+    parser.add_argument("--think-ms", type=float, default=100.0)
+    parser.add_argument("--ui", type=float, default=0.3)
+    parser.add_argument("--repeated", type=float, default=0.5)
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+"""
+Browser -> server audio path: legacy float32 quanta vs pcm16 frames
+Encodes the same clip the way processor.js does in each mode, then feeds
+it through AudioIngest into a null recognizer stream and reports:
+  - data channel bytes per second of audio (payload and with per-message
+    SCTP/DTLS/UDP/IP overhead)
+  - messages per second
+  - server ingest CPU per second of audio, per stream
+Run: python bench_audio_ingest.py --wav recording.wav --target-sr 48000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from audio_ingest import AudioIngest
+from bench_voice_pipeline import (
+    INPUT_SR,
+    QUANTUM,
+    load_wav,
+    pcm16_frames,
+    synthetic_clip,
+)
+
+# SCTP common header + DATA chunk, DTLS record, UDP + IPv4
+PER_MESSAGE_OVERHEAD = 12 + 16 + 29 + 28
+
+
+class NullStream:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, pcm_bytes):
+        self.bytes += len(pcm_bytes)
+
+
+def float32_messages(audio: np.ndarray):
+    """Legacy processor.js: one float32 render quantum per message"""
+    return [
+        audio[i : i + QUANTUM].tobytes()
+        for i in range(0, len(audio) - QUANTUM + 1, QUANTUM)
+    ]
+
+
+def run(label, messages, handler_name, audio_seconds, target_sr, repeat):
+    sink = NullStream()
+    best = float("inf")
+    for _ in range(repeat):
+        ingest = AudioIngest(sink, INPUT_SR, target_sr)
+        handler = getattr(ingest, handler_name)
+        start = time.process_time()
+        for message in messages:
+            handler(message)
+        best = min(best, time.process_time() - start)
+
+    payload = sum(len(m) for m in messages) / audio_seconds
+    wire = payload + PER_MESSAGE_OVERHEAD * len(messages) / audio_seconds
+    print(
+        f"{label:<26} {payload / 1000:7.1f} {wire * 8 / 1000:9.0f}"
+        f" {len(messages) / audio_seconds:8.0f}"
+        f" {best / audio_seconds * 1000:9.2f}"
+        f" {sink.bytes / repeat / audio_seconds / 1000:9.1f}"
+    )
+
+
+def main(args):
+    if args.wav and os.path.exists(args.wav):
+        audio, source = load_wav(args.wav), args.wav
+    else:
+        audio, source = synthetic_clip(), "synthetic clip"
+    audio_seconds = len(audio) / INPUT_SR
+
+    print(
+        f"{source}: {audio_seconds:.1f} s, recognizer at {args.target_sr} Hz,"
+        f" best of {args.repeat}"
+    )
+    print(
+        f"{'path':<26} {'kB/s':>7} {'wire kbps':>9} {'msg/s':>8}"
+        f" {'cpu ms/s':>9} {'out kB/s':>9}"
+    )
+    run(
+        "float32 quanta @48 kHz",
+        float32_messages(audio),
+        "on_message",
+        audio_seconds,
+        args.target_sr,
+        args.repeat,
+    )
+    run(
+        "pcm16 frames @16 kHz",
+        pcm16_frames(audio, 16000),
+        "on_frame",
+        audio_seconds,
+        args.target_sr,
+        args.repeat,
+    )
+    run(
+        "pcm16 frames @48 kHz",
+        pcm16_frames(audio, 48000),
+        "on_frame",
+        audio_seconds,
+        args.target_sr,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav", default="recording.wav")
+    parser.add_argument("--target-sr", type=int, default=48000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,236 @@
+"""
+TTS handoff jitter: AudioRing vs queue.Queue vs lock + bytearray
+A producer thread plays the Azure SDK (bursts of 20 ms int16 chunks, a
+reply arriving faster than real time), a consumer thread plays the
+PortAudio callback (a block every 10 ms), while CPU-bound threads and a
+busy asyncio loop load the process. Reports per callback:
+  - time spent in the handoff (p50 / p99 / max, µs)
+  - wake-up lateness vs the 10 ms schedule (p99 / max, ms) and xruns
+  - blocks padded with silence
+The last row runs the consumer in a forked process over an mmap ring,
+out of reach of the loaded process's GIL.
+Then a reply longer than the ring (--long-reply seconds into a 1 s
+ring, synthesized 3x faster than real time): samples played, dropped
+and underruns with write() dropping vs write(block=True).
+Run: python bench_audio_ring.py --seconds 5 --load-threads 2
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import queue
+import threading
+import time
+
+import numpy as np
+
+from audio_ring import AudioRing
+
+SAMPLE_RATE = 48000
+CHUNK = SAMPLE_RATE // 50  # 20 ms, what the SDK hands over
+BLOCK = SAMPLE_RATE // 100  # 10 ms, what the device asks for
+# Later than this, a 2-block device buffer has already played silence
+XRUN_SECONDS = 0.01
+
+
+class QueueHandoff:
+    """queue.Queue of chunks, leftover kept by the consumer"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.leftover = b""
+
+    def write(self, chunk: bytes):
+        self.queue.put(bytes(chunk))
+
+    def read_into(self, out: np.ndarray) -> int:
+        data = self.leftover
+        need = 2 * len(out)
+        while len(data) < need:
+            try:
+                data += self.queue.get_nowait()
+            except queue.Empty:
+                break
+        n = min(need, len(data)) // 2
+        out[:n] = np.frombuffer(data[: 2 * n], dtype=np.int16)
+        out[n:] = 0
+        self.leftover = data[2 * n :]
+        return n
+
+
+class LockedHandoff:
+    """bytearray behind a threading.Lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+
+    def write(self, chunk: bytes):
+        with self.lock:
+            self.buffer += chunk
+
+    def read_into(self, out: np.ndarray) -> int:
+        with self.lock:
+            n = min(len(out), len(self.buffer) // 2)
+            out[:n] = np.frombuffer(self.buffer, np.int16, count=n)
+            del self.buffer[: 2 * n]
+        out[n:] = 0
+        return n
+
+
+def cpu_load(stop: threading.Event):
+    x = 0
+    while not stop.is_set():
+        for i in range(2000):
+            x += i * i
+
+
+def loop_load(stop: threading.Event):
+    """Event loop doing signaling-style JSON work between awaits"""
+
+    async def work():
+        payload = {"sdp": "v=0\r\n" * 200, "candidates": list(range(200))}
+        while not stop.is_set():
+            json.loads(json.dumps(payload))
+            await asyncio.sleep(0)
+
+    asyncio.run(work())
+
+
+def producer(handoff, seconds: float, stop: threading.Event):
+    """Replies of 2 s, synthesized 3x faster than real time, 1 s apart"""
+    tone = (
+        np.sin(np.arange(CHUNK) * 2 * np.pi * 220 / SAMPLE_RATE) * 8000
+    ).astype(np.int16)
+    chunk = memoryview(tone.tobytes())
+    end = time.perf_counter() + seconds
+    while not stop.is_set() and time.perf_counter() < end:
+        for _ in range(100):
+            handoff.write(chunk)
+            time.sleep(0.02 / 3)
+        time.sleep(1.0)
+
+
+def consumer(handoff, seconds: float) -> dict:
+    """Device clock: a block every 10 ms, a late callback is not caught up"""
+    out = np.zeros(BLOCK, dtype=np.int16)
+    spent, late, padded = [], [], 0
+    end = time.perf_counter() + seconds
+    next_wake = time.perf_counter() + 0.01
+    while next_wake < end:
+        time.sleep(max(0.0, next_wake - time.perf_counter()))
+        woke = time.perf_counter()
+        late.append(woke - next_wake)
+        n = handoff.read_into(out)
+        spent.append(time.perf_counter() - woke)
+        if 0 < n < BLOCK:
+            padded += 1
+        next_wake = max(next_wake + 0.01, woke)
+    return {"spent": np.array(spent), "late": np.array(late), "padded": padded}
+
+
+def forked_consumer(ring, seconds: float, conn):
+    conn.send(consumer(ring, seconds))
+
+
+def run(label, handoff, args, fork=False):
+    stop = threading.Event()
+    load = [
+        threading.Thread(target=cpu_load, args=(stop,), daemon=True)
+        for _ in range(args.load_threads)
+    ]
+    load.append(threading.Thread(target=loop_load, args=(stop,), daemon=True))
+    for thread in load:
+        thread.start()
+
+    feeder = threading.Thread(
+        target=producer, args=(handoff, args.seconds, stop)
+    )
+    feeder.start()
+    if fork:
+        # Device side in its own process, sharing only the mmap
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.get_context("fork").Process(
+            target=forked_consumer, args=(handoff, args.seconds, child)
+        )
+        process.start()
+        results = parent.recv()
+        process.join()
+    else:
+        results = consumer(handoff, args.seconds)
+    stop.set()
+    feeder.join()
+    for thread in load:
+        thread.join()
+
+    spent = results["spent"] * 1e6
+    late = results["late"] * 1e3
+    xruns = int((results["late"] > XRUN_SECONDS).sum())
+    print(
+        f"{label:<20} {np.percentile(spent, 50):7.1f}"
+        f" {np.percentile(spent, 99):7.1f} {spent.max():8.1f}"
+        f" {np.percentile(late, 99):8.2f} {late.max():8.2f}"
+        f" {xruns:6d} {results['padded']:6d}"
+    )
+
+
+def long_reply(block: bool, seconds: float) -> dict:
+    ring = AudioRing(SAMPLE_RATE)
+    chunk = np.ones(CHUNK, dtype=np.int16)
+    total = int(seconds * SAMPLE_RATE) // CHUNK * CHUNK
+
+    def feed():
+        for _ in range(total // CHUNK):
+            ring.write(chunk, block=block)
+            time.sleep(0.02 / 3)
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    out = np.zeros(BLOCK, dtype=np.int16)
+    played = 0
+    next_wake = time.perf_counter()
+    while feeder.is_alive() or ring.readable():
+        next_wake += 0.01
+        time.sleep(max(0.0, next_wake - time.perf_counter()))
+        played += ring.read_into(out)
+    feeder.join()
+    return {
+        "played": played / total,
+        "dropped": ring.overruns / SAMPLE_RATE,
+        "underruns": ring.underruns,
+    }
+
+
+def main(args):
+    print(
+        f"{args.seconds:.0f} s, {args.load_threads} CPU threads + a busy"
+        f" event loop, {BLOCK}-sample callbacks"
+    )
+    print(
+        f"{'handoff':<20} {'p50 µs':>7} {'p99 µs':>7} {'max µs':>8}"
+        f" {'late p99':>8} {'late max':>8} {'xruns':>6} {'padded':>6}"
+    )
+    run("queue.Queue", QueueHandoff(), args)
+    run("lock+bytearray", LockedHandoff(), args)
+    run("AudioRing", AudioRing(10 * SAMPLE_RATE), args)
+    if "fork" in multiprocessing.get_all_start_methods():
+        ring = AudioRing.anonymous_mmap(10 * SAMPLE_RATE)
+        run("AudioRing mmap, fork", ring, args, fork=True)
+
+    print(f"\n{args.long_reply:.0f} s reply, 1 s ring")
+    print(f"{'write':<12} {'played':>7} {'dropped s':>9} {'underruns':>9}")
+    for block in (False, True):
+        result = long_reply(block, args.long_reply)
+        print(
+            f"{'block' if block else 'drop':<12} {result['played']:>7.0%}"
+            f" {result['dropped']:>9.2f} {result['underruns']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--load-threads", type=int, default=2)
+    parser.add_argument("--long-reply", type=float, default=3.0)
+    main(parser.parse_args())
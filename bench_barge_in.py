@@ -0,0 +1,216 @@
+"""
+Barge-in latency: local energy detector vs waiting for the STT partial
+Each trial plays a TTS reply while the "mic" hears its echo plus noise,
+in real time, through AudioIngest -> BargeInDetector -> FakeRecognizer:
+  barge  the user talks over the reply    (should pause, then confirm)
+  cough  an 80 ms burst over the reply    (should pause, then revert)
+  echo   only the reply's echo            (should do nothing)
+Interruption latency is measured from the user's first sample, for the
+local pause and for the first recognizer partial (today's trigger).
+Run: python bench_barge_in.py --trials 30 --echo-db -20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+
+from audio_ingest import AudioIngest
+from barge_in import BargeInDetector
+from log_setup import configure_logging
+from voice_stubs import FakePushAudioInputStream, FakeRecognizer
+
+SR = 48000
+TICK = 0.02  # seconds of audio per step, the browser's message cadence
+QUANTUM = 128  # samples per processor.js message
+KINDS = ("barge", "cough", "echo")
+
+
+def voice(seconds: float, pitch: float, amplitude: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    signal = np.sin(2 * np.pi * pitch * t) + 0.5 * np.sin(
+        4 * np.pi * pitch * t
+    )
+    signal *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)  # syllables
+    return (amplitude * signal / 1.5).astype(np.float32)
+
+
+class Player:
+    """Plays the reply TICK by TICK, can pause, resume and stop"""
+
+    def __init__(self, audio: np.ndarray):
+        self.audio = audio
+        self.position = 0
+        self.paused = False
+        self.stopped = False
+        self.paused_seconds = 0.0
+
+    def next_chunk(self, n: int) -> np.ndarray:
+        if self.paused or self.stopped or self.position >= len(self.audio):
+            if self.paused:
+                self.paused_seconds += n / SR
+            return np.zeros(n, dtype=np.float32)
+        chunk = self.audio[self.position : self.position + n]
+        self.position += n
+        return np.pad(chunk, (0, n - len(chunk)))
+
+
+class Trial:
+    def __init__(self, kind: str, args, seed: int):
+        self.kind = kind
+        self.args = args
+        self.rng = np.random.default_rng(seed)
+        self.onset = 0.8 + self.rng.uniform(0, 1.0)
+
+        self.player = Player(voice(args.reply_seconds, 230, 0.25))
+        self.push_stream = FakePushAudioInputStream()
+        self.recognizer = FakeRecognizer(self.push_stream, SR)
+        self.detector = BargeInDetector(self.push_stream, SR)
+        self.ingest = AudioIngest(self.detector, SR)
+
+        self.onset_at = None
+        self.paused_at = None
+        self.partial_at = None
+        self.outcome = "none"
+
+        self.detector.on_pause(self.on_pause)
+        self.detector.on_confirm(self.on_confirm)
+        self.detector.on_revert(self.on_revert)
+        self.recognizer.recognizing.connect(self.on_recognizing)
+
+    def on_pause(self):
+        self.player.paused = True
+        if self.paused_at is None:
+            self.paused_at = time.monotonic()
+
+    def on_confirm(self):
+        self.player.stopped = True
+        self.detector.tts_stopped()
+        self.outcome = "confirmed"
+
+    def on_revert(self):
+        self.player.paused = False
+        self.outcome = "reverted"
+
+    def on_recognizing(self, evt):
+        if evt.result.text and self.partial_at is None:
+            self.partial_at = time.monotonic()
+        self.detector.on_partial(evt.result.text)
+
+    def user_audio(self, start: int, n: int) -> np.ndarray:
+        """What the user adds to the mic for samples [start, start + n)"""
+        if self.kind == "echo":
+            return np.zeros(n, dtype=np.float32)
+        if not hasattr(self, "_user"):
+            if self.kind == "barge":
+                self._user = voice(1.5, 140, 0.3)
+            else:
+                self._user = self.rng.normal(0, 0.2, int(0.08 * SR))
+                self._user = self._user.astype(np.float32)
+        offset = start - int(self.onset * SR)
+        out = np.zeros(n, dtype=np.float32)
+        lo, hi = max(0, offset), min(len(self._user), offset + n)
+        if lo < hi:
+            out[lo - offset : hi - offset] = self._user[lo:hi]
+        return out
+
+    async def run(self):
+        self.recognizer.start_continuous_recognition()
+        n = int(TICK * SR)
+        echo_gain = 10 ** (self.args.echo_db / 20)
+        # Speaker -> mic delay, a couple of ticks
+        echo_line = [np.zeros(n, dtype=np.float32)] * 2
+        steps = int((self.args.reply_seconds + 1.0) / TICK)
+        start = time.monotonic()
+        for step in range(steps):
+            played = self.player.next_chunk(n)
+            if played.any():
+                self.detector.tts_audio((played * 32767).astype(np.int16))
+            echo_line.append(played)
+            mic = echo_gain * echo_line.pop(0)
+            mic = mic + self.rng.normal(0, 0.002, n).astype(np.float32)
+            mic = mic + self.user_audio(step * n, n)
+            # The chunk arrives once its last sample is captured
+            end = (step + 1) * TICK
+            if self.onset_at is None and end > self.onset:
+                self.onset_at = time.monotonic() - (end - self.onset)
+            for i in range(0, n, QUANTUM):
+                self.ingest.on_message(mic[i : i + QUANTUM].tobytes())
+            due = start + (step + 1) * TICK
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+        self.recognizer.stop_continuous_recognition()
+
+
+def describe(label: str, samples):
+    if not samples:
+        print(f"  {label:<22} n=0")
+        return
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(
+        f"  {label:<22} n={len(samples):<3} p50 {statistics.median(samples):6.0f}"
+        f" ms  p95 {p95:6.0f} ms"
+    )
+
+
+async def main(args):
+    random.seed(args.seed)
+    trials = [
+        Trial(KINDS[i % len(KINDS)], args, args.seed + i)
+        for i in range(args.trials)
+    ]
+    await asyncio.gather(*(trial.run() for trial in trials))
+
+    print(
+        f"{args.trials} trials, echo at {args.echo_db} dB, reply"
+        f" {args.reply_seconds} s, real time"
+    )
+    for kind in KINDS:
+        group = [t for t in trials if t.kind == kind]
+        outcomes = {
+            o: sum(t.outcome == o for t in group)
+            for o in ("confirmed", "reverted", "none")
+        }
+        print(f"\n{kind}: {outcomes}")
+        if kind == "barge":
+            describe(
+                "local pause",
+                [
+                    (t.paused_at - t.onset_at) * 1000
+                    for t in group
+                    if t.paused_at is not None
+                ],
+            )
+            describe(
+                "STT partial (today)",
+                [
+                    (t.partial_at - t.onset_at) * 1000
+                    for t in group
+                    if t.partial_at is not None
+                ],
+            )
+        elif kind == "cough":
+            describe(
+                "playback gap",
+                [t.player.paused_seconds * 1000 for t in group],
+            )
+    cpu = sum(t.detector.cpu_seconds for t in trials)
+    audio = args.trials * (args.reply_seconds + 1.0)
+    print(f"\ndetector cpu {cpu / audio:.2%} of a core per stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument(
+        "--echo-db", type=float, default=-20.0, help="speaker to mic gain"
+    )
+    parser.add_argument("--reply-seconds", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_logging(level="WARNING")
+    asyncio.run(main(args))
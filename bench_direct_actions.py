@@ -0,0 +1,127 @@
+"""
+UI commands: LLM tool loop + spoken confirmation vs the _ultdir_ path
+Both paths call the real tools of mcp-server-http.py over an in-process
+MCP session (the tools themselves take 100-200 ms, as simulated there).
+  tool loop  LLM picks the tool (voice_stubs FakeLLM), call_tool, LLM
+             writes a confirmation, FakeTTS until its first audio chunk
+  direct     PLANNER_AGENT (local tier) -> DirectActions -> call_tool ->
+             earcon
+Timed from the recognized text to the confirmation being audible.
+NOT_COMMANDS mention a page or a new chat without asking for it: none
+may run a tool.
+Install: pip install mcp anyio
+Run: python bench_direct_actions.py --rounds 5 --ttft 0.35
+"""
+
+import argparse
+import asyncio
+import time
+
+from direct_actions import DirectActions, earcon_pcm, match_action
+from log_setup import configure_logging
+from mcp_transports import open_mcp_session
+from planner import ULTDIR, Planner, PunctuationEOS
+from voice_stubs import FakeLLM, FakeTTS
+
+COMMANDS = [
+    "Ferme le gestionnaire de mémoire.",
+    "Affiche la mémoire des contacts.",
+    "Active le mode éco.",
+    "Va sur la page traduction.",
+    "Ouvre un nouveau chat.",
+    "Utilise Claude.",
+    "Retour à l'accueil.",
+]
+NOT_COMMANDS = [
+    "Je ne veux pas de nouveau chat, réponds juste.",
+    "Va savoir pourquoi le chat de ma voisine miaule.",
+    "Retour sur ce que tu disais à propos des news.",
+    "N'active pas le mode éco.",
+    "Ouvre les yeux, on parle de la page d'accueil de mon site.",
+]
+TOOL_CALL_TOKENS = 'navigateToPage {"page": "trad"}'
+CONFIRMATION = "C'est fait, la page est ouverte."
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def tool_loop(session, text: str, args) -> float:
+    start = time.perf_counter()
+    # First hop: the model answers with the tool call
+    async for _ in await FakeLLM(
+        args.ttft, args.tps, TOOL_CALL_TOKENS
+    ).chat.completions.create():
+        pass
+    action = match_action(text)  # what the model would have picked
+    await session.call_tool(action.tool, action.arguments)
+    # Second hop: the model confirms, TTS speaks it
+
+    async def text_stream():
+        stream = await FakeLLM(
+            args.ttft, args.tps, CONFIRMATION
+        ).chat.completions.create()
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async for _ in FakeTTS(rtf=args.rtf).synthesize(text_stream()):
+        break  # first audio chunk
+    return time.perf_counter() - start
+
+
+async def main(args):
+    planner = Planner(PunctuationEOS())
+    async with open_mcp_session("inprocess", "mcp-server-http.py") as session:
+        heard = {}
+        direct = DirectActions(
+            lambda scope: session,
+            lambda scope, name: heard.__setitem__(scope, earcon_pcm(name)),
+        )
+        baseline, fast, decisions = [], [], []
+        for _ in range(args.rounds):
+            for text in COMMANDS:
+                baseline.append(await tool_loop(session, text, args))
+
+                start = time.perf_counter()
+                decision = await planner.decide(text)
+                decisions.append(decision)
+                if decision == ULTDIR:
+                    await direct.execute("bench", text)
+                fast.append(time.perf_counter() - start)
+
+        executed = sum(direct.by_tool.values())
+        for text in NOT_COMMANDS:
+            if await planner.decide(text) == ULTDIR:
+                await direct.execute("bench", text)
+        wrong = sum(direct.by_tool.values()) - executed
+
+    routed = sum(d == ULTDIR for d in decisions)
+    stats = direct.stats()
+    print(
+        f"{len(fast)} commands, {routed} routed _ultdir_ by the planner,"
+        f" executed {stats['executed']}, failed {stats['failed']}"
+    )
+    print(f"{len(NOT_COMMANDS)} non-commands, tools wrongly run: {wrong}")
+    print(
+        f"{'path':<12} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'<300ms':>7}"
+    )
+    for label, samples in (("tool loop", baseline), ("direct", fast)):
+        under = sum(s < 0.3 for s in samples) / len(samples)
+        print(
+            f"{label:<12} {percentile(samples, 0.5) * 1000:>8.1f}"
+            f" {percentile(samples, 0.95) * 1000:>8.1f}"
+            f" {max(samples) * 1000:>8.1f} {under:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.35)
+    parser.add_argument("--tps", type=float, default=80.0)
+    parser.add_argument("--rtf", type=float, default=0.2)
+    configure_logging(level="WARNING")
+    asyncio.run(main(parser.parse_args()))
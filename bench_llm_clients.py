@@ -0,0 +1,222 @@
+"""
+LLM client per call vs module client vs LLMClientRegistry, over TLS
+mock_llm_server.py runs in-process over https (a throwaway self-signed
+certificate from the openssl CLI) behind a proxy adding --rtt of network
+round trip, so a new connection pays the TLS handshake round trips the
+real APIs cost. Sessions take turns with --gap seconds of silence:
+  per call  AsyncOpenAI(...) built for each request (mcp-client.py)
+  module    one AsyncOpenAI per script, SDK defaults (5 s keep-alive)
+  registry  LLMClientRegistry, warmed at startup and when idle
+Reports TTFT from create() to the first streamed token and how many
+connections were opened.
+Install: pip install aiohttp openai
+Run: python bench_llm_clients.py --sessions 4 --turns 5 --gap 6 --rtt 0.06
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import httpx
+from aiohttp import web
+from openai import AsyncOpenAI
+
+from llm_clients import ConnectionStats, LLMClientRegistry
+from log_setup import configure_logging
+from mock_llm_server import PROFILES, create_app, ssl_context
+from turn_tracing import SpanHistogram
+
+MESSAGES = [{"role": "user", "content": "bonjour"}]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def self_signed(directory: str):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            "-keyout", key, "-out", cert,
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+    return cert, key
+
+
+async def delayed_pipe(reader, writer, delay: float):
+    """Forward bytes, each chunk delay seconds later, order kept"""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def send():
+        while True:
+            at, data = await queue.get()
+            await asyncio.sleep(max(0.0, at - time.perf_counter()))
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            data = await reader.read(65536)
+            await queue.put((time.perf_counter() + delay, data))
+            if not data:
+                break
+    finally:
+        await sender
+
+
+async def start_proxy(upstream_port: int, rtt: float):
+    async def handle(reader, writer):
+        up_reader, up_writer = await asyncio.open_connection(
+            "127.0.0.1", upstream_port
+        )
+        try:
+            await asyncio.gather(
+                delayed_pipe(reader, up_writer, rtt / 2),
+                delayed_pipe(up_reader, writer, rtt / 2),
+                return_exceptions=True,
+            )
+        except asyncio.CancelledError:
+            pass  # bench over
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def ttft(client) -> float:
+    start = time.perf_counter()
+    stream = await client.chat.completions.create(
+        model="mock", messages=MESSAGES, stream=True
+    )
+    first = None
+    async for chunk in stream:
+        if first is None and chunk.choices and chunk.choices[0].delta.content:
+            first = time.perf_counter() - start
+    return first
+
+
+def sdk_client(base_url: str, context, stats: ConnectionStats):
+    """AsyncOpenAI with the SDK's own pool settings, connections counted"""
+
+    async def hook(request: httpx.Request):
+        trace = stats.request(request)
+
+        async def async_trace(event, info):
+            trace(event, info)
+
+        request.extensions["trace"] = async_trace
+
+    return AsyncOpenAI(
+        base_url=base_url,
+        api_key="mock",
+        http_client=httpx.AsyncClient(
+            verify=context, event_hooks={"request": [hook]}
+        ),
+    )
+
+
+async def run(policy: str, base_url: str, context, args):
+    registry = LLMClientRegistry(
+        verify=context, idle_warm=args.idle_warm, setup=SpanHistogram()
+    )
+    stats = ConnectionStats(SpanHistogram())
+    if policy == "registry":
+        registry.client("openai", base_url=base_url, api_key="mock")
+        await registry.warm()
+        registry.start()
+        stats = registry.connections["openai"]
+    module_client = None
+    if policy == "module":
+        module_client = sdk_client(base_url, context, stats)
+    samples = []
+    in_turns = 0
+
+    async def session(i: int):
+        nonlocal in_turns
+        await asyncio.sleep(i * args.gap / args.sessions)  # staggered
+        for _ in range(args.turns):
+            before = stats.connections
+            if policy == "per call":
+                client = sdk_client(base_url, context, stats)
+                samples.append(await ttft(client))
+                await client.close()
+            elif policy == "module":
+                samples.append(await ttft(module_client))
+            else:
+                samples.append(await ttft(registry.client("openai")))
+            # A connection opened by this turn (or a concurrent one)
+            in_turns += stats.connections > before
+            await asyncio.sleep(args.gap)
+
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    warmups = stats.requests - len(samples)
+    await registry.aclose()
+    if module_client is not None:
+        await module_client.close()
+    return samples, stats.connections, in_turns, warmups
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = self_signed(directory)
+        runner = web.AppRunner(create_app(PROFILES[args.profile]))
+        await runner.setup()
+        site = web.TCPSite(
+            runner, "127.0.0.1", 0, ssl_context=ssl_context(cert, key)
+        )
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        proxy, proxy_port = await start_proxy(port, args.rtt)
+        base_url = f"https://localhost:{proxy_port}/v1"
+        context = ssl.create_default_context(cafile=cert)
+
+        print(
+            f"{args.sessions} sessions x {args.turns} turns, {args.gap:.0f} s"
+            f" apart, rtt {args.rtt * 1000:.0f} ms, mock TTFT"
+            f" {PROFILES[args.profile].ttft * 1000:.0f} ms"
+        )
+        print(
+            f"{'client':<9} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}"
+            f" {'conns':>6} {'turns paying':>12} {'warm-ups':>8}"
+        )
+        for policy in ("per call", "module", "registry"):
+            samples, connections, in_turns, warmups = await run(
+                policy, base_url, context, args
+            )
+            print(
+                f"{policy:<9} {percentile(samples, 0.5) * 1000:>7.0f}"
+                f" {percentile(samples, 0.95) * 1000:>7.0f}"
+                f" {max(samples) * 1000:>7.0f}"
+                f" {connections:>6} {in_turns:>12} {warmups:>8}"
+            )
+        proxy.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=6.0)
+    parser.add_argument("--rtt", type=float, default=0.06)
+    parser.add_argument("--idle-warm", type=float, default=4.0)
+    parser.add_argument("--profile", choices=PROFILES, default="instant")
+    configure_logging(level="WARNING")
+    # mock_llm_server configured INFO on import
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
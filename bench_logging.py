@@ -0,0 +1,120 @@
+"""
+Micro-benchmark: caller-side cost of the old hot-path logging vs
+lazy %-style records through the log_setup queue sink.
+Output goes to os.devnull so the terminal does not skew the numbers.
+Run: python bench_logging.py --records 50000
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import redirect_stdout
+
+from log_setup import (
+    LOG_FORMAT,
+    FieldsFormatter,
+    LazyQueueHandler,
+    log_sampled,
+)
+
+ARGUMENTS = {"page": "memory", "filters": list(range(20)), "deep": True}
+MESSAGES = [{"role": "user", "content": "bonjour " * 20}] * 8
+
+
+def make_logger(name: str, handler: logging.Handler, level: int):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def sync_logger(name: str, sink, level: int):
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return make_logger(name, handler, level), None
+
+
+def queue_logger(name: str, sink, level: int):
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(FieldsFormatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return make_logger(name, LazyQueueHandler(log_queue), level), listener
+
+
+def old_tool_call(logger, i):
+    """What call_tool / the clients did per tool call and per turn"""
+    logger.info(f"🔧 Tool call received: navigateToPage #{i}")
+    logger.debug(f"   Arguments: {json.dumps(ARGUMENTS, indent=2)}")
+    logger.info(f"[CONVERSATION] {MESSAGES}")
+
+
+def new_tool_call(logger, i):
+    logger.info("🔧 Tool call received: navigateToPage #%d", i)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   Arguments: %s", json.dumps(ARGUMENTS, indent=2))
+    logger.debug("[CONVERSATION] %s", MESSAGES)
+
+
+def old_token(logger, i):
+    """Per-token print in the voice servers"""
+    print("delta_text", f"tok{i}")
+
+
+def new_token(logger, i):
+    log_sampled(logger, "delta_text", "%r", f"tok{i}")
+
+
+def run(setup, fn, n: int, sink, level: int = logging.INFO):
+    logger, listener = setup(
+        f"bench-{setup.__name__}-{fn.__name__}", sink, level
+    )
+    start = time.perf_counter()
+    with redirect_stdout(sink):
+        for i in range(n):
+            fn(logger, i)
+    caller = time.perf_counter() - start
+    if listener is not None:
+        listener.stop()
+    drained = time.perf_counter() - start
+    return caller, drained
+
+
+def main(n: int):
+    cases = [
+        (
+            "tool call, INFO",
+            (sync_logger, old_tool_call),
+            (queue_logger, new_tool_call),
+        ),
+        (
+            "per token, INFO",
+            (sync_logger, old_token),
+            (queue_logger, new_token),
+        ),
+    ]
+    print(
+        f"{'case':<18} {'old rec/s':>12} {'new rec/s':>12} {'speedup':>8}"
+        f" {'new drained rec/s':>18}"
+    )
+    with open(os.devnull, "w") as sink:
+        for name, old, new in cases:
+            old_caller, _ = run(*old, n, sink)
+            new_caller, new_drained = run(*new, n, sink)
+            print(
+                f"{name:<18} {n / old_caller:>12,.0f} {n / new_caller:>12,.0f}"
+                f" {old_caller / new_caller:>7.1f}x {n / new_drained:>18,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.records)
@@ -0,0 +1,145 @@
+"""
+Voice turns with and without the lphrase spoken budget
+Replies of every length, from "C'est fait." to the tour of Delos the
+prompts ask the model not to give, are streamed by voice_stubs FakeLLM
+(--ttft, --tps, max_tokens honoured) into FakeTTS (--rtf) and played in
+real time. A turn lasts from the LLM request until the last audio chunk
+has been played: the next turn cannot start before.
+Reports the mean and p95 turn duration, spoken seconds, how many turns
+were cut and how much of the text went to the screen only.
+First checks that split() on a whole reply (cache replays) cuts where
+the same reply streamed word by word does, for a range of budgets.
+Run: python bench_lphrase.py --max-seconds 8 --tps 80
+"""
+
+import argparse
+import asyncio
+import time
+
+from log_setup import configure_logging
+from lphrase import LPhrase, SpokenReply
+from voice_stubs import FakeLLM, FakeTTS
+
+REPLIES = [
+    "C'est fait.",
+    "Bien sûr, je vous emmène sur la page Trad.",
+    "Bien sûr, c'est fait. J'ai ouvert la page demandée et tout est prêt,"
+    " dis-moi si tu veux autre chose.",
+    "Je n'ai pas trouvé de réunion hier. Voulez-vous que je cherche dans"
+    " celles de la semaine dernière ? Je peux aussi ouvrir Recap pour que"
+    " vous choisissiez vous-même.",
+    "Delos regroupe plusieurs applications. Chat permet de discuter avec"
+    " un modèle, Explore de chercher sur internet, Scribe d'écrire vos"
+    " textes et Trad de les traduire. Recap résume vos réunions, Docs"
+    " interroge vos documents et Actu vous donne les nouvelles du jour."
+    " Vous pouvez aussi choisir le modèle utilisé, activer le mode éco ou"
+    " gérer la mémoire de l'assistant. Laquelle voulez-vous ouvrir ?",
+    "Voici le résumé de la dernière réunion : l'équipe a validé le"
+    " calendrier du projet, avec une première version prévue pour la fin"
+    " du mois. Paul s'occupe de l'intégration des documents, Marie de la"
+    " traduction et vous de la relecture. Deux points restent ouverts, le"
+    " budget des serveurs et le choix du modèle par défaut, ils seront"
+    " revus jeudi. Enfin, il a été décidé d'ajouter un mode éco pour les"
+    " requêtes simples afin de réduire les coûts.",
+]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def check_split(max_seconds_range=(2, 4, 6, 8, 10), grace: int = 60):
+    """split() == word-by-word feed(), spoken part and rest"""
+    checked = 0
+    for max_seconds in max_seconds_range:
+        lphrase = LPhrase(max_seconds=max_seconds, grace=grace)
+        for reply in REPLIES:
+            streamed = SpokenReply(lphrase.max_chars, lphrase.grace)
+            words = reply.split(" ")
+            spoken = "".join(
+                streamed.feed(word if i == len(words) - 1 else word + " ")
+                for i, word in enumerate(words)
+            )
+            spoken += streamed.finish()
+            assert lphrase.split(reply) == (spoken, streamed.rest), (
+                f"split() and feed() differ at {lphrase.max_chars} chars:"
+                f" {reply[:40]!r}"
+            )
+            checked += 1
+    print(f"split() matches word-by-word feed() on {checked} replies")
+
+
+async def turn(reply: str, lphrase, args, index: int):
+    """(turn seconds, audio seconds)"""
+    llm = FakeLLM(args.ttft, args.tps, reply)
+    tts = FakeTTS(rtf=args.rtf)
+    start = time.perf_counter()
+    stream = await llm.chat.completions.create(
+        max_tokens=lphrase.max_tokens if lphrase else None
+    )
+
+    async def text():
+        if lphrase is None:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        else:
+            async for spoken in lphrase.speak(index, stream):
+                yield spoken
+
+    # Played in real time from the first chunk on
+    played_until = audio = 0.0
+    async for _ in tts.synthesize(text()):
+        now = time.perf_counter() - start
+        played_until = max(now, played_until) + tts.chunk_seconds
+        audio += tts.chunk_seconds
+    return played_until, audio
+
+
+async def main(args):
+    check_split(grace=args.grace)
+    budgets = {
+        "none": None,
+        "lphrase": LPhrase(max_seconds=args.max_seconds, grace=args.grace),
+    }
+    print(
+        f"{len(REPLIES)} replies x {args.rounds}, {args.tps:.0f} tok/s, TTS"
+        f" rtf {args.rtf}, budget {args.max_seconds:.0f} s"
+        f" ({budgets['lphrase'].max_chars} chars"
+        f" + {args.grace}), max_tokens {budgets['lphrase'].max_tokens}"
+    )
+    print(
+        f"{'budget':<8} {'mean s':>7} {'p95 s':>6} {'max s':>6}"
+        f" {'spoken s':>8} {'cut':>4} {'on screen':>9}"
+    )
+    for name, lphrase in budgets.items():
+        durations, spoken = [], []
+        for _ in range(args.rounds):
+            for i, reply in enumerate(REPLIES):
+                seconds, audio = await turn(reply, lphrase, args, i)
+                durations.append(seconds)
+                spoken.append(audio)
+        if lphrase is not None:
+            stats = lphrase.stats()
+            cut = f"{stats['cut']}"
+            screen = f"{1 - stats['spoken_share']:.0%}"
+        else:
+            cut, screen = "0", "0%"
+        print(
+            f"{name:<8} {sum(durations) / len(durations):>7.2f}"
+            f" {percentile(durations, 0.95):>6.2f} {max(durations):>6.2f}"
+            f" {sum(spoken) / len(spoken):>8.2f} {cut:>4} {screen:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--max-seconds", type=float, default=8.0)
+    parser.add_argument("--grace", type=int, default=60)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=80.0)
+    parser.add_argument("--rtf", type=float, default=0.2)
+    configure_logging(level="WARNING")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""
+Per-tool-call latency: in-process vs stdio vs HTTP MCP transports
+Install: pip install mcp anyio aiohttp
+Run: python bench_mcp_transport.py --calls 200
+The --http row needs mcp-server-http.py listening on :3000.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import statistics
+import time
+
+from mcp_transports import open_mcp_session
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return (
+        f"p50 {p(0.50) * 1000:7.3f} ms  p95 {p(0.95) * 1000:7.3f} ms  "
+        f"p99 {p(0.99) * 1000:7.3f} ms  mean "
+        f"{statistics.fmean(samples) * 1000:7.3f} ms"
+    )
+
+
+async def time_calls(fn, calls: int):
+    # Warm up (imports, first validation, socket setup)
+    for _ in range(5):
+        await fn()
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def bench_session(transport: str, script: str, calls: int, tool):
+    async with open_mcp_session(transport, script) as session:
+        list_samples = await time_calls(session.list_tools, calls)
+        call_samples = await time_calls(
+            lambda: session.call_tool(tool[0], tool[1]), calls
+        )
+    return list_samples, call_samples
+
+
+async def bench_aiohttp(calls: int, tool):
+    # mcp-client-http.py is not importable by name, load it from its path
+    spec = importlib.util.spec_from_file_location(
+        "mcp_client_http", "mcp-client-http.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    async with module.MCPHTTPClient() as client:
+        list_samples = await time_calls(client.list_tools, calls)
+        call_samples = await time_calls(
+            lambda: client.call_tool(tool[0], tool[1]), calls
+        )
+    return list_samples, call_samples
+
+
+async def main(calls: int, script: str, http: bool):
+    # mcp-server.py tools sleep on purpose, list_tools shows the transport
+    tool = (
+        ("calculate", {"expression": "1+1"})
+        if script == "mcp-server.py"
+        else ("toggleEcoMode", {})
+    )
+    rows = [
+        ("inprocess", lambda: bench_session("inprocess", script, calls, tool)),
+        ("stdio", lambda: bench_session("stdio", script, calls, tool)),
+    ]
+    if http:
+        rows.append(("http (aiohttp)", lambda: bench_aiohttp(calls, tool)))
+
+    print(f"server: {script}, {calls} calls per row, tool {tool[0]}\n")
+    for name, run in rows:
+        try:
+            list_samples, call_samples = await run()
+        except Exception as e:
+            print(f"{name:<15} skipped: {e}")
+            continue
+        print(f"{name:<15} list_tools  {summarize(list_samples)}")
+        print(f"{'':<15} call_tool   {summarize(call_samples)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--server", default="mcp-server.py")
+    parser.add_argument(
+        "--http",
+        action="store_true",
+        help="also bench MCPHTTPClient against mcp-server-http.py on :3000",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.server, args.http))
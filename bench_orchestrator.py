@@ -0,0 +1,123 @@
+"""
+ORCHESTRATOR policies on simulated providers with heavy-tailed TTFT
+Each stub provider streams like voice_stubs.FakeLLM, with a lognormal
+time to first token, a share of slow outliers (queueing, cold starts)
+and of errors before the first token. Compared, on the same seeds:
+  single  always the provider with the best median
+  hedged  scoreboard routing, second request past the primary's p90
+  race    every provider on every request
+Reports TTFT percentiles and how many provider requests each one cost.
+Run: python bench_orchestrator.py --requests 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import random
+
+from orchestrator import Orchestrator, Provider
+from voice_stubs import FakeLLM
+
+# name, median TTFT s, lognormal sigma, outlier rate, outlier x, error
+# rate, tokens/s
+PROFILES = [
+    ("openai/gpt-4o-mini", 0.45, 0.25, 0.05, 4.0, 0.01, 90.0),
+    ("groq/gpt-oss-20b", 0.30, 0.35, 0.08, 6.0, 0.02, 400.0),
+    ("groq/gpt-oss-120b", 0.40, 0.35, 0.08, 6.0, 0.02, 250.0),
+]
+
+
+class StubClient:
+    def __init__(self, profile, rng: random.Random):
+        _, self.median, self.sigma, self.slow, self.slow_x, self.error = (
+            profile[:6]
+        )
+        self.tps = profile[6]
+        self.rng = rng
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = self
+
+    async def create(self, model=None, messages=None, stream=True, **kw):
+        ttft = self.median * math.exp(self.rng.gauss(0, self.sigma))
+        if self.rng.random() < self.slow:
+            ttft *= self.slow_x
+        if self.rng.random() < self.error:
+            await asyncio.sleep(ttft / 3)
+            raise ConnectionError("upstream 503")
+        return await FakeLLM(ttft, self.tps).chat.completions.create()
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run(policy: str, args):
+    rng = random.Random(args.seed)
+    providers = [
+        Provider(profile[0], StubClient(profile, rng), profile[0])
+        for profile in PROFILES
+    ]
+    if policy == "single":
+        providers = [min(providers, key=lambda p: p.client.median)]
+    orchestrator = Orchestrator(
+        providers, race=policy == "race", min_samples=args.min_samples
+    )
+    ttfts, failed = [], 0
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        nonlocal failed
+        async with limit:
+            start = asyncio.get_running_loop().time()
+            try:
+                stream = await orchestrator.chat.completions.create(
+                    messages=[{"role": "user", "content": "bonjour"}]
+                )
+                first = None
+                async for chunk in stream:
+                    if first is None and chunk.choices[0].delta.content:
+                        first = asyncio.get_running_loop().time() - start
+                ttfts.append(first)
+            except Exception:
+                failed += 1
+
+    await asyncio.gather(*(request() for _ in range(args.requests)))
+    return ttfts, failed, orchestrator.stats()
+
+
+def main(args):
+    print(
+        f"{args.requests} requests, {args.concurrency} at a time\n"
+        f"{'policy':<8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7}"
+        f" {'max ms':>7} {'failed':>6} {'calls/req':>9} {'hedges':>6}"
+    )
+    for policy in ("single", "hedged", "race"):
+        ttfts, failed, stats = asyncio.run(run(policy, args))
+        calls = sum(p["requests"] for p in stats["providers"].values())
+        print(
+            f"{policy:<8} {percentile(ttfts, 0.5) * 1000:>7.0f}"
+            f" {percentile(ttfts, 0.9) * 1000:>7.0f}"
+            f" {percentile(ttfts, 0.99) * 1000:>7.0f}"
+            f" {max(ttfts) * 1000:>7.0f} {failed:>6}"
+            f" {calls / args.requests:>9.2f} {stats['hedges']:>6}"
+        )
+        if policy == "hedged":
+            for name, p in stats["providers"].items():
+                print(
+                    f"  {name:<20} wins {p['wins']:>4}  p50"
+                    f" {p['ttft_p50_ms']:>5.0f} ms  p90"
+                    f" {p['ttft_p90_ms']:>5.0f} ms  {p['tps']:>5.0f} tok/s"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--min-samples", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    # The simulated 503s are expected
+    logging.getLogger("orchestrator").setLevel(logging.ERROR)
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+"""
+Voice turns through the graph.py topology on the pipeline_graph engine
+Stub stages (voice_stubs FakeLLM / FakeTTS) are attached to the drawn
+nodes, N sessions speak at once, and every other session interrupts its
+reply with a "stop" utterance, which PLANNER_AGENT routes to _hcut_.
+Reports per-edge queue wait and peak depth, per-node handler time and
+cancellations, and how long a hard cut takes to silence the Player.
+Run: python bench_pipeline_graph.py --sessions 50
+     python bench_pipeline_graph.py --dot live.gv   # annotated diagram
+"""
+
+import argparse
+import asyncio
+import time
+
+from graph import build_graph
+from log_setup import configure_logging
+from voice_stubs import FakeLLM, FakeTTS
+
+CHUNK_SECONDS = 0.04  # FakeTTS chunk
+
+
+def attach_stubs(graph, args, cut_done: dict):
+    llm = FakeLLM(ttft=args.ttft, tps=args.tps)
+    tts = FakeTTS(rtf=args.rtf)
+
+    def pipe(text, ctx):
+        return {"text": text, "at": time.perf_counter()}
+
+    def planner(turn, ctx):
+        first = turn["text"].split()[0].strip(",.!?").lower()
+        return dict(turn, decision="_hcut_" if first == "stop" else "_dir_")
+
+    async def lphrase(turn, ctx):
+        stream = await llm.chat.completions.create(stream=True)
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def synthesize(text, ctx):
+        async def one():
+            yield text
+
+        async for audio in tts.synthesize(one()):
+            yield audio
+
+    async def player(audio, ctx):
+        await asyncio.sleep(CHUNK_SECONDS * args.play_speed)
+
+    def hard_cut(turn, ctx):
+        cut_done[ctx.scope] = time.perf_counter() - turn["at"]
+
+    graph.set_handler("PIPE", pipe, router=lambda turn: "ORCHESTRATOR")
+    graph.set_handler(
+        "ORCHESTRATOR",
+        lambda turn, ctx: turn,
+        router=lambda t: "PLANNER_AGENT",
+    )
+    graph.set_handler(
+        "PLANNER_AGENT", planner, router=lambda turn: turn["decision"]
+    )
+    graph.set_handler("_dir_", lambda turn, ctx: turn)
+    graph.set_handler(
+        "lphrase",
+        lphrase,
+        router=lambda text: "TTS Manager",
+        concurrency=args.sessions,
+    )
+    graph.set_handler(
+        "TTS Manager", lambda text, ctx: text, router=lambda text: "TTS"
+    )
+    graph.set_handler("TTS", synthesize, concurrency=args.tts_concurrency)
+    graph.set_handler(
+        "Player", player, router=lambda audio: None, concurrency=args.sessions
+    )
+    graph.set_handler("_hcut_", hard_cut, cancels=["ORCHESTRATOR"])
+
+
+async def session(graph, scope: int, interrupt: bool, args):
+    await graph.submit("PIPE", "bonjour, qu'est-ce que tu peux faire", scope)
+    if interrupt:
+        await asyncio.sleep(args.interrupt_after)
+        await graph.submit("PIPE", "stop, attends", scope)
+
+
+async def main(args):
+    graph = build_graph()
+    cut_done = {}
+    attach_stubs(graph, args, cut_done)
+    peak_depth = {edge.name: 0 for edge in graph.edges}
+
+    async def sample_depth():
+        while True:
+            for edge in graph.edges:
+                peak_depth[edge.name] = max(peak_depth[edge.name], edge.depth)
+            await asyncio.sleep(0.005)
+
+    await graph.start()
+    sampler = asyncio.create_task(sample_depth())
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(session(graph, i, i % 2 == 1, args) for i in range(args.sessions))
+    )
+    # Until everything has drained
+    while any(
+        node.busy or (node.inbox and node.inbox.qsize())
+        for node in graph.nodes.values()
+    ):
+        await asyncio.sleep(0.01)
+    wall = time.perf_counter() - start
+    sampler.cancel()
+
+    stats = graph.stats()
+    print(f"{args.sessions} sessions, {len(cut_done)} hard cuts, {wall:.2f} s")
+    print(
+        f"\n{'edge':<30} {'sent':>6} {'p50 ms':>7} {'p99 ms':>7} {'peak':>5}"
+    )
+    for name, edge in stats["edges"].items():
+        if edge["sent"]:
+            print(
+                f"{name:<30} {edge['sent']:>6} {edge['wait_p50_ms']:>7.2f}"
+                f" {edge['wait_p99_ms']:>7.2f} {peak_depth[name]:>5}"
+            )
+    print(
+        f"\n{'node':<16} {'handled':>7} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'cut':>5} {'dropped':>7}"
+    )
+    for name, node in stats["nodes"].items():
+        print(
+            f"{name:<16} {node['handled']:>7} {node['p50_ms']:>8.2f}"
+            f" {node['p99_ms']:>8.2f} {node['cancelled']:>5}"
+            f" {node['dropped']:>7}"
+        )
+    if cut_done:
+        cuts = sorted(cut_done.values())
+        print(
+            f"\nhard cut, PIPE -> TTS and Player cancelled: p50"
+            f" {cuts[len(cuts) // 2] * 1000:.2f} ms,"
+            f" max {cuts[-1] * 1000:.2f} ms"
+        )
+    if args.dot:
+        graph.to_dot(metrics=True).save(args.dot)
+        print(f"annotated diagram written to {args.dot}")
+    await graph.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--tts-concurrency", type=int, default=8)
+    parser.add_argument("--interrupt-after", type=float, default=0.6)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=80.0)
+    parser.add_argument("--rtf", type=float, default=0.2)
+    parser.add_argument(
+        "--play-speed",
+        type=float,
+        default=0.1,
+        help="player time per chunk, x real time",
+    )
+    parser.add_argument("--dot", help="write the live diagram here")
+    configure_logging(level="WARNING")
+    asyncio.run(main(parser.parse_args()))
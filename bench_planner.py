@@ -0,0 +1,170 @@
+"""
+PLANNER_AGENT under load: N sessions speak labeled utterances at once
+Each utterance arrives as growing partials (one word at a time, no
+punctuation, like Azure recognizing events) and then as the punctuated
+final. An oracle LLM client answers the expected label after --llm-ms,
+so the escalations cost what a real planner call would. Reports per
+decision latency, how many texts reached the LLM, and accuracy of the
+final decisions against the labels.
+Run: python bench_planner.py --sessions 50 --llm-ms 350
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from log_setup import configure_logging
+from planner import (
+    DIR,
+    HCUT,
+    INT_P,
+    NCOMPL,
+    NINT_P,
+    SCUT,
+    ULTDIR,
+    LLMPlanner,
+    Planner,
+    load_eos_model,
+)
+
+# (final transcript, assistant playing, expected decision)
+UTTERANCES = [
+    ("Quelle est la météo demain à Paris ?", False, DIR),
+    ("Explique-moi comment marche la facturation.", False, DIR),
+    ("Je voudrais réserver une table pour ce soir.", False, DIR),
+    ("Ferme la fenêtre des paramètres.", False, ULTDIR),
+    ("Ouvre mes documents récents.", False, ULTDIR),
+    ("Va sur la page d'accueil.", False, ULTDIR),
+    ("Je voudrais savoir si", False, NCOMPL),
+    ("Est-ce que tu peux me dire", False, NCOMPL),
+    ("Donne-moi la liste des", False, NCOMPL),
+    ("Ok merci beaucoup", False, DIR),
+    ("What time is it in Tokyo?", False, DIR),
+    ("Open the settings page.", False, ULTDIR),
+    ("Stop.", True, HCUT),
+    ("Attends, attends.", True, HCUT),
+    ("Tais-toi.", True, HCUT),
+    ("Oui.", True, NINT_P),
+    ("Mmh.", True, NINT_P),
+    ("D'accord.", True, NINT_P),
+    ("Non, je voulais plutôt le vol de demain matin.", True, SCUT),
+    ("Plutôt en anglais s'il te plaît.", True, SCUT),
+    ("Ferme cette fenêtre.", True, ULTDIR),
+    ("Et aussi pour", True, INT_P),
+    ("Mais je pensais que", True, INT_P),
+    ("En fait c'est pour mon frère", True, SCUT),
+]
+
+
+class OracleLLM:
+    """chat.completions.create stand-in that knows the labels"""
+
+    def __init__(self, labels: dict, delay: float):
+        self.labels = labels
+        self.delay = delay
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self._create)
+        )
+
+    async def _create(self, messages, **kwargs):
+        query = json.loads(messages[-1]["content"])
+        label = self.labels.get(query["transcript"])
+        if label is None:  # a partial
+            label = INT_P if query["assistant_speaking"] else NCOMPL
+        await asyncio.sleep(self.delay * random.uniform(0.7, 1.5))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=label))]
+        )
+
+
+async def session(planner: Planner, utterances, args, results: list):
+    for text, playing, expected in utterances:
+        words = text.rstrip(".?!").split()
+        for n in range(1, len(words)):
+            partial = " ".join(words[:n]).lower()
+            await planner.decide(partial, playing, final=False)
+            await asyncio.sleep(args.word_ms / 1000 * random.uniform(0.5, 1.5))
+        start = time.perf_counter()
+        decision = await planner.decide(text, playing, final=True)
+        results.append(
+            (expected, decision, time.perf_counter() - start, playing)
+        )
+
+
+async def main(args):
+    random.seed(0)
+    labels = {text: expected for text, _, expected in UTTERANCES}
+    client = OracleLLM(labels, args.llm_ms / 1000)
+    planner = Planner(
+        load_eos_model(),
+        LLMPlanner(client, timeout=args.llm_timeout_ms / 1000),
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+    )
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            session(
+                planner,
+                random.sample(UTTERANCES, args.turns),
+                args,
+                results,
+            )
+            for _ in range(args.sessions)
+        )
+    )
+    wall = time.perf_counter() - start
+
+    stats = planner.stats()
+    print(
+        f"{args.sessions} sessions x {args.turns} turns,"
+        f" {stats['decisions']} texts in {wall:.2f} s,"
+        f" EOS model {type(planner.batcher.model).__name__}"
+    )
+    print(f"by tier: {stats['by_tier']}")
+    print(
+        f"escalated to the LLM: {stats['escalated']}"
+        f" ({stats['escalation_rate']:.1%} of all texts),"
+        f" {stats['llm_fallbacks']} fallbacks,"
+        f" LLM calls without the first tier: {stats['decisions']}"
+    )
+    print(
+        f"EOS batches: {stats['eos_batches']},"
+        f" mean size {stats['eos_batch_mean']:.1f}"
+    )
+    print(f"\n{'decision':<10} {'n':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for decision, q in stats["latency_ms"].items():
+        n = planner.latency[decision].count
+        print(f"{decision:<10} {n:>6} {q[0.5]:>8.2f} {q[0.99]:>8.2f}")
+
+    correct = sum(expected == decision for expected, decision, *_ in results)
+    print(
+        f"\nfinal transcripts: {len(results)},"
+        f" accuracy {correct / len(results):.1%}"
+    )
+    print(f"{'expected':<10} {'n':>5} {'ok':>5} {'p50 ms':>8}")
+    for label in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == label]
+        seconds = sorted(r[2] for r in rows)
+        ok = sum(r[0] == r[1] for r in rows)
+        print(
+            f"{label:<10} {len(rows):>5} {ok:>5}"
+            f" {seconds[len(seconds) // 2] * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--word-ms", type=float, default=120.0)
+    parser.add_argument("--llm-ms", type=float, default=350.0)
+    parser.add_argument("--llm-timeout-ms", type=float, default=600.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    configure_logging(level="WARNING")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,201 @@
+"""
+ResponseCache on a stream of repeated voice queries
+Utterances are drawn (Zipf) from intents said several ways, with the
+fillers ("Alma,", "euh", "stp") and case/punctuation noise of STT
+finals. A miss pays an LLM turn and TTS to first audio (--llm, --tts
+seconds, not slept), then caches the reply and its audio; a hit pays
+the lookup. Intents differing only by a page,
+a model, a negation, a city or a person are in the set, some with tool
+arguments (get_weather, sendMessage) and free text: a hit returning
+another intent's reply is a false hit, and a false hit with tool calls
+would have replayed them.
+Reports the hit rate per tier, false hits, lookup time and the mean
+time to the start of the reply.
+Run: python bench_response_cache.py --queries 2000 --embedder hashing
+"""
+
+import argparse
+import json
+import random
+import time
+
+from log_setup import configure_logging
+from response_cache import HashingEmbedder, ResponseCache, load_embedder
+
+INTENTS = {
+    "capabilities": [
+        "Qu'est-ce que tu peux faire sur cette page ?",
+        "Qu'est-ce que tu sais faire sur cette page ?",
+        "Tu peux faire quoi sur cette page ?",
+        "What can you do on this page?",
+    ],
+    "home": [
+        "Retour à l'accueil.",
+        "Ramène-moi à l'accueil.",
+        "Retourne à l'accueil s'il te plaît.",
+    ],
+    "trad": [
+        "Va sur la page traduction.",
+        "Va sur la page trad.",
+        "Ouvre la page traduction.",
+    ],
+    "scribe": [
+        "Va sur la page scribe.",
+        "Ouvre la page scribe.",
+    ],
+    "eco on": ["Active le mode éco.", "Active le mode éco s'il te plaît."],
+    "no eco": [
+        "N'active pas le mode éco.",
+        "N'active pas le mode éco s'il te plaît.",
+    ],
+    "gpt": ["Utilise GPT.", "Utilise GPT s'il te plaît.", "Passe sur GPT."],
+    "mistral": ["Utilise Mistral.", "Passe sur Mistral."],
+    "weather": [
+        "Quel temps fait-il aujourd'hui ?",
+        "Il fait quel temps aujourd'hui ?",
+    ],
+    "summary": [
+        "Fais-moi un résumé de la dernière réunion.",
+        "Résume-moi la dernière réunion.",
+        "Tu peux me faire un résumé de la dernière réunion ?",
+    ],
+    "page 2": ["Affiche la page 2 du document."],
+    "page 3": ["Affiche la page 3 du document."],
+    "weather Tokyo": [
+        "What's the weather like in Tokyo?",
+        "Quel temps fait-il à Tokyo ?",
+    ],
+    "weather Kyoto": [
+        "What's the weather like in Kyoto?",
+        "Quel temps fait-il à Kyoto ?",
+    ],
+    "weather Paris": [
+        "What's the weather like in Paris?",
+        "Quel temps fait-il à Paris ?",
+    ],
+    "message Paul": [
+        "Envoie un message à Paul pour dire que j'arrive.",
+        "Écris à Paul que j'arrive.",
+    ],
+    "message Marc": [
+        "Envoie un message à Marc pour dire que j'arrive.",
+        "Écris à Marc que j'arrive.",
+    ],
+    "message Paul late": [
+        "Envoie un message à Paul pour dire que je serai en retard.",
+    ],
+    "who Paul": ["Qui est Paul Martin ?"],
+    "who Marc": ["Qui est Marc Durand ?"],
+}
+
+# Tool calls the LLM made for the intent, replayed on a hit
+ACTIONS = {
+    "home": [("navigateToPage", {"page": "home"})],
+    "trad": [("navigateToPage", {"page": "trad"})],
+    "scribe": [("navigateToPage", {"page": "scribe"})],
+    "eco on": [("toggleEcoMode", {})],
+    "gpt": [("selectModel", {"model": "gpt"})],
+    "mistral": [("selectModel", {"model": "mistral"})],
+    "weather Tokyo": [("get_weather", {"city": "Tokyo"})],
+    "weather Kyoto": [("get_weather", {"city": "Kyoto"})],
+    "weather Paris": [("get_weather", {"city": "Paris"})],
+    "message Paul": [("sendMessage", {"to": "Paul", "text": "J'arrive"})],
+    "message Marc": [("sendMessage", {"to": "Marc", "text": "J'arrive"})],
+    "message Paul late": [
+        ("sendMessage", {"to": "Paul", "text": "Je serai en retard"})
+    ],
+}
+
+
+PREFIXES = ["", "", "", "Alma, ", "Euh ", "Dis-moi, ", "Alors "]
+SUFFIXES = ["", "", "", " s'il te plaît", " stp", " merci"]
+
+
+def noisy(text: str, rng: random.Random) -> str:
+    """STT finals differ in fillers, case and punctuation"""
+    text = rng.choice(PREFIXES) + text
+    if text[-1] in ".?!":
+        text = text[:-1].rstrip() + rng.choice(SUFFIXES) + text[-1]
+    if rng.random() < 0.3:
+        text = text.lower()
+    if rng.random() < 0.3:
+        text = text.rstrip(".?!").strip()
+    return text
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    if args.embedder == "hashing":
+        embedder = HashingEmbedder()
+    elif args.embedder == "none":
+        embedder = None
+    else:
+        embedder = load_embedder()
+    cache = ResponseCache(embedder, threshold=args.threshold, ttl=args.ttl)
+    names = list(INTENTS)
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    audio = bytes(2 * 48000)  # 1 s of PCM16, what TTS gave back
+
+    false_hits, replayed, spent = 0, 0, 0.0
+    for _ in range(args.queries):
+        intent = rng.choices(names, weights)[0]
+        text = noisy(rng.choice(INTENTS[intent]), rng)
+        start = time.perf_counter()
+        entry, how = cache.lookup(text, page="chat", catalogue="v1")
+        spent += time.perf_counter() - start
+        if entry is None:
+            spent += args.llm + args.tts
+            actions = [
+                {"name": name, "arguments": json.dumps(arguments)}
+                for name, arguments in ACTIONS.get(intent, [])
+            ]
+            entry = cache.put(
+                text,
+                reply=f"réponse {intent}",
+                actions=actions,
+                page="chat",
+                catalogue="v1",
+            )
+            cache.attach_audio(entry, audio, 48000)
+        elif entry.reply != f"réponse {intent}":
+            false_hits += 1
+            replayed += bool(entry.actions)
+
+    stats = cache.stats()
+    lookups = stats["lookups"]
+    print(
+        f"{args.queries} queries, {len(INTENTS)} intents,"
+        f" {sum(len(v) for v in INTENTS.values())} phrasings + fillers,"
+        f" embedder {type(embedder).__name__}, threshold {cache.threshold},"
+        f" {stats['semantic_entries']} of {stats['entries']} entries"
+        " in the semantic tier"
+    )
+    print(
+        f"exact {lookups.get('exact', 0)}  semantic"
+        f" {lookups.get('semantic', 0)}  miss {lookups.get('miss', 0)}"
+        f"  hit rate {stats['hit_rate']:.1%}  false hits {false_hits}"
+        f" ({replayed} with tool calls)  guard rejections {stats['rejected']}"
+    )
+    print(
+        f"lookup p50 {stats['lookup_ms'][0.5]:.3f} ms"
+        f" p99 {stats['lookup_ms'][0.99]:.3f} ms"
+    )
+    print(
+        f"time to reply start: {spent / args.queries * 1000:.0f} ms mean,"
+        f" {(args.llm + args.tts) * 1000:.0f} ms without the cache"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument(
+        "--embedder", choices=("auto", "hashing", "none"), default="auto"
+    )
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--ttl", type=float, default=600.0)
+    parser.add_argument("--llm", type=float, default=0.6)
+    parser.add_argument("--tts", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    configure_logging(level="WARNING")
+    main(parser.parse_args())
@@ -0,0 +1,161 @@
+"""
+Micro-benchmark: StreamAccumulator vs the old in-loop accumulation
+Replays synthetic long streams (text deltas plus tool_calls deltas) the
+way the OpenAI SDK yields them, no network involved.
+Run: python bench_stream_accumulator.py --tokens 20000 --tools 3
+"""
+
+import argparse
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from stream_accumulator import StreamAccumulator
+
+
+def synthetic_stream(n_tokens: int, n_tools: int, args_tokens: int = 40):
+    """Chunks shaped like openai ChatCompletionChunk objects"""
+    chunks = []
+    for i in range(n_tokens):
+        delta = SimpleNamespace(content=f"tok{i % 97} ", tool_calls=None)
+        choice = SimpleNamespace(delta=delta, finish_reason=None)
+        chunks.append(SimpleNamespace(choices=[choice]))
+
+    for idx in range(n_tools):
+        for j in range(args_tokens):
+            first = j == 0
+            tc = SimpleNamespace(
+                index=idx,
+                id=f"call_{idx}" if first else None,
+                function=SimpleNamespace(
+                    name="navigateToPage" if first else None,
+                    arguments='{"page": "' if first else "x",
+                ),
+            )
+            delta = SimpleNamespace(content=None, tool_calls=[tc])
+            choice = SimpleNamespace(delta=delta, finish_reason=None)
+            chunks.append(SimpleNamespace(choices=[choice]))
+        tc = SimpleNamespace(
+            index=idx,
+            id=None,
+            function=SimpleNamespace(name=None, arguments='"}'),
+        )
+        delta = SimpleNamespace(content=None, tool_calls=[tc])
+        choice = SimpleNamespace(delta=delta, finish_reason=None)
+        chunks.append(SimpleNamespace(choices=[choice]))
+    return chunks
+
+
+def legacy_accumulate(stream):
+    """What the clients used to do inside stream_chat_with_tools"""
+    full_content = ""
+    tool_calls_data = {}
+    for chunk in stream:
+        delta = chunk.choices[0].delta
+        if delta.content:
+            full_content += delta.content
+        if delta.tool_calls:
+            for tc in delta.tool_calls:
+                idx = tc.index
+                tool_calls_data.setdefault(
+                    idx,
+                    {
+                        "id": "",
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    },
+                )
+                if tc.id:
+                    tool_calls_data[idx]["id"] = tc.id
+                if tc.function.name:
+                    tool_calls_data[idx]["function"]["name"] = tc.function.name
+                if tc.function.arguments:
+                    tool_calls_data[idx]["function"]["arguments"] += (
+                        tc.function.arguments
+                    )
+
+    tool_calls_list = (
+        [tool_calls_data[i] for i in sorted(tool_calls_data.keys())]
+        if tool_calls_data
+        else None
+    )
+    message = {
+        "role": "assistant",
+        "content": full_content or None,
+        "tool_calls": tool_calls_list,
+    }
+
+    class ToolCall:
+        def __init__(self, d):
+            self.id = d["id"]
+            self.type = d["type"]
+            self.function = type(
+                "Function",
+                (),
+                {
+                    "name": d["function"]["name"],
+                    "arguments": d["function"]["arguments"],
+                },
+            )()
+
+    tool_objects = [ToolCall(tc) for tc in tool_calls_list or []]
+    return message, tool_objects
+
+
+def accumulator_accumulate(stream):
+    acc = StreamAccumulator()
+    for chunk in stream:
+        acc.add_chunk(chunk)
+    tool_calls = acc.tool_calls_list()
+    return acc.to_message(), tool_calls
+
+
+def bench(fn, stream, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(stream)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def peak_memory(fn, stream) -> int:
+    tracemalloc.start()
+    result = fn(stream)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main(n_tokens: int, n_tools: int, repeat: int):
+    print(
+        f"{'tokens':>8} {'legacy ms':>10} {'accum ms':>10} {'speedup':>8}"
+        f" {'legacy KB':>10} {'accum KB':>10}"
+    )
+    for scale in (0.01, 0.1, 1.0):
+        tokens = max(1, int(n_tokens * scale))
+        stream = synthetic_stream(tokens, n_tools)
+
+        legacy_msg, _ = legacy_accumulate(stream)
+        acc_msg, _ = accumulator_accumulate(stream)
+        assert legacy_msg == acc_msg, "accumulators disagree"
+
+        t_legacy = bench(legacy_accumulate, stream, repeat)
+        t_acc = bench(accumulator_accumulate, stream, repeat)
+        m_legacy = peak_memory(legacy_accumulate, stream)
+        m_acc = peak_memory(accumulator_accumulate, stream)
+        print(
+            f"{tokens:>8} {t_legacy * 1000:>10.2f} {t_acc * 1000:>10.2f} "
+            f"{t_legacy / t_acc:>7.2f}x"
+            f" {m_legacy / 1024:>10.1f} {m_acc / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--tools", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.tokens, args.tools, args.repeat)
@@ -0,0 +1,166 @@
+"""
+Load test of the streaming tool-calling loop (stream_chat_with_tools)
+Runs many concurrent conversations of mcp-client-http.py against
+mock_llm_server.py and mcp-server-http.py, and reports tool-loop
+iterations per second and conversation latency percentiles.
+Install: pip install openai aiohttp aiohttp-sse mcp
+Run: python bench_tool_loop.py --spawn --conversations 2000 --concurrency 500
+Without --spawn, start the two servers yourself (ports 8000 and 3000).
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+import aiohttp
+
+PROMPTS = [
+    "Open the docs page",
+    "Switch the model please",
+    "Turn on eco mode",
+    "Show my memory profile",
+    "Do everything at once",
+    "Bonjour Alma",
+]
+
+
+def load_client(llm_url: str):
+    # The OpenAI SDK reads these when mcp-client-http.py builds its client
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ.setdefault("ALMA_LOG_LEVEL", "WARNING")
+    spec = importlib.util.spec_from_file_location(
+        "mcp_client_http", "mcp-client-http.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def wait_ready(url: str, timeout: float = 15.0):
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url):
+                    return
+            except aiohttp.ClientError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+def spawn_servers(profile: str):
+    env = dict(os.environ, ALMA_LOG_LEVEL="WARNING")
+    return [
+        subprocess.Popen(
+            [sys.executable, "mock_llm_server.py", "--profile", profile],
+            env=env,
+        ),
+        subprocess.Popen([sys.executable, "mcp-server-http.py"], env=env),
+    ]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run(args):
+    client_module = load_client(args.llm_url)
+
+    # Count LLM round trips and tool executions without touching the loop
+    counts = {"iterations": 0, "tools": 0}
+    completions = client_module.openai_client.chat.completions
+    create = completions.create
+    process_tool_calls = client_module.process_tool_calls
+
+    async def counting_create(*a, **kw):
+        counts["iterations"] += 1
+        return await create(*a, **kw)
+
+    async def counting_process(client, tool_calls):
+        counts["tools"] += len(tool_calls)
+        return await process_tool_calls(client, tool_calls)
+
+    completions.create = counting_create
+    client_module.process_tool_calls = counting_process
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def conversation(i: int, client):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client_module.stream_chat_with_tools(
+                    client, PROMPTS[i % len(PROMPTS)]
+                )
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    async with client_module.MCPHTTPClient(args.mcp_url) as client:
+        # stream_chat_with_tools prints the streamed text, keep it quiet
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(conversation(i, client) for i in range(args.conversations))
+            )
+            wall = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{args.conversations} conversations, concurrency {args.concurrency},"
+        f" {errors} errors, wall {wall:.2f} s"
+    )
+    print(
+        f"conversations/s {len(latencies) / wall:8.1f}\n"
+        f"iterations/s    {counts['iterations'] / wall:8.1f}"
+        f"  ({counts['iterations'] / max(1, len(latencies)):.2f} per turn)\n"
+        f"tool calls/s    {counts['tools'] / wall:8.1f}"
+    )
+    if latencies:
+        print(
+            "latency ms      "
+            f"p50 {percentile(latencies, 0.50) * 1000:.0f}  "
+            f"p95 {percentile(latencies, 0.95) * 1000:.0f}  "
+            f"p99 {percentile(latencies, 0.99) * 1000:.0f}  "
+            f"max {latencies[-1] * 1000:.0f}  "
+            f"mean {statistics.fmean(latencies) * 1000:.0f}"
+        )
+
+
+async def main(args):
+    servers = spawn_servers(args.profile) if args.spawn else []
+    try:
+        await wait_ready(args.llm_url.rsplit("/v1", 1)[0] + "/stats")
+        await wait_ready(args.mcp_url + "/health")
+        await run(args)
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--llm-url", default="http://localhost:8000/v1")
+    parser.add_argument("--mcp-url", default="http://localhost:3000")
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="start mock_llm_server.py and mcp-server-http.py",
+    )
+    parser.add_argument("--profile", default="openai")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,130 @@
+"""
+Azure-like recognizing/recognized streams through TranscriptAccumulator
+Each utterance arrives as growing hypotheses, one word at a time, with
+the last word sometimes misheard then corrected and some hypotheses
+repeated. Some utterances pause after an unfinished segment, so Azure
+closes it with a final of its own: it is held and merged with the next
+one, as stream_voice_clean.py does. The client side rebuilds the text
+from the deltas alone and is checked against every hypothesis.
+Reports bytes on text-out before (whole hypothesis per event) and after,
+the events and characters downstream stages still get, and the cost.
+Run: python bench_transcript_accumulator.py --utterances 2000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from planner import INCOMPLETE_BELOW, PunctuationEOS
+from transcript_accumulator import TranscriptAccumulator
+
+SENTENCES = [
+    "quelle est la météo demain à Paris",
+    "explique-moi comment marche la facturation de mon abonnement",
+    "je voudrais réserver une table pour quatre personnes ce soir",
+    "envoie un message à Camille pour lui dire que je serai en retard",
+    "ferme la fenêtre des paramètres",
+    "est-ce que tu peux me rappeler demain matin à huit heures",
+]
+# Pause after the first segment: Azure finalizes each half on its own
+SPLIT = [
+    ("je voudrais savoir pour", "le vol de demain matin"),
+    ("donne-moi la liste des", "réunions de la semaine prochaine"),
+    ("rappelle-moi que", "je dois appeler le garage"),
+]
+MISHEARD = {"météo": "mets", "facturation": "facture", "réserver": "réserve"}
+
+
+def hypotheses(segment: str, rng: random.Random):
+    """The recognizing texts Azure would fire for one segment"""
+    words = segment.split()
+    for n in range(1, len(words) + 1):
+        last = words[n - 1]
+        if last in MISHEARD and rng.random() < 0.5:
+            yield " ".join(words[: n - 1] + [MISHEARD[last]])
+        text = " ".join(words[:n])
+        yield text
+        if rng.random() < 0.15:
+            yield text  # same hypothesis again
+
+
+def main(args):
+    rng = random.Random(0)
+    accumulator = TranscriptAccumulator()
+    eos = PunctuationEOS()
+    client = ""  # rebuilt from the data channel messages only
+    mismatches = 0
+
+    def receive(delta):
+        keep, text, *final = json.loads(delta.to_json())
+        return client[:keep] + text
+
+    events = 0
+    elapsed = 0.0
+    for _ in range(args.utterances):
+        if rng.random() < args.split:
+            segments = rng.choice(SPLIT)
+        else:
+            segments = (rng.choice(SENTENCES),)
+        for segment in segments:
+            for text in hypotheses(segment, rng):
+                events += 1
+                start = time.perf_counter()
+                delta = accumulator.partial("s", text)
+                elapsed += time.perf_counter() - start
+                if delta is not None:
+                    client = receive(delta)
+                    mismatches += client != delta.full
+            text = segment[0].upper() + segment[1:] + "."
+            start = time.perf_counter()
+            delta = accumulator.final("s", text)
+            elapsed += time.perf_counter() - start
+            events += 1
+            client = receive(delta)
+            mismatches += client != delta.full
+            # The recognizer adds the period, an incomplete final keeps
+            # its trailing word; the planner sees the merged text
+            if eos.predict([segment])[0] <= INCOMPLETE_BELOW:
+                accumulator.hold("s")
+            else:
+                accumulator.commit("s")
+
+    stats = accumulator.stats()
+    print(
+        f"{args.utterances} utterances, {events} recognizer events:"
+        f" {stats['partials']} partials, {stats['finals']} finals"
+    )
+    print(
+        f"downstream events: {events} -> {stats['deltas']}"
+        f" ({stats['duplicates']} repeated hypotheses dropped)"
+    )
+    print(
+        f"text-out bytes: {stats['full_bytes']} -> {stats['delta_bytes']}"
+        f" ({1 - stats['byte_ratio']:.1%} saved)"
+    )
+    print(
+        f"characters downstream: {stats['full_chars']} ->"
+        f" {stats['delta_chars']}"
+        f" ({1 - stats['delta_chars'] / stats['full_chars']:.1%} saved)"
+    )
+    print(
+        f"finals merged with a held fragment: {stats['merged_finals']}"
+        f" (second halves the planner would otherwise see on their own)"
+    )
+    print(
+        f"cost: {elapsed / events * 1e6:.2f} us per event,"
+        f" client rebuild mismatches: {mismatches}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument(
+        "--split",
+        type=float,
+        default=0.2,
+        help="share of utterances with a pause mid-sentence",
+    )
+    main(parser.parse_args())
@@ -0,0 +1,295 @@
+"""
+Offline end-to-end voice pipeline benchmark, no cloud endpoints
+Replays a WAV file (like local_example_voice.py reads recording.wav)
+as processor.js float32 quanta through the real AudioIngest path, into
+voice_stubs FakeRecognizer -> FakeLLM -> FakeTTS, for N sessions at once.
+Spans come from turn_tracing, same definitions as /metrics.
+--vad puts vad.VADGate in front of the recognizer, speech start (and
+barge-in) then comes from the local VAD, and the suppressed fraction and
+VAD CPU per stream are reported.
+--stt-sr sets the recognizer rate (negotiated one by default), --frames
+sends processor.js pcm16 frames at that rate instead of float32 quanta,
+and --uplink-mbps shares a limited server -> STT link between sessions.
+Run: python bench_voice_pipeline.py --sessions 20 --wav recording.wav
+Without --wav (or if the file is missing) a synthetic 3-utterance clip
+is used, so runs are reproducible anywhere.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import wave
+
+import numpy as np
+
+from audio_ingest import FRAME_HEADER, AudioIngest, negotiate_sample_rate
+from log_setup import configure_logging
+from turn_tracing import SPANS, SpanHistogram, TurnTracer
+from vad import VADGate, load_turn_detection
+from voice_stubs import (
+    FakeLLM,
+    FakePushAudioInputStream,
+    FakeRecognizer,
+    FakeTTS,
+    Uplink,
+)
+
+INPUT_SR = 48000  # browser AudioContext rate, input_sample_rate
+QUANTUM = 128  # samples per processor.js message
+
+
+def load_wav(path: str) -> np.ndarray:
+    """Mono float32 at INPUT_SR, what the browser would send"""
+    with wave.open(path, "rb") as wav_file:
+        n_channels = wav_file.getnchannels()
+        samp_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        pcm_bytes = wav_file.readframes(wav_file.getnframes())
+    if samp_width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+
+    audio = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32)
+    audio = audio.reshape(-1, n_channels).mean(axis=1) / 32768
+    if sample_rate != INPUT_SR:
+        from scipy.signal import resample_poly
+
+        audio = resample_poly(audio, INPUT_SR, sample_rate)
+    return audio.astype(np.float32)
+
+
+def synthetic_clip(utterances: int = 3, seed: int = 0) -> np.ndarray:
+    """Voiced bursts (1.2 s) separated by silence (2.5 s), seeded"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(1.2 * INPUT_SR)) / INPUT_SR
+    parts = [np.zeros(int(0.5 * INPUT_SR), dtype=np.float32)]
+    for _ in range(utterances):
+        voice = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 220) * t)
+        voice *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)  # syllables
+        parts.append(voice.astype(np.float32))
+        parts.append(np.zeros(int(2.5 * INPUT_SR), dtype=np.float32))
+    clip = np.concatenate(parts)
+    # Room noise floor, well under FakeRecognizer's threshold
+    clip += rng.normal(0, 0.002, len(clip)).astype(np.float32)
+    return clip
+
+
+def pcm16_frames(audio: np.ndarray, rate: int = 16000, frame_ms: int = 20):
+    """processor.js pcm16 mode: boxcar-decimate, int16, header, 20 ms"""
+    step = INPUT_SR // rate
+    down = audio[: len(audio) // step * step].reshape(-1, step).mean(axis=1)
+    pcm = (np.clip(np.nan_to_num(down), -1, 1) * 32767).astype(np.int16)
+    n = rate * frame_ms // 1000
+    messages = []
+    for seq, i in enumerate(range(0, len(pcm) - n + 1, n)):
+        header = FRAME_HEADER.pack(seq, seq * frame_ms, rate, n)
+        messages.append(header + pcm[i : i + n].tobytes())
+    return messages
+
+
+class Session:
+    """One simulated peer: ingest -> STT -> LLM -> TTS -> player"""
+
+    def __init__(self, args, histograms, uplink=None):
+        self.args = args
+        self.tracer = TurnTracer(histograms)
+        self.push_stream = FakePushAudioInputStream(uplink)
+        self.recognizer = FakeRecognizer(
+            self.push_stream,
+            sample_rate=args.stt_sr,
+            final_delay=args.stt_delay,
+        )
+        self.vad = None
+        if args.vad:
+            self.vad = VADGate(
+                self.push_stream, args.stt_sr, **load_turn_detection()
+            )
+            self.vad.on_speech_start(self.on_speech_start)
+            self.ingest = AudioIngest(self.vad, INPUT_SR, args.stt_sr)
+        else:
+            self.recognizer.speech_start_detected.connect(self.on_speech_start)
+            self.ingest = AudioIngest(self.push_stream, INPUT_SR, args.stt_sr)
+        self.llm = FakeLLM(ttft=args.ttft, tps=args.tps)
+        self.tts = FakeTTS(rtf=args.rtf, first_byte=args.tts_first_byte)
+        self.reply_task = None
+        self.ingest_seconds = 0.0
+        self.turns_done = 0
+        self.barge_ins = 0
+
+        self.recognizer.recognized.connect(self.on_recognized)
+
+    def on_speech_start(self, evt=None):
+        self.tracer.speech_started()
+        if self.reply_task is not None and not self.reply_task.done():
+            self.reply_task.cancel()
+            self.tracer.barge_in()
+            self.barge_ins += 1
+
+    def on_recognized(self, evt):
+        turn = self.tracer.start_turn(
+            self.ingest.clock.since(evt.result.offset + evt.result.duration)
+        )
+        self.reply_task = asyncio.create_task(self.reply(turn))
+
+    async def reply(self, turn):
+        text_queue: asyncio.Queue = asyncio.Queue()
+
+        async def llm():
+            turn.llm_started()
+            stream = await self.llm.chat.completions.create(stream=True)
+            async for chunk in stream:
+                turn.llm_token()
+                if chunk.choices[0].delta.content:
+                    text_queue.put_nowait(chunk.choices[0].delta.content)
+            turn.llm_finished()
+            text_queue.put_nowait(None)
+
+        async def text_stream():
+            while (text := await text_queue.get()) is not None:
+                yield text
+
+        llm_task = asyncio.create_task(llm())
+        try:
+            async for _ in self.tts.synthesize(text_stream()):
+                turn.tts_audio()
+                # The player takes the chunk as soon as it exists
+                turn.mark("first_audio")
+            turn.tts_stopped()
+            self.turns_done += 1
+        finally:
+            llm_task.cancel()
+
+    async def run(self, audio: np.ndarray):
+        self.recognizer.start_continuous_recognition()
+        if self.args.frames:
+            messages = pcm16_frames(audio, self.args.stt_sr)
+            handler, seconds_each, batch = self.ingest.on_frame, 0.02, 1
+        else:
+            messages = [
+                audio[i : i + QUANTUM].tobytes()
+                for i in range(0, len(audio), QUANTUM)
+            ]
+            handler, seconds_each = self.ingest.on_message, QUANTUM / INPUT_SR
+            # Pace in 20 ms batches, like the browser's message cadence
+            batch = max(1, int(0.02 * INPUT_SR) // QUANTUM)
+        start = time.perf_counter()
+        for i in range(0, len(messages), batch):
+            t0 = time.perf_counter()
+            for message in messages[i : i + batch]:
+                handler(message)
+            self.ingest_seconds += time.perf_counter() - t0
+            if self.args.realtime:
+                due = start + (i + batch) * seconds_each
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            else:
+                await asyncio.sleep(0)
+
+        # Let the last final and reply play out
+        await asyncio.sleep(self.args.stt_delay + 0.05)
+        if self.reply_task is not None:
+            await asyncio.gather(self.reply_task, return_exceptions=True)
+        if self.tracer.current is not None:
+            self.tracer.current.finish()
+        self.recognizer.stop_continuous_recognition()
+
+
+async def main(args):
+    if args.wav and os.path.exists(args.wav):
+        audio = load_wav(args.wav)
+        source = args.wav
+    else:
+        audio = synthetic_clip()
+        source = "synthetic clip"
+    audio_seconds = len(audio) / INPUT_SR
+
+    histograms = {span: SpanHistogram() for span in SPANS}
+    uplink = Uplink(args.uplink_mbps) if args.uplink_mbps else None
+    sessions = [
+        Session(args, histograms, uplink) for _ in range(args.sessions)
+    ]
+
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(session.run(audio) for session in sessions))
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+
+    started = sum(session.tracer.turns_total for session in sessions)
+    turns = sum(session.turns_done for session in sessions)
+    barge_ins = sum(session.barge_ins for session in sessions)
+    ingest = sum(session.ingest_seconds for session in sessions)
+    chunks = sum(session.ingest.chunks for session in sessions)
+    print(
+        f"{source}: {audio_seconds:.1f} s audio x {args.sessions} sessions"
+        f" ({'real time' if args.realtime else 'as fast as possible'})"
+    )
+    print(
+        f"wall {wall:.2f} s  cpu {cpu:.2f} s  turns {started} started,"
+        f" {turns} completed ({turns / wall:.1f}/s), {barge_ins} barged in"
+    )
+    print(
+        f"ingest {chunks} chunks, {ingest / chunks * 1e6:.1f} us/chunk,"
+        f" {audio_seconds * args.sessions / ingest:,.0f}x real time"
+    )
+    upstream = sum(session.push_stream.bytes for session in sessions)
+    print(
+        f"upstream to STT at {args.stt_sr} Hz:"
+        f" {upstream / (audio_seconds * args.sessions) / 1000:.1f} kB/s"
+        f" per stream, {upstream * 8 / audio_seconds / 1e6:.2f} Mbps total"
+        + (f" on a {args.uplink_mbps} Mbps uplink" if args.uplink_mbps else "")
+    )
+    if args.vad:
+        vads = [session.vad for session in sessions]
+        frames = sum(vad.frames for vad in vads)
+        vad_cpu = sum(vad.cpu_seconds for vad in vads)
+        print(
+            f"vad {sum(v.suppressed for v in vads) / len(vads):.0%} of audio"
+            f" suppressed, {vad_cpu / frames * 1e6:.1f} us/frame,"
+            f" {vad_cpu / (audio_seconds * args.sessions):.2%} of a core"
+            " per stream"
+        )
+    print(f"\n{'span':<16} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for span, hist in histograms.items():
+        q = hist.quantiles()
+        if not q:
+            continue
+        print(
+            f"{span:<16} {hist.count:>5} {q[0.5] * 1000:>8.1f}"
+            f" {q[0.95] * 1000:>8.1f} {q[0.99] * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wav", default="recording.wav")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument(
+        "--fast",
+        dest="realtime",
+        action="store_false",
+        help="push audio as fast as possible instead of in real time",
+    )
+    parser.add_argument(
+        "--vad", action="store_true", help="gate the recognizer input"
+    )
+    parser.add_argument(
+        "--stt-sr", type=int, default=negotiate_sample_rate("fake", INPUT_SR)
+    )
+    parser.add_argument(
+        "--frames",
+        action="store_true",
+        help="send pcm16 frames at --stt-sr instead of float32 quanta",
+    )
+    parser.add_argument(
+        "--uplink-mbps",
+        type=float,
+        default=0.0,
+        help="server -> STT bandwidth shared by all sessions, 0 = no limit",
+    )
+    parser.add_argument("--stt-delay", type=float, default=0.15)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=80.0)
+    parser.add_argument("--rtf", type=float, default=0.2)
+    parser.add_argument("--tts-first-byte", type=float, default=0.08)
+    args = parser.parse_args()
+
+    configure_logging(level="WARNING")
+    asyncio.run(main(args))
@@ -0,0 +1,169 @@
+"""
+Sessions per box vs worker processes, through voice_supervisor routing
+Each worker runs bench_app: /offer starts a bench_voice_pipeline Session
+(float32 quanta in real time -> AudioIngest -> FakeRecognizer -> FakeLLM
+-> FakeTTS) instead of an aiortc peer, and a 10 ms ticker measures the
+worker's event loop lag. For 1..--max-workers workers, offers are sent
+through Supervisor.route in growing batches; a batch is sustained while
+every worker's loop lag p95 stays under --max-lag-ms (one audio frame).
+Run: python bench_voice_supervisor.py --max-workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from bench_voice_pipeline import INPUT_SR, Session, synthetic_clip
+from turn_tracing import SPANS, SpanHistogram
+from voice_supervisor import Supervisor, add_load_route
+
+SESSION_ARGS = argparse.Namespace(
+    stt_sr=16000,
+    stt_delay=0.15,
+    vad=False,
+    frames=False,
+    realtime=True,
+    ttft=0.3,
+    tps=80.0,
+    rtf=0.2,
+    tts_first_byte=0.08,
+)
+CLIP = synthetic_clip(utterances=1)
+
+
+class LoopLag:
+    """Lateness of a 10 ms sleep, reset on every read"""
+
+    def __init__(self, period: float = 0.01):
+        self.period = period
+        self.samples = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.period)
+            self.samples.append(time.perf_counter() - start - self.period)
+
+    def take(self) -> dict:
+        samples, self.samples = np.array(self.samples or [0.0]), []
+        return {
+            "p95_ms": float(np.percentile(samples, 95) * 1000),
+            "max_ms": float(samples.max() * 1000),
+        }
+
+
+def create_bench_app():
+    from fastapi import FastAPI
+
+    lag = LoopLag()
+    sessions = set()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(lag.run())
+        yield
+        task.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+    add_load_route(app, sessions)
+
+    @app.post("/offer")
+    async def offer(params: dict):
+        histograms = {span: SpanHistogram() for span in SPANS}
+        session = Session(SESSION_ARGS, histograms)
+        sessions.add(session)
+        task = asyncio.create_task(session.run(CLIP))
+        task.add_done_callback(lambda _: sessions.discard(session))
+        return {"sdp": "", "type": "answer", "pid": os.getpid()}
+
+    @app.get("/lag")
+    async def loop_lag():
+        return lag.take()
+
+    return app
+
+
+bench_app = create_bench_app()
+
+
+def usable_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+async def sustained(supervisor: Supervisor, sessions: int, max_lag: float):
+    client = supervisor._client
+    for worker in supervisor.workers:
+        await client.get(worker.url + "/lag")  # reset
+    answers = await asyncio.gather(
+        *(
+            supervisor.route({"sdp": "", "type": "offer"})
+            for _ in range(sessions)
+        )
+    )
+    await asyncio.sleep(len(CLIP) / INPUT_SR + 1.0)
+    lags = [
+        (await client.get(worker.url + "/lag")).json()
+        for worker in supervisor.workers
+    ]
+    worst = max(lag["p95_ms"] for lag in lags)
+    spread = len({answer["pid"] for answer in answers})
+    ok = worst < max_lag
+    print(
+        f"  {sessions:4d} sessions on {spread} workers:"
+        f" worst loop lag p95 {worst:6.1f} ms {'ok' if ok else 'overloaded'}"
+    )
+    return ok
+
+
+async def capacity(workers: int, args) -> int:
+    supervisor = Supervisor(
+        "bench_voice_supervisor:bench_app", workers, args.base_port
+    )
+    await supervisor.start()
+    best, sessions = 0, args.step * workers
+    try:
+        while sessions <= args.max_sessions:
+            if not await sustained(supervisor, sessions, args.max_lag_ms):
+                break
+            best = sessions
+            sessions += args.step * workers
+    finally:
+        await supervisor.stop()
+    return best
+
+
+async def main(args):
+    print(
+        f"{usable_cores()} usable cores, {len(CLIP) / INPUT_SR:.1f} s sessions,"
+        f" loop lag budget {args.max_lag_ms} ms"
+    )
+    results = {}
+    for workers in range(1, args.max_workers + 1):
+        print(f"{workers} worker(s)")
+        results[workers] = await capacity(workers, args)
+    print(
+        f"\n{'workers':>7} {'sessions':>9} {'per worker':>11} {'scaling':>8}"
+    )
+    for workers, sessions in results.items():
+        print(
+            f"{workers:>7} {sessions:>9} {sessions / workers:>11.1f}"
+            f" {sessions / max(results[1], 1):>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=usable_cores())
+    parser.add_argument(
+        "--step", type=int, default=4, help="sessions added per worker"
+    )
+    parser.add_argument("--max-sessions", type=int, default=400)
+    parser.add_argument("--max-lag-ms", type=float, default=20.0)
+    parser.add_argument("--base-port", type=int, default=8100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,256 @@
+"""
+_ultdir_ path: UI commands straight to MCP tool calls, no LLM, no TTS
+A command PLANNER_AGENT marks _ultdir_ ("ferme la mémoire", "active le
+mode éco", "va sur la page traduction") is matched against COMMANDS and
+the tool is called right away on the session's MCP ClientSession, not
+queued behind its LLM turns. An earcon confirms it (or tells it failed)
+instead of a spoken sentence. Anything not in the table goes on to AMNGR
+and the usual agent path.
+Earcons on the data channel: {"type": "earcon", "name": "ok" | "error"},
+earcon_pcm() is the same sound for servers playing audio themselves.
+"""
+
+import asyncio
+import inspect
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+import numpy as np
+
+from turn_tracing import SpanHistogram
+
+logger = logging.getLogger("direct-actions")
+
+# navigateToPage / displayMemoryManager / selectModel enums in
+# mcp-server-http.py, by what people say
+PAGES = {
+    "accueil": "home",
+    "home": "home",
+    "chat": "chat",
+    "explore": "explore",
+    "exploration": "explore",
+    "scribe": "scribe",
+    "trad": "trad",
+    "traduction": "trad",
+    "recap": "recap",
+    "récap": "recap",
+    "docs": "docs",
+    "documents": "docs",
+    "actu": "actu",
+    "actualités": "actu",
+    "news": "actu",
+}
+MEMORY_CATEGORIES = {
+    "entreprise": "companyProfile",
+    "company": "companyProfile",
+    "profil": "userProfile",
+    "profile": "userProfile",
+    "communication": "communication",
+    "tâches": "tasks",
+    "tasks": "tasks",
+    "historique": "history",
+    "history": "history",
+    "contacts": "contacts",
+}
+MODELS = {
+    "mistral": "mistral-large",
+    "gpt": "gpt-4o",
+    "llama": "llama-3-70b-instruct",
+    "claude": "claude-3.7-sonnet",
+    "gemini": "google/gemini-1.5-pro-002",
+}
+
+
+def _lookup(table: Dict[str, str], text: str, default=None):
+    for word, value in table.items():
+        if re.search(rf"\b{word}\b", text):
+            return value
+    return default
+
+
+# Between a verb and its object: "la page", "à l'", "le mode"
+GAP = r"(?: \S+){0,3} "
+PAGE_WORDS = (
+    r" ?(?:(?:sur|à|a|au|vers|dans|to|back|on|the|la|le|les|l'|mes|my"
+    r"|page|de|d')\s*)*"
+)
+# "ne ferme pas", "je ne veux pas de nouveau chat": never a command
+NEGATED = re.compile(r"(\b(ne|pas|jamais|not|never|don't)\b|\bn')")
+
+# (pattern, tool, arguments from the text), first match wins. Each is
+# anchored on the verb: "va savoir pourquoi le chat..." is not a command
+COMMANDS: List[Tuple[Pattern, str, Callable[[str], Dict[str, Any]]]] = [
+    (
+        re.compile(r"^(ferme|close)\b" + GAP + r"(m[ée]moire|memory)\b"),
+        "closeMemoryManager",
+        lambda text: {},
+    ),
+    (
+        re.compile(
+            r"^(affiche|ouvre|montre|show|open|display)\b"
+            + GAP
+            + r"(m[ée]moire|memory)\b"
+        ),
+        "displayMemoryManager",
+        lambda text: {
+            "category": _lookup(MEMORY_CATEGORIES, text, "memoryItems")
+        },
+    ),
+    (
+        re.compile(
+            r"^(active|d[ée]sactive|bascule|mets|enable|disable|toggle"
+            r"|turn (on|off))\b" + GAP + r"(mode [ée]co|eco mode)\b"
+        ),
+        "toggleEcoMode",
+        lambda text: {},
+    ),
+    (
+        re.compile(
+            r"^(cr[ée]e|ouvre|lance|d[ée]marre|commence|start|open|create)"
+            r"( (une|un|a))? (nouvelle conversation|nouveau chat"
+            r"|new (chat|conversation))\b"
+        ),
+        "createNewChat",
+        lambda text: {},
+    ),
+    (
+        re.compile(
+            r"^(r[ée]g[ée]n[èe]re|redemande|relance|regenerate|retry)\b"
+        ),
+        "refreshAssistantMessage",
+        lambda text: {},
+    ),
+    (
+        re.compile(
+            r"^(utilise|choisis|prends|passe (sur|à)|use|switch to)\b"
+            + GAP
+            + r"(mistral|gpt|llama|claude|gemini)"
+        ),
+        "selectModel",
+        lambda text: {"modelName": _lookup(MODELS, text)},
+    ),
+    (
+        re.compile(
+            r"^(va|aller|ouvre|affiche|retourne|retour|ramène-moi|go|open"
+            r"|show)\b" + PAGE_WORDS + r"\b(" + "|".join(PAGES) + r")\b"
+        ),
+        "navigateToPage",
+        lambda text: {"page": _lookup(PAGES, text)},
+    ),
+]
+
+
+class DirectAction:
+    __slots__ = ("tool", "arguments", "text", "ok", "result", "seconds")
+
+    def __init__(self, tool: str, arguments: Dict[str, Any], text: str):
+        self.tool = tool
+        self.arguments = arguments
+        self.text = text
+        self.ok = False
+        self.result = None
+        self.seconds = 0.0
+
+
+def match_action(text: str) -> Optional[DirectAction]:
+    """The tool call for a recognized command, None if it is not one"""
+    words = " ".join(re.sub(r"[^\w' -]+", " ", text.lower()).split())
+    if NEGATED.search(words):
+        return None
+    for pattern, tool, arguments in COMMANDS:
+        if pattern.search(words):
+            return DirectAction(tool, arguments(words), text)
+    return None
+
+
+@lru_cache(maxsize=8)
+def earcon_pcm(name: str = "ok", sample_rate: int = 48000) -> bytes:
+    """Two 70 ms notes, rising for ok, falling for error, PCM16 mono"""
+    notes = (880.0, 1320.0) if name == "ok" else (440.0, 330.0)
+    n = int(0.07 * sample_rate)
+    t = np.arange(n) / sample_rate
+    fade = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.005)
+    tone = np.concatenate([np.sin(2 * np.pi * f * t) * fade for f in notes])
+    return (tone * 0.3 * 32767).astype(np.int16).tobytes()
+
+
+class DirectActions:
+    """
+    get_session(scope) -> the scope's MCP ClientSession, or None while it
+    is not up; play_earcon(scope, "ok" | "error"), may be a coroutine
+    """
+
+    def __init__(
+        self,
+        get_session: Callable[[Any], Any],
+        play_earcon: Callable[[Any, str], Any],
+        timeout: float = 2.0,
+    ):
+        self.get_session = get_session
+        self.play_earcon = play_earcon
+        self.timeout = timeout
+
+        # Stats
+        self.latency = SpanHistogram()
+        self.by_tool: Counter = Counter()
+        self.passed = 0  # not a known command, or no session
+        self.failed = 0
+
+    async def execute(self, scope, text: str) -> Optional[DirectAction]:
+        """Run the command in text, None if the caller should go on"""
+        start = time.perf_counter()
+        action = match_action(text)
+        session = self.get_session(scope) if action is not None else None
+        if session is None:
+            self.passed += 1
+            return None
+        try:
+            action.result = await asyncio.wait_for(
+                session.call_tool(action.tool, action.arguments),
+                self.timeout,
+            )
+            action.ok = not getattr(action.result, "isError", False)
+        except Exception as e:
+            logger.warning("%s failed: %r", action.tool, e)
+        if not action.ok:
+            self.failed += 1
+        played = self.play_earcon(scope, "ok" if action.ok else "error")
+        if inspect.isawaitable(played):
+            await played
+        action.seconds = time.perf_counter() - start
+        self.latency.observe(action.seconds)
+        self.by_tool[action.tool] += 1
+        logger.info(
+            "%s %s in %.0f ms",
+            action.tool,
+            "done" if action.ok else "failed",
+            action.seconds * 1000,
+        )
+        return action
+
+    async def handle(self, turn: Dict[str, Any], ctx=None):
+        """pipeline_graph handler for _ultdir_, unknown commands go on"""
+        action = await self.execute(ctx.scope, turn["text"])
+        return None if action is not None else turn
+
+    def attach(self, graph, concurrency: int = 64):
+        return graph.set_handler(
+            "_ultdir_",
+            self.handle,
+            router=lambda turn: "AMNGR",
+            concurrency=concurrency,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": dict(self.by_tool),
+            "passed": self.passed,
+            "failed": self.failed,
+            "latency_ms": {
+                q: v * 1000 for q, v in self.latency.quantiles().items()
+            },
+        }
@@ -3,12 +3,16 @@ import os
 import json
 import asyncio
 import subprocess
-import time
 import openai
 import websockets
 from dotenv import load_dotenv
 from groq import Groq
 
+from log_setup import configure_logging
+from turn_tracing import tracer
+
+configure_logging()
+
 load_dotenv()
 VOICE_ID = "FvmvwvObRqIHojkEGh5N"  # Change to your preferred voice
 MODEL_ID = "eleven_flash_v2_5"
@@ -67,23 +71,18 @@ async def end_conversation(websocket):
     await websocket.send(json.dumps({"close_socket": True}))
 
 
-async def receive_messages(websocket, start):
-    first_audio_time = None
+async def receive_messages(websocket, turn):
     try:
         async for message in websocket:
             data = json.loads(message)
             context_id = data.get("contextId", "default")
             audio_b64 = data.get("audio")
             if audio_b64:
-                if first_audio_time is None:
-                    first_audio_time = time.perf_counter()
-                    ttfa = first_audio_time - start
-                    print(
-                        f"🎧 Time to first audio chunk (TTFA): {ttfa:.3f} seconds"
-                    )
+                turn.tts_audio()
                 audio_bytes = base64.b64decode(audio_b64)
                 ffplay.stdin.write(audio_bytes)
                 ffplay.stdin.flush()
+                turn.mark("first_audio")
                 print(f"Lecture audio pour le contexte '{context_id}'")
 
             if data.get("is_final"):
@@ -99,10 +98,14 @@ client = openai.OpenAI()
 client = Groq()
 
 
-async def send_streamed_response(websocket, prompt, context_id="default"):
+async def send_streamed_response(
+    websocket, prompt, context_id="default", turn=None
+):
     """
     Stream LLM text from OpenAI and send it incrementally over websocket.
     """
+    turn = turn or tracer.start_turn()
+    turn.llm_started()
     # OpenAI streaming response
     stream = client.chat.completions.create(
         model="gpt-4o-mini",
@@ -112,6 +115,7 @@ async def send_streamed_response(websocket, prompt, context_id="default"):
 
     buffer = ""
     for event in stream:
+        turn.llm_token()
         delta_text = event.choices[0].delta.content
         if delta_text:
             # if event.type == "content.delta":
@@ -131,6 +135,7 @@ async def send_streamed_response(websocket, prompt, context_id="default"):
                     }
                 )
             )
+    turn.llm_finished()
     await websocket.send(
         json.dumps(
             {
@@ -150,16 +155,15 @@ async def conversation_agent_demo():
         max_size=16 * 1024 * 1024,
         additional_headers={"xi-api-key": ELEVENLABS_API_KEY},
     ) as websocket:
-        start_time = time.perf_counter()
-        receive_task = asyncio.create_task(
-            receive_messages(websocket, start_time)
-        )
+        turn = tracer.start_turn()
+        receive_task = asyncio.create_task(receive_messages(websocket, turn))
 
         await send_streamed_response(
             websocket,
             "Bonjour ! Racconte moi une phrase courte drôle et hahaha à la fin aussi!",
             # "Bonjour ! Racconte moi une histoire de 15 phrases drôle!",
             context_id="greeting",
+            turn=turn,
         )
         # # Premier message en français, chaleureux et amical
         # await send_text_in_context(
@@ -206,6 +210,7 @@ async def conversation_agent_demo():
         await websocket.send(json.dumps({"close_socket": True}))
         await asyncio.sleep(4)
         await end_conversation(websocket)
+        turn.finish()
 
         ffplay.stdin.close()
         ffplay.wait()
@@ -1,172 +1,190 @@
-from graphviz import Digraph
-
-# Create directed graph
-dot = Digraph(comment="LangGraph Workflow", format="pdf")
-
-# Dynamic graph size
-dot.attr(size="12,12")  # width,height in inches
-dot.attr(ratio="expand")  # expand the canvas to fit nodes
-dot.attr(splines="ortho")  # nicer edges
-dot.attr(nodesep="0.8")  # space between nodes
-dot.attr(ranksep="1.2")  # vertical space between ranks
-
-# Top-to-bottom layout
-# dot.attr(rankdir="TB", splines="ortho", nodesep="0.8", ranksep="1.2")
-# =====================
-# Clusters
-# =====================
-
+"""
+Voice pipeline topology, as a pipeline_graph.PipelineGraph
+build_graph() is the live definition: stages attach handlers to its
+nodes (set_handler) and run it, and rendering it gives the diagram.
+Run: python graph.py   # langgraph_clustered.pdf
+"""
+
+from pipeline_graph import PipelineGraph
+
+# Decisions of PLANNER_AGENT, each a conditional edge out of it
+PLANNER_DECISIONS = [
+    "_ncompl_",
+    "_hcut_",
+    "_scut_",
+    "_int_p_",
+    "_dir_",
+    "_ultdir_",
+    "_nint_p",
+]
+
+
+def build_graph() -> PipelineGraph:
+    graph = PipelineGraph(
+        "LangGraph Workflow",
+        size="12,12",  # width,height in inches
+        ratio="expand",  # expand the canvas to fit nodes
+        splines="ortho",  # nicer edges
+        nodesep="0.8",  # space between nodes
+        ranksep="1.2",  # vertical space between ranks
+    )
 
-# Start node pinned at top
-with dot.subgraph() as s:
-    s.attr(rank="source")  # rank=source puts it at top
-    s.node("__START__", shape="box", style="filled", color="lightgreen")
+    # Start node pinned at top, end node pinned at bottom
+    graph.add_node(
+        "__START__",
+        rank="source",
+        shape="box",
+        style="filled",
+        color="lightgreen",
+    )
+    graph.add_node(
+        "__END__", rank="sink", shape="box", style="filled", color="lightcoral"
+    )
 
-# End node pinned at bottom
-with dot.subgraph() as e:
-    e.attr(rank="sink")  # rank=sink puts it at bottom
-    e.node("__END__", shape="box", style="filled", color="lightcoral")
+    # =====================
+    # Clusters
+    # =====================
 
+    # PLANNER_AGENT (all nodes connecting to PLANNER_AGENT)
+    graph.add_cluster(
+        "PLANNER_AGENT", label="PLANNER", style="filled", color="lightyellow"
+    )
+    graph.add_node(
+        "PLANNER_PIPE", cluster="PLANNER_AGENT", label="PLANNER_PIPE"
+    )
+    graph.add_node(
+        "PLANNER_AGENT", cluster="PLANNER_AGENT", label="PLANNER_AGENT"
+    )
+    for n in PLANNER_DECISIONS:
+        graph.add_node(
+            n,
+            cluster="PLANNER_AGENT",
+            label=n.strip("_"),
+            style="filled",
+            fillcolor="lightgrey",
+        )
+    graph.add_node("lphrase", cluster="PLANNER_AGENT", label="lphrase")
+    graph.add_node("accumulate", cluster="PLANNER_AGENT", label="accumulate")
+
+    # Pipeline
+    graph.add_cluster(
+        "pipeline",
+        label="PIPELINE",
+        style="filled",
+        color="lightgreen",
+        labelloc="t",
+    )
+    for name, fillcolor in (
+        ("MULTIAGENT", "white"),
+        ("PEER", "white"),
+        ("PIPE", "white"),
+        ("AMNGR", "white"),
+        ("VOICE CLIENT", "white"),
+        ("*MEMORY*", "lightblue"),
+        ("ORCHESTRATOR", "lightblue"),
+    ):
+        graph.add_node(
+            name,
+            cluster="pipeline",
+            label=name,
+            style="filled",
+            fillcolor=fillcolor,
+        )
 
-# Cluster: PLANNER_AGENT (all nodes connecting to PLANNER_AGENT)
-with dot.subgraph(
-    name="cluster_PLANNER_AGENT"
-) as PLANNER_AGENT:  # <-- must start with cluster_
-    PLANNER_AGENT.attr(label="PLANNER", style="filled", color="lightyellow")
+    # TTS
+    graph.add_cluster("TTS")
+    graph.add_node(
+        "TTS", cluster="TTS", label="TTS", style="filled", fillcolor="white"
+    )
+    graph.add_node(
+        "TTS Manager",
+        cluster="TTS",
+        label="TTS Manager",
+        style="filled",
+        fillcolor="lightblue",
+    )
+    graph.add_node(
+        "Player",
+        cluster="TTS",
+        label="Player",
+        style="filled",
+        fillcolor="lightblue",
+    )
 
-    # Main PLANNER_AGENT node
-    PLANNER_AGENT.node("PLANNER_PIPE", "PLANNER_PIPE")
-    PLANNER_AGENT.node("PLANNER_AGENT", "PLANNER_AGENT")
+    # STT
+    graph.add_cluster("STT")
+    graph.add_node(
+        "STT", cluster="STT", label="STT", style="filled", fillcolor="white"
+    )
 
-    grey_nodes = [
-        "_ncompl_",
+    # =====================
+    # Edges
+    # =====================
+
+    # __START__ conditional edges
+    graph.add_edge("__START__", "PEER", color="red")
+    graph.add_edge("__START__", "VOICE SERVER", color="red")
+
+    # Edges PIPE
+    graph.add_edge("PEER", "STT", color="red")
+    graph.add_edge("PEER", "VOICE CLIENT", color="red")
+    graph.add_edge("PEER", "VOICE SERVER", color="red")
+    graph.add_edge("VOICE CLIENT", "VOICE SERVER", color="red", dir="both")
+    graph.add_edge("ORCHESTRATOR", "*MEMORY*")
+    graph.add_edge("MULTIAGENT", "TTS Manager", color="red")
+
+    graph.add_edge("PIPE", "AMNGR")
+    graph.add_edge("PIPE", "ORCHESTRATOR", color="red")
+
+    graph.add_edge("ORCHESTRATOR", "AMNGR", color="red")
+    graph.add_edge("AMNGR", "MULTIAGENT", color="red")
+    graph.add_edge("MULTIAGENT", "VOICE CLIENT", color="red")
+    graph.add_edge("PIPE", "PEER", dir="both")
+    graph.add_edge("PIPE", "STT")
+    graph.add_edge("STT", "PIPE", color="red")
+    graph.add_edge("PIPE", "TTS Manager", dir="both")
+
+    graph.add_edge("ORCHESTRATOR", "PLANNER_AGENT", color="red")
+
+    graph.add_edge("TTS Manager", "TTS", color="red")
+    graph.add_edge("TTS Manager", "Player", dir="both")
+
+    # Edges inside agent cluster
+    graph.add_edge("_nint_p", "lphrase")
+    graph.add_edge("lphrase", "AMNGR")
+    graph.add_edge("_scut_", "lphrase")
+    # A hard cut starts the next turn over
+    graph.add_edge("_hcut_", "__START__", feedback=True)
+    graph.add_edge("_ncompl_", "accumulate")
+    graph.add_edge("_int_p_", "accumulate")
+    graph.add_edge("accumulate", "*MEMORY*")
+    graph.add_edge("*MEMORY*", "PLANNER_AGENT")
+    graph.add_edge("_ultdir_", "AMNGR")
+    graph.add_edge("_dir_", "lphrase")
+    graph.add_edge("lphrase", "TTS Manager")
+
+    # PLANNER_AGENT conditional edges
+    graph.add_edge("PLANNER_PIPE", "PLANNER_AGENT")
+    for decision in (
         "_hcut_",
         "_scut_",
+        "_ncompl_",
         "_int_p_",
         "_dir_",
         "_ultdir_",
         "_nint_p",
-    ]
-    for n in grey_nodes:
-        PLANNER_AGENT.node(
-            n, label=n.strip("_"), style="filled", fillcolor="lightgrey"
-        )
-
-    # Other nodes (optional)
-    PLANNER_AGENT.node("lphrase", "lphrase")
-    PLANNER_AGENT.node("accumulate", "accumulate")
-
+    ):
+        graph.add_edge("PLANNER_AGENT", decision)
 
-# Pipeline cluster
-with dot.subgraph(name="cluster_pipeline") as pipeline:
-    pipeline.attr(
-        label="PIPELINE", style="filled", color="lightgreen", labelloc="t"
-    )
-    pipeline.node(
-        "MULTIAGENT", "MULTIAGENT", style="filled", fillcolor="white"
-    )
-    pipeline.node("PEER", "PEER", style="filled", fillcolor="white")
-    pipeline.node("PIPE", "PIPE", style="filled", fillcolor="white")
-    pipeline.node("AMNGR", "AMNGR", style="filled", fillcolor="white")
+    # AGENT -> __END__
+    graph.add_edge("TTS", "Player")
+    graph.add_edge("Player", "__END__", color="red")
+    graph.add_edge("__END__", "__START__", color="red", feedback=True)
+    return graph
 
-    pipeline.node(
-        "VOICE CLIENT", "VOICE CLIENT", style="filled", fillcolor="white"
-    )
-    pipeline.node(
-        "*MEMORY*", "*MEMORY*", style="filled", fillcolor="lightblue"
-    )
-    pipeline.node(
-        "ORCHESTRATOR", "ORCHESTRATOR", style="filled", fillcolor="lightblue"
-    )
-
-# TTS cluster
-with dot.subgraph(name="cluster_TTS") as TTS:
-    # TTS.attr(label="TTS", style="filled", color="lightpink", labelloc="t")
-    TTS.node("TTS", "TTS", style="filled", fillcolor="white")
-    TTS.node(
-        "TTS Manager", "TTS Manager", style="filled", fillcolor="lightblue"
-    )
 
-    TTS.node("Player", "Player", style="filled", fillcolor="lightblue")
-
-# STT cluster
-with dot.subgraph(name="cluster_STT") as STT:
-    # STT.attr(label="STT", style="filled", color="lightblue", labelloc="t")
-    STT.node(
-        "STT", "STT", style="filled", fillcolor="white"
-    )  # node background
-    # STT.node("STT Manager", "STT Manager", style="filled", fillcolor="white")
-# =====================
-# Edges
-# =====================
-
-
-# __START__ conditional edges
-dot.edge("__START__", "PEER", color="red")
-dot.edge("__START__", "VOICE SERVER", color="red")
-# dot.edge(
-#     "STT",
-#     "*MEMORY*",
-#     style="dashed",
-# )
-
-# Edges PIPE
-
-dot.edge("PEER", "STT", color="red")
-dot.edge("PEER", "VOICE CLIENT", color="red")
-dot.edge("PEER", "VOICE SERVER", color="red")
-dot.edge("VOICE CLIENT", "VOICE SERVER", color="red", dir="both")
-dot.edge("ORCHESTRATOR", "*MEMORY*")
-dot.edge("MULTIAGENT", "TTS Manager", color="red")
-
-dot.edge("PIPE", "AMNGR")
-dot.edge("PIPE", "ORCHESTRATOR", color="red")
-
-dot.edge("ORCHESTRATOR", "AMNGR", color="red")
-dot.edge("AMNGR", "MULTIAGENT", color="red")
-dot.edge("MULTIAGENT", "VOICE CLIENT", color="red")
-dot.edge("PIPE", "PEER", dir="both")
-dot.edge("PIPE", "STT")
-dot.edge("STT", "PIPE", color="red")
-dot.edge("PIPE", "TTS Manager", dir="both")
-
-dot.edge("ORCHESTRATOR", "PLANNER_AGENT", color="red")
-
-
-####
-
-dot.edge("TTS Manager", "TTS", color="red")
-dot.edge("TTS Manager", "Player", dir="both")
-
-# Edges inside agent cluster
-dot.edge("_nint_p", "lphrase")
-dot.edge("lphrase", "AMNGR")
-dot.edge("_scut_", "lphrase")
-dot.edge("_hcut_", "__START__")
-dot.edge("_ncompl_", "accumulate")
-dot.edge("_int_p_", "accumulate")
-dot.edge("accumulate", "*MEMORY*")
-dot.edge("*MEMORY*", "PLANNER_AGENT")
-dot.edge("_ultdir_", "AMNGR")
-dot.edge("_dir_", "lphrase")
-dot.edge("lphrase", "TTS Manager")
-
-# PLANNER_AGENT conditional edges
-dot.edge("PLANNER_PIPE", "PLANNER_AGENT")
-dot.edge("PLANNER_AGENT", "_hcut_")
-dot.edge("PLANNER_AGENT", "_scut_")
-dot.edge("PLANNER_AGENT", "_ncompl_")
-dot.edge("PLANNER_AGENT", "_int_p_")
-dot.edge("PLANNER_AGENT", "_dir_")
-dot.edge("PLANNER_AGENT", "_ultdir_")
-dot.edge("PLANNER_AGENT", "_nint_p")
-
-# AGENT -> __END__
-dot.edge("TTS", "Player")
-dot.edge("Player", "__END__", color="red")
-dot.edge("__END__", "__START__", color="red")
-
-# =====================
-# Export to PDF
-# =====================
-dot.render("langgraph_clustered", view=True)
+if __name__ == "__main__":
+    # =====================
+    # Export to PDF
+    # =====================
+    build_graph().to_dot().render("langgraph_clustered", view=True)
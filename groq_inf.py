@@ -1,9 +1,13 @@
 from groq import Groq
-import time
+
+from log_setup import configure_logging
+from turn_tracing import tracer
+
+configure_logging()
 
 client = Groq()
-time_1 = time.time()
-flag = False
+turn = tracer.start_turn()
+turn.llm_started()
 query = """
 Send a message
 """
@@ -264,10 +268,8 @@ completion = client.chat.completions.create(
     stream=True,
 )
 for chunk in completion:
-    if not flag:
-        print("Starting...")
-        print("Time to first token: ", time.time() - time_1)
-        flag = True
+    turn.llm_token()
     print(chunk.choices[0].delta.content, end="", flush=True)
-time_2 = time.time()
-print(f"\nTime taken: {time_2 - time_1} seconds")
+turn.llm_finished()
+print()
+turn.finish()
@@ -1,7 +1,7 @@
-from groq import Groq
+from action_decoder import ActionDecoder, iter_actions
+from llm_clients import registry
 
-
-client = Groq()
+client = registry.sync_client("groq")
 
 
 system_prompt = """Your name is Alma
@@ -113,13 +113,41 @@ system_prompt = """Your name is Alma
 user_phrase = "I finished"
 
 conversation = [
-    {"role": "system", "content": system_prompt},
+    {"role": "system", "content": system_prompt.format(context="")},
     {"role": "user", "content": user_phrase},
 ]
 
-response = client.chat.completions.create(
+
+def assistant_speaking(info: str):
+    print(f"🗣️  TTS <- {info}")
+
+
+def navigate_to_page(app_name: str):
+    print(f"🧭 navigateToPage({app_name})")
+
+
+HANDLERS = {
+    "assistantSpeaking": assistant_speaking,
+    "navigateToPage": navigate_to_page,
+}
+
+# Times are from the request, each action runs as soon as its object
+# is closed in the stream
+decoder = ActionDecoder()
+stream = client.chat.completions.create(
     model="openai/gpt-oss-20b",
     messages=conversation,
+    stream=True,
+)
+for action in iter_actions(stream, decoder):
+    print(f"[{action.at * 1000:6.0f} ms] {action}")
+    handler = HANDLERS.get(action.function)
+    if handler is not None and not action.partial:
+        handler(*action.args)
+
+stats = decoder.stats()
+print(
+    f"first action {stats['first_action_ms']:.0f} ms, full response"
+    f" {stats['done_ms']:.0f} ms"
+    f" ({stats['actions']} actions, {stats['malformed']} malformed)"
 )
-
-print(response)
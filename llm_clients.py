@@ -0,0 +1,237 @@
+"""
+LLMClientRegistry: one pooled, pre-warmed SDK client per LLM provider
+The scripts built openai.OpenAI(), AsyncOpenAI, Groq() or AsyncGroq per
+module or even per call, each with its own connection pool, so a turn
+could pay DNS + TCP + TLS before its first token. Here every stage asks
+the registry instead:
+    client = registry.client("groq")        # AsyncGroq
+    client = registry.sync_client("openai")  # OpenAI, Azure SDK threads
+Clients share tuned httpx limits, HTTP/2 when h2 is installed (one
+multiplexed connection per provider), and keep-alive long enough to
+outlive a pause in the conversation. warm() opens the connections with
+a cheap GET /models at startup and start() re-warms providers idle for
+idle_warm seconds. Connection setup is timed by an httpx trace hook into
+the tracer's llm_connect span, apart from llm_ttft.
+Install (HTTP/2): pip install "httpx[http2]"
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from turn_tracing import SpanHistogram, tracer
+
+logger = logging.getLogger("llm-clients")
+
+# provider -> (module, async class, sync class)
+SDKS = {
+    "openai": ("openai", "AsyncOpenAI", "OpenAI"),
+    "groq": ("groq", "AsyncGroq", "Groq"),
+}
+
+
+class ConnectionStats:
+    """Requests and new connections of one provider's clients"""
+
+    def __init__(self, setup: SpanHistogram):
+        self.setup = setup  # DNS + TCP (+ TLS) of each new connection
+        self.requests = 0
+        self.connections = 0
+        self.warmups = 0
+        self.last_used = time.monotonic()
+
+    def request(self, request: httpx.Request):
+        """Counts the request and hooks its trace, returns the callback"""
+        self.requests += 1
+        self.last_used = time.monotonic()
+        # Without TLS the connection is up once TCP is
+        done = (
+            "connection.start_tls.complete"
+            if request.url.scheme == "https"
+            else "connection.connect_tcp.complete"
+        )
+        started = []
+
+        def trace(event: str, info: Dict[str, Any]):
+            if event == "connection.connect_tcp.started":
+                started.append(time.perf_counter())
+            elif event == done and started:
+                self.connections += 1
+                self.setup.observe(time.perf_counter() - started.pop())
+
+        return trace
+
+
+class LLMClientRegistry:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 120.0,
+        http2: Optional[bool] = None,
+        warm_connections: int = 2,
+        idle_warm: float = 30.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        verify: Any = True,
+        setup: Optional[SpanHistogram] = None,
+    ):
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+            if not http2:
+                logger.info("h2 not installed, HTTP/1.1 keep-alive only")
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.verify = verify  # or an ssl.SSLContext
+        # One multiplexed HTTP/2 connection, else one per concurrent call
+        self.warm_connections = 1 if http2 else warm_connections
+        self.idle_warm = idle_warm
+        self.setup = setup or tracer.histograms["llm_connect"]
+        self.clients: Dict[str, Any] = {}
+        self.sync_clients: Dict[str, Any] = {}
+        self.connections: Dict[str, ConnectionStats] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _stats(self, provider: str) -> ConnectionStats:
+        if provider not in self.connections:
+            self.connections[provider] = ConnectionStats(self.setup)
+        return self.connections[provider]
+
+    def _sdk(self, provider: str, sync: bool):
+        module, async_class, sync_class = SDKS[provider]
+        return getattr(
+            importlib.import_module(module),
+            sync_class if sync else async_class,
+        )
+
+    def client(self, provider: str, **sdk_kwargs):
+        """The provider's async SDK client, sdk_kwargs on first use only"""
+        if provider not in self.clients:
+            stats = self._stats(provider)
+
+            async def hook(request: httpx.Request):
+                trace = stats.request(request)
+
+                async def async_trace(event, info):
+                    trace(event, info)
+
+                request.extensions["trace"] = async_trace
+
+            http_client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                verify=self.verify,
+                event_hooks={"request": [hook]},
+            )
+            self.clients[provider] = self._sdk(provider, sync=False)(
+                http_client=http_client, **sdk_kwargs
+            )
+        return self.clients[provider]
+
+    def sync_client(self, provider: str, **sdk_kwargs):
+        """Same for code on threads (Azure SDK callbacks)"""
+        if provider not in self.sync_clients:
+            stats = self._stats(provider)
+
+            def hook(request: httpx.Request):
+                request.extensions["trace"] = stats.request(request)
+
+            http_client = httpx.Client(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                verify=self.verify,
+                event_hooks={"request": [hook]},
+            )
+            self.sync_clients[provider] = self._sdk(provider, sync=True)(
+                http_client=http_client, **sdk_kwargs
+            )
+        return self.sync_clients[provider]
+
+    async def warm(self, provider: Optional[str] = None):
+        """Open warm_connections per client with GET /models"""
+        providers = [provider] if provider else list(self.connections)
+        calls = []
+        for name in providers:
+            if name in self.clients:
+                calls += [
+                    self.clients[name].models.list()
+                    for _ in range(self.warm_connections)
+                ]
+            if name in self.sync_clients:
+                calls += [
+                    asyncio.to_thread(self.sync_clients[name].models.list)
+                    for _ in range(self.warm_connections)
+                ]
+            self._stats(name).warmups += 1
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("warm-up failed: %r", result)
+
+    def start(self, warm: bool = False):
+        """
+        Re-warm in the background the providers idle for idle_warm.
+        warm=True warms every provider first, also in the background:
+        a server lifespan does not wait on a slow or unreachable one
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._keep_warm(warm))
+
+    async def _keep_warm(self, warm: bool):
+        if warm:
+            await self._warm_logged()
+        while True:
+            await asyncio.sleep(self.idle_warm / 2)
+            now = time.monotonic()
+            for provider, stats in list(self.connections.items()):
+                if now - stats.last_used >= self.idle_warm:
+                    await self._warm_logged(provider)
+
+    async def _warm_logged(self, provider: Optional[str] = None):
+        try:
+            await self.warm(provider)
+        except Exception:
+            logger.exception("warm-up of %s failed", provider or "providers")
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for client in self.clients.values():
+            await client.close()
+        for client in self.sync_clients.values():
+            client.close()
+        self.clients.clear()
+        self.sync_clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "connect_ms": {
+                q: v * 1000 for q, v in self.setup.quantiles().items()
+            },
+            "providers": {
+                name: {
+                    "requests": s.requests,
+                    "connections": s.connections,
+                    "reused": s.requests - s.connections,
+                    "warmups": s.warmups,
+                }
+                for name, s in self.connections.items()
+            },
+        }
+
+
+registry = LLMClientRegistry()
@@ -0,0 +1,113 @@
+"""
+Logging setup shared by the MCP servers/clients and the voice servers
+Records go through a QueueHandler to one QueueListener thread, so the
+event loop and the Azure SDK callback threads never block on stderr.
+Set ALMA_LOG_LEVEL=DEBUG|INFO|WARNING to change verbosity everywhere,
+ALMA_LOG_SAMPLE_EVERY=N to keep 1 in N per-token/per-chunk debug records.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("ALMA_LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_EVERY = int(os.getenv("ALMA_LOG_SAMPLE_EVERY", "50"))
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Args safe to %-format later on the listener thread
+IMMUTABLE_ARGS = (str, int, float, bytes, type(None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_sample_counts: Dict[str, int] = {}
+
+
+class FieldsFormatter(logging.Formatter):
+    """Appends extra={"fields": {...}} as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Keeps the record's args unformatted when they are all immutable
+    scalars: the listener thread does the %-formatting, the caller only
+    pays for the enqueue. Other args (conversation lists, dicts) may
+    change before the listener runs, so those records are formatted here
+    like the stdlib QueueHandler does.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, dict):
+            args = args.values()
+        if args and not all(isinstance(a, IMMUTABLE_ARGS) for a in args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            # Tracebacks must be rendered while the frames still exist
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+        record.exc_info = None
+        return record
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    datefmt: str = LOG_DATEFMT,
+) -> logging.handlers.QueueListener:
+    """
+    Install the queue sink on the root logger (replaces basicConfig).
+    Safe to call more than once, only the first call installs handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(FieldsFormatter(fmt, datefmt))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [LazyQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+def log_sampled(
+    logger: logging.Logger,
+    key: str,
+    msg: str,
+    *args,
+    every: int = LOG_SAMPLE_EVERY,
+):
+    """
+    Debug-log 1 in `every` calls per key (tokens, audio chunks, partials).
+    Costs a single level check when debug is off.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    count = _sample_counts.get(key, 0)
+    _sample_counts[key] = count + 1
+    if count % every == 0:
+        logger.debug("%s [1/%d] " + msg, key, every, *args)
@@ -0,0 +1,220 @@
+"""
+lphrase: per-turn spoken budget for the reply sent to TTS
+The prompts ask for "très brève" answers but nothing enforced it: a long
+reply went to tts_request.input_stream in full and the next turn waited
+until all of it was spoken. After graph.py's _dir_ / _scut_ / _nint_p
+nodes, the reply streams through until `max_chars` (or `max_seconds` of
+estimated audio at `chars_per_second`) is spoken, then the spoken part
+ends at the next sentence boundary, or at a word `grace` chars later if
+the sentence runs on. The rest goes to the screen only, on text-out:
+  {"type": "reply_rest", "text": "..."}
+max_tokens is the hint for the provider: the spoken budget and grace,
+plus `screen_factor` times that for the screen, so a rambling model
+also stops generating early.
+    reply = lphrase.begin(scope)
+    for delta in deltas:
+        tts.write(reply.feed(delta))
+    tts.write(reply.finish())
+    lphrase.end(scope)  # rest -> on_screen callbacks
+"""
+
+import inspect
+import math
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from turn_tracing import SpanHistogram
+
+# Azure French neural voices speak about 15 characters per second
+CHARS_PER_SECOND = 15.0
+# Punctuation ending a sentence, once the next character is known
+SENTENCE_END = re.compile(r"[.!?…](?=\s)")
+WORD_END = re.compile(r"\s+")
+
+
+class SpokenReply:
+    """One turn's reply, split into what is spoken and what is shown"""
+
+    def __init__(self, max_chars: int, grace: int):
+        self.max_chars = max_chars
+        self.grace = grace
+        self.text = ""
+        self.sent = 0  # chars of text handed to TTS
+        self.cut: Optional[int] = None  # where the spoken part ended
+
+    def _release(self, end: int) -> str:
+        spoken = self.text[self.sent : end]
+        self.sent = max(self.sent, end)
+        return spoken
+
+    def _word_end(self, stop: int) -> int:
+        """Start of the last run of whitespace before stop, past sent"""
+        end = self.sent
+        for match in WORD_END.finditer(self.text, self.sent, stop):
+            end = match.start()
+        return end
+
+    def feed(self, delta: str) -> str:
+        """The part of delta to speak now, "" once the budget is spent"""
+        self.text += delta
+        if self.cut is not None:
+            return ""
+        if len(self.text) <= self.max_chars:
+            return self._release(len(self.text))
+        limit = self.max_chars + self.grace
+        found = SENTENCE_END.search(self.text, max(self.max_chars - 1, 0))
+        # A sentence end past the limit (one large delta) is not taken
+        if found is not None and found.end() <= limit:
+            self.cut = found.end()
+            return self._release(self.cut)
+        if len(self.text) >= limit:
+            self.cut = self._word_end(limit)
+            return self._release(self.cut)
+        # Past the budget, whole words only: the cut may come after any
+        return self._release(self._word_end(len(self.text)))
+
+    def finish(self) -> str:
+        """End of the reply: what is still held back, if it is spoken"""
+        if self.cut is not None:
+            return ""
+        return self._release(len(self.text))
+
+    @property
+    def spoken(self) -> str:
+        return self.text[: self.sent]
+
+    @property
+    def rest(self) -> str:
+        """Screen only"""
+        return self.text[self.cut :].strip() if self.cut is not None else ""
+
+
+def _delta_text(item) -> Optional[str]:
+    """Text of a delta, or of an SDK stream chunk"""
+    if item is None or isinstance(item, str):
+        return item
+    if not item.choices:
+        return None
+    return item.choices[0].delta.content
+
+
+class LPhrase:
+    """
+    Per-session budgeter. generate(turn, max_tokens) -> LLM stream (SDK
+    chunks or text), may be a coroutine; only needed by handle()
+    """
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        max_seconds: float = 8.0,
+        chars_per_second: float = CHARS_PER_SECOND,
+        grace: int = 60,
+        screen_factor: float = 3.0,
+        chars_per_token: float = 3.5,
+        generate: Optional[Callable[[Dict[str, Any], int], Any]] = None,
+    ):
+        self.max_chars = max_chars or int(max_seconds * chars_per_second)
+        self.chars_per_second = chars_per_second
+        self.grace = grace
+        self.screen_factor = screen_factor
+        self.chars_per_token = chars_per_token
+        self.generate = generate
+        self.replies: Dict[Any, SpokenReply] = {}
+        self.screen_callbacks: List[Callable[[Any, str], None]] = []
+
+        # Stats
+        self.turns = 0
+        self.cut = 0
+        self.spoken_chars = 0
+        self.screen_chars = 0
+        self.spoken_seconds = SpanHistogram()
+
+    @property
+    def max_tokens(self) -> int:
+        """Hint for chat.completions.create(max_tokens=...)"""
+        spoken = self.max_chars + self.grace
+        return math.ceil(
+            spoken * (1 + self.screen_factor) / self.chars_per_token
+        )
+
+    def on_screen(self, callback: Callable[[Any, str], None]):
+        """callback(scope, rest), for replies past the budget"""
+        self.screen_callbacks.append(callback)
+        return callback
+
+    def begin(self, scope) -> SpokenReply:
+        """A new reply for scope, replacing one that was cut short"""
+        reply = self.replies[scope] = SpokenReply(self.max_chars, self.grace)
+        return reply
+
+    def end(self, scope) -> Optional[SpokenReply]:
+        reply = self.replies.pop(scope, None)
+        if reply is None:
+            return None
+        self.turns += 1
+        self.spoken_chars += len(reply.spoken)
+        self.spoken_seconds.observe(len(reply.spoken) / self.chars_per_second)
+        rest = reply.rest
+        if rest:
+            self.cut += 1
+            self.screen_chars += len(rest)
+            for callback in self.screen_callbacks:
+                callback(scope, rest)
+        return reply
+
+    def split(self, text: str) -> Tuple[str, str]:
+        """(spoken, rest) of a whole reply, e.g. a cached one"""
+        reply = SpokenReply(self.max_chars, self.grace)
+        spoken = reply.feed(text) + reply.finish()
+        return spoken, reply.rest
+
+    async def speak(self, scope, stream) -> AsyncIterator[str]:
+        """Spoken parts of an async LLM stream, the rest to on_screen"""
+        reply = self.begin(scope)
+        try:
+            async for item in stream:
+                text = _delta_text(item)
+                if text:
+                    spoken = reply.feed(text)
+                    if spoken:
+                        yield spoken
+            spoken = reply.finish()
+            if spoken:
+                yield spoken
+        finally:
+            if self.replies.get(scope) is reply:
+                self.end(scope)
+
+    async def handle(self, turn: Dict[str, Any], ctx=None):
+        """pipeline_graph handler for lphrase, spoken text to TTS Manager"""
+        stream = self.generate(turn, self.max_tokens)
+        if inspect.isawaitable(stream):
+            stream = await stream
+        async for spoken in self.speak(ctx.scope, stream):
+            yield spoken
+
+    def attach(self, graph, concurrency: int = 64):
+        return graph.set_handler(
+            "lphrase",
+            self.handle,
+            router=lambda text: "TTS Manager",
+            concurrency=concurrency,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        generated = self.spoken_chars + self.screen_chars
+        return {
+            "turns": self.turns,
+            "cut": self.cut,
+            "cut_rate": self.cut / self.turns if self.turns else 0.0,
+            "max_chars": self.max_chars,
+            "max_tokens": self.max_tokens,
+            "spoken_chars": self.spoken_chars,
+            "screen_chars": self.screen_chars,
+            "spoken_share": (
+                self.spoken_chars / generated if generated else 1.0
+            ),
+            "seconds_not_spoken": self.screen_chars / self.chars_per_second,
+            "spoken_seconds": self.spoken_seconds.quantiles(),
+        }
@@ -1,27 +1,37 @@
 """
 MCP Client with OpenAI Integration over HTTP
-Install: pip install openai aiohttp aiohttp-sse
+Install: pip install openai aiohttp aiohttp-sse mcp
 Set environment variable: export OPENAI_API_KEY=your_key_here
+Select the tool transport: export MCP_TRANSPORT=http|inprocess|stdio
+(default http: mcp-server-http.py listening on :3000)
 """
 
 import asyncio
 import os
 import json
 import logging
+import time
 from typing import List, Dict, Any
 import aiohttp
-from openai import AsyncOpenAI
+
+from llm_clients import registry
+from log_setup import configure_logging
+from mcp_transports import SessionToolClient
+from response_cache import ResponseCache, catalogue_version, load_embedder
+from stream_accumulator import StreamAccumulator
+from tool_stream import EagerToolDispatcher
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+configure_logging()
 logger = logging.getLogger("mcp-client")
 
-# Initialize OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# This script's default stays the aiohttp client, unlike mcp_transports
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "http")
+
+# Pooled OpenAI client (llm_clients)
+openai_client = registry.client("openai")
+# Repeated queries skip the LLM, per tool catalogue
+response_cache = ResponseCache(load_embedder(background=True))
 
 
 class MCPHTTPClient:
@@ -34,7 +44,7 @@ class MCPHTTPClient:
 
     async def __aenter__(self):
         self.session = aiohttp.ClientSession()
-        self.logger.info(f"🔌 Connecting to MCP server at {self.base_url}")
+        self.logger.info("🔌 Connecting to MCP server at %s", self.base_url)
 
         # Test connection
         try:
@@ -43,10 +53,10 @@ class MCPHTTPClient:
                     self.logger.info("✅ Connected to MCP server")
                 else:
                     self.logger.warning(
-                        f"⚠️ Server responded with status {resp.status}"
+                        "⚠️ Server responded with status %s", resp.status
                     )
         except Exception as e:
-            self.logger.error(f"❌ Failed to connect to server: {str(e)}")
+            self.logger.error("❌ Failed to connect to server: %s", str(e))
             raise
 
         return self
@@ -65,15 +75,18 @@ class MCPHTTPClient:
         ) as resp:
             data = await resp.json()
             tools = data.get("tools", [])
-            self.logger.info(f"✅ Received {len(tools)} tools")
+            self.logger.info("✅ Received %s tools", len(tools))
             return tools
 
     async def call_tool(
         self, name: str, arguments: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Call a tool on the MCP server"""
-        self.logger.info(f"🔧 Calling tool: {name}")
-        self.logger.debug(f"   Arguments: {json.dumps(arguments, indent=2)}")
+        self.logger.info("🔧 Calling tool: %s", name)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "   Arguments: %s", json.dumps(arguments, indent=2)
+            )
 
         async with self.session.post(
             f"{self.base_url}/mcp",
@@ -83,7 +96,7 @@ class MCPHTTPClient:
             },
         ) as resp:
             data = await resp.json()
-            self.logger.info(f"✅ Tool call completed: {name}")
+            self.logger.info("✅ Tool call completed: %s", name)
             return data
 
 
@@ -95,8 +108,8 @@ async def process_tool_calls(client: MCPHTTPClient, tool_calls):
         tool_name = tool_call.function.name
         tool_args = json.loads(tool_call.function.arguments)
 
-        logger.info(f"  🔧 Executing tool: {tool_name}")
-        logger.debug(f"     Arguments: {tool_args}")
+        logger.info("  🔧 Executing tool: %s", tool_name)
+        logger.debug("     Arguments: %s", tool_args)
 
         # Call the MCP tool
         result = await client.call_tool(tool_name, tool_args)
@@ -105,7 +118,7 @@ async def process_tool_calls(client: MCPHTTPClient, tool_calls):
         result_text = "\n".join(
             [content["text"] for content in result.get("content", [])]
         )
-        logger.info(f"     ✓ Result received ({len(result_text)} chars)")
+        logger.info("     ✓ Result received (%s chars)", len(result_text))
 
         tool_results.append(
             {
@@ -124,9 +137,9 @@ async def chat_with_tools(
 ):
     """Run a chat completion with tool calling"""
     logger.info("")
-    logger.info(f"{'=' * 60}")
-    logger.info(f"💬 User Query: {user_message}")
-    logger.info(f"{'=' * 60}")
+    logger.info("%s", "=" * 60)
+    logger.info("💬 User Query: %s", user_message)
+    logger.info("%s", "=" * 60)
 
     # Get available tools from MCP server
     logger.info("📋 Fetching available tools...")
@@ -146,7 +159,22 @@ async def chat_with_tools(
             }
         )
 
-    logger.info(f"✅ Loaded {len(openai_tools)} tools for AI")
+    logger.info("✅ Loaded %s tools for AI", len(openai_tools))
+
+    catalogue = catalogue_version(tools_list)
+    cached, how = response_cache.lookup(user_message, catalogue=catalogue)
+    if cached is not None:
+        # Same answer, but the UI tools still have to act again. A
+        # semantic hit only has tool calls without arguments to replay
+        logger.info(
+            "⚡ Cached reply (%s), replaying %s tool call(s)",
+            how,
+            len(cached.actions),
+        )
+        if cached.actions:
+            await process_tool_calls(client, cached.tool_calls())
+        logger.info("🤖 Assistant: %s", cached.reply)
+        return cached.reply
 
     # Initialize conversation
     system = """Your name is Alma
@@ -166,8 +194,9 @@ async def chat_with_tools(
 
     # Main loop for handling tool calls
     max_iterations = 5
+    actions = []  # tool calls made, for the response cache
     for iteration in range(max_iterations):
-        logger.info(f"🔄 Iteration {iteration + 1}/{max_iterations}")
+        logger.info("🔄 Iteration %s/%s", iteration + 1, max_iterations)
 
         # Call OpenAI API
         response = await openai_client.chat.completions.create(
@@ -203,9 +232,14 @@ async def chat_with_tools(
         # Check if we need to call tools
         if assistant_message.tool_calls:
             logger.info(
-                f"🛠️  AI requested {len(assistant_message.tool_calls)} tool call(s)"
+                "🛠️  AI requested %s tool call(s)",
+                len(assistant_message.tool_calls),
             )
 
+            actions += [
+                {"name": tc.function.name, "arguments": tc.function.arguments}
+                for tc in assistant_message.tool_calls
+            ]
             # Execute all tool calls
             tool_results = await process_tool_calls(
                 client, assistant_message.tool_calls
@@ -213,14 +247,20 @@ async def chat_with_tools(
 
             # Add tool results to messages
             messages.extend(tool_results)
-            logger.info(f"[CONVERSATION] {messages}")
+            logger.debug("[CONVERSATION] %s", messages)
             logger.info("✅ All tool results added to conversation")
         else:
             # No more tool calls, we have the final answer
             logger.info("✅ Final answer received from AI")
             logger.info("")
-            logger.info(f"🤖 Assistant: {assistant_message.content}")
+            logger.info("🤖 Assistant: %s", assistant_message.content)
             logger.info("")
+            response_cache.put(
+                user_message,
+                assistant_message.content or "",
+                actions,
+                catalogue=catalogue,
+            )
             return assistant_message.content
 
     logger.warning("⚠️ Max iterations reached")
@@ -232,9 +272,9 @@ async def stream_chat_with_tools(
 ):
     """Run a streaming chat completion with tool calling"""
     logger.info("")
-    logger.info(f"{'=' * 60}")
-    logger.info(f"💬 User Query (Streaming): {user_message}")
-    logger.info(f"{'=' * 60}")
+    logger.info("%s", "=" * 60)
+    logger.info("💬 User Query (Streaming): %s", user_message)
+    logger.info("%s", "=" * 60)
 
     # Get available tools from MCP server
     logger.info("📋 Fetching available tools...")
@@ -256,7 +296,7 @@ async def stream_chat_with_tools(
             }
         )
 
-    logger.info(f"✅ Loaded {len(openai_tools)} tools for AI")
+    logger.info("✅ Loaded %s tools for AI", len(openai_tools))
 
     # Initialize conversation
     system = """Your name is Alma
@@ -278,6 +318,7 @@ async def stream_chat_with_tools(
 
     # Main loop for handling tool calls
     max_iterations = 5
+    turn_saved = 0.0
     for iteration in range(max_iterations):
         # Call OpenAI API with streaming
         stream = await openai_client.chat.completions.create(
@@ -288,86 +329,49 @@ async def stream_chat_with_tools(
             stream=True,
         )
 
-        # Collect streamed response
-        full_content = ""
-        tool_calls_data = {}
+        # Collect streamed response, tools start as soon as they parse
+        acc = StreamAccumulator()
+        dispatcher = EagerToolDispatcher(
+            lambda tc: process_tool_calls(client, [tc]), acc
+        )
 
         async for chunk in stream:
-            delta = chunk.choices[0].delta
-
-            # Stream text content
-            if delta.content:
-                print(delta.content, end="", flush=True)
-                full_content += delta.content
-
-            # Collect tool calls
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    idx = tc.index
-                    if idx not in tool_calls_data:
-                        tool_calls_data[idx] = {
-                            "id": "",
-                            "type": "function",
-                            "function": {"name": "", "arguments": ""},
-                        }
-
-                    if tc.id:
-                        tool_calls_data[idx]["id"] = tc.id
-                    if tc.function.name:
-                        tool_calls_data[idx]["function"]["name"] = (
-                            tc.function.name
-                        )
-                    if tc.function.arguments:
-                        tool_calls_data[idx]["function"]["arguments"] += (
-                            tc.function.arguments
-                        )
+            # Stream text content, tool calls are collected by the dispatcher
+            text = dispatcher.add_chunk(chunk)
+            if text:
+                print(text, end="", flush=True)
 
+        dispatcher.finish()
+        stream_end = time.perf_counter()
         print()  # New line after streaming
 
-        # Convert tool_calls_data to list
-        tool_calls_list = (
-            [tool_calls_data[i] for i in sorted(tool_calls_data.keys())]
-            if tool_calls_data
-            else None
-        )
+        full_content = acc.content
+        tool_calls_list = acc.tool_calls_list()
 
         # Add assistant message to conversation
-        messages.append(
-            {
-                "role": "assistant",
-                "content": full_content or None,
-                "tool_calls": tool_calls_list,
-            }
-        )
+        messages.append(acc.to_message())
 
         # Check if we need to call tools
         if tool_calls_list:
-            logger.info(f"🛠️  AI requested {len(tool_calls_list)} tool call(s)")
-
-            # Create tool call objects for processing
-            class ToolCall:
-                def __init__(self, data):
-                    self.id = data["id"]
-                    self.type = data["type"]
-                    self.function = type(
-                        "Function",
-                        (),
-                        {
-                            "name": data["function"]["name"],
-                            "arguments": data["function"]["arguments"],
-                        },
-                    )()
-
-            tool_call_objects = [ToolCall(tc) for tc in tool_calls_list]
+            logger.info(
+                "🛠️  AI requested %s tool call(s)", len(tool_calls_list)
+            )
 
-            # Execute all tool calls
-            tool_results = await process_tool_calls(client, tool_call_objects)
+            # Wait for the tool calls already started during the stream
+            tool_results = await dispatcher.results()
+            saved = dispatcher.latency_saved(stream_end, time.perf_counter())
+            turn_saved += saved
+            logger.info(
+                "⚡ Early tool dispatch saved %.0f ms (turn total %.0f ms)",
+                saved * 1000,
+                turn_saved * 1000,
+            )
 
             # Add tool results to messages
             messages.extend(tool_results)
             logger.info("✅ All tool results added to conversation")
 
-            logger.info(f"[STREAM CONVERSATION] {messages}")
+            logger.debug("[STREAM CONVERSATION] %s", messages)
             print("\n🤖 Assistant: ", end="", flush=True)
         else:
             # No more tool calls, we have the final answer
@@ -388,12 +392,24 @@ async def main():
         logger.error("❌ OPENAI_API_KEY environment variable not set")
         logger.error("Set it with: export OPENAI_API_KEY=your_key_here")
         return
+    # TLS to OpenAI while the MCP session comes up
+    warming = asyncio.create_task(registry.warm())
+    # MiniLM off the event loop, the response cache waits for it
+    response_cache.embedder.start()
 
     logger.info("=" * 60)
     logger.info("🚀 Starting MCP HTTP Client with OpenAI")
     logger.info("=" * 60)
 
-    async with MCPHTTPClient() as client:
+    # MCP_TRANSPORT=http goes through aiohttp to mcp-server-http.py,
+    # inprocess/stdio run the same tools (stdio: --stdio) in a ClientSession
+    if MCP_TRANSPORT == "http":
+        mcp_client = MCPHTTPClient()
+    else:
+        mcp_client = SessionToolClient(MCP_TRANSPORT, "mcp-server-http.py")
+
+    async with mcp_client as client:
+        await warming
         # Example 1: Simple query requiring one tool
         # await chat_with_tools(client, "What's the weather like in Tokyo?")
 
@@ -417,6 +433,7 @@ async def main():
 
         logger.info("✅ All conversations completed!")
         logger.info("=" * 60)
+    await registry.aclose()
 
 
 if __name__ == "__main__":
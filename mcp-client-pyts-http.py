@@ -11,20 +11,19 @@ import logging
 from datetime import timedelta
 from typing import Any, Dict, List
 from groq import AsyncGroq
-from openai import AsyncOpenAI
 from mcp.client.session import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
 
+from llm_clients import registry
+from log_setup import configure_logging
+from stream_accumulator import StreamAccumulator
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+configure_logging(fmt="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("mcp-client")
 
-# OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Pooled OpenAI client (llm_clients)
+openai_client = registry.client("openai")
 
 SERVER_URL = "http://localhost:3000/mcp"
 TIMEOUT = timedelta(seconds=60)
@@ -40,7 +39,7 @@ async def process_tool_calls(session: ClientSession, tool_calls):
         tool_name = tool_call.function.name
         tool_args = json.loads(tool_call.function.arguments or "{}")
 
-        logger.info(f"🔧 Executing MCP tool: {tool_name}, {tool_args}")
+        logger.info("🔧 Executing MCP tool: %s, %s", tool_name, tool_args)
         result = await session.call_tool(tool_name, tool_args)
 
         # Extract result text
@@ -54,7 +53,7 @@ async def process_tool_calls(session: ClientSession, tool_calls):
 
         result_text = "\n".join(content)
         logger.info(
-            f"✅ Tool '{tool_name}' completed ({len(result_text)} chars)"
+            "✅ Tool '%s' completed (%s chars)", tool_name, len(result_text)
         )
 
         tool_results.append(
@@ -78,7 +77,7 @@ async def build_openai_tools(session: ClientSession) -> List[Dict[str, Any]]:
         logger.warning("⚠️ No tools available from MCP server.")
         return []
 
-    logger.info(f"✅ Loaded {len(tools)} tools")
+    logger.info("✅ Loaded %s tools", len(tools))
     openai_tools = []
     for tool in tools:
         openai_tools.append(
@@ -102,7 +101,7 @@ async def chat_with_tools(
 ):
     """Run OpenAI chat completion with MCP tool calling"""
     logger.info("\n" + "=" * 60)
-    logger.info(f"💬 User Query: {user_message}")
+    logger.info("💬 User Query: %s", user_message)
     logger.info("=" * 60)
 
     tools = await build_openai_tools(session)
@@ -118,7 +117,7 @@ async def chat_with_tools(
     ]
 
     for iteration in range(5):
-        logger.info(f"🔄 Iteration {iteration + 1}/5")
+        logger.info("🔄 Iteration %s/5", iteration + 1)
         response = await openai_client.chat.completions.create(
             model=model,
             messages=messages,
@@ -149,7 +148,7 @@ async def chat_with_tools(
 
         if message.tool_calls:
             logger.info(
-                f"🛠️  AI requested {len(message.tool_calls)} tool call(s)"
+                "🛠️  AI requested %s tool call(s)", len(message.tool_calls)
             )
             tool_results = await process_tool_calls(
                 session, message.tool_calls
@@ -169,7 +168,7 @@ async def stream_chat_with_tools(
 ):
     """Run a streaming OpenAI chat completion with MCP tool calling"""
     logger.info("\n" + "=" * 60)
-    logger.info(f"💬 Streaming Query: {user_message}")
+    logger.info("💬 Streaming Query: %s", user_message)
     logger.info("=" * 60)
 
     tools = await session.list_tools()
@@ -200,8 +199,7 @@ async def stream_chat_with_tools(
 
     print("\n🤖 Alma: ", end="", flush=True)
     for iteration in range(5):
-        tool_calls_data = {}
-        full_content = ""
+        acc = StreamAccumulator()
 
         stream = await openai_client.chat.completions.create(
             model=model,
@@ -221,70 +219,25 @@ async def stream_chat_with_tools(
         # )
 
         async for chunk in stream:
-            delta = chunk.choices[0].delta
-            if delta.content:
-                print(delta.content, end="", flush=True)
-                full_content += delta.content
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    idx = tc.index
-                    tool_calls_data.setdefault(
-                        idx,
-                        {
-                            "id": "",
-                            "type": "function",
-                            "function": {"name": "", "arguments": ""},
-                        },
-                    )
-                    if tc.id:
-                        tool_calls_data[idx]["id"] = tc.id
-                    if tc.function.name:
-                        tool_calls_data[idx]["function"]["name"] = (
-                            tc.function.name
-                        )
-                    if tc.function.arguments:
-                        tool_calls_data[idx]["function"]["arguments"] += (
-                            tc.function.arguments
-                        )
+            text = acc.add_chunk(chunk)
+            if text:
+                print(text, end="", flush=True)
 
         print()  # newline after stream
 
-        tool_calls_list = (
-            [tool_calls_data[i] for i in sorted(tool_calls_data.keys())]
-            if tool_calls_data
-            else None
-        )
-        messages.append(
-            {
-                "role": "assistant",
-                "content": full_content or None,
-                "tool_calls": tool_calls_list,
-            }
-        )
+        full_content = acc.content
+        tool_calls_list = acc.tool_calls_list()
+        messages.append(acc.to_message())
 
         if tool_calls_list:
-            logger.info(f"🧩 {len(tool_calls_list)} tool call(s) detected")
-
-            class ToolCall:
-                def __init__(self, d):
-                    self.id = d["id"]
-                    self.type = d["type"]
-                    self.function = type(
-                        "Function",
-                        (),
-                        {
-                            "name": d["function"]["name"],
-                            "arguments": d["function"]["arguments"],
-                        },
-                    )()
+            logger.info("🧩 %s tool call(s) detected", len(tool_calls_list))
 
-            tool_objects = [ToolCall(tc) for tc in tool_calls_list]
-            results = await process_tool_calls(session, tool_objects)
+            results = await process_tool_calls(session, tool_calls_list)
             messages.extend(results)
             print("\n🤖 Alma: ", end="", flush=True)
 
             print()  # newline after stream
-            logger.info(f"CONV {messages}")
+            logger.debug("CONV %s", messages)
             print(full_content)
         else:
             print()
@@ -305,6 +258,8 @@ async def main():
             "❌ OPENAI_API_KEY not set. Use: export OPENAI_API_KEY=your_key_here"
         )
         return
+    # TLS to OpenAI while the MCP session comes up
+    warming = asyncio.create_task(registry.warm())
 
     logger.info("=" * 60)
     logger.info(
@@ -320,8 +275,9 @@ async def main():
         async with ClientSession(read_stream, write_stream) as session:
             await session.initialize()
             logger.info(
-                f"✅ Connected to MCP server (Session ID: {get_session_id()})"
+                "✅ Connected to MCP server (Session ID: %s)", get_session_id()
             )
+            await warming
 
             # Run multiple examples
             # await chat_with_tools(
@@ -337,6 +293,7 @@ async def main():
             )
 
             logger.info("\n🏁 All sessions complete.\n")
+    await registry.aclose()
 
 
 if __name__ == "__main__":
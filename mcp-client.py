@@ -2,19 +2,21 @@
 MCP Client with OpenAI Integration
 Install: pip install mcp openai
 Set environment variable: export OPENAI_API_KEY=your_key_here
+Select the tool transport: export MCP_TRANSPORT=inprocess|stdio|http
 """
 
 import asyncio
 import os
 import json
-from groq import AsyncGroq
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from openai import AsyncOpenAI, OpenAI
+from mcp import ClientSession
 
-# Initialize OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm_clients import registry
+from mcp_transports import MCP_TRANSPORT, open_mcp_session
+from stream_accumulator import StreamAccumulator
+
+# Pooled clients, one per provider (llm_clients)
+openai_client = registry.sync_client("openai")
+groq_client = registry.client("groq")
 
 
 async def process_tool_calls(session: ClientSession, tool_calls):
@@ -93,9 +95,7 @@ async def chat_with_tools(
         #     tools=openai_tools,
         #     tool_choice="auto",
         # )
-        response = await AsyncGroq(
-            api_key=os.getenv("GROQ_API_KEY")
-        ).chat.completions.create(
+        response = await groq_client.chat.completions.create(
             model="openai/gpt-oss-20b",
             messages=messages,
             tools=openai_tools,
@@ -199,80 +199,29 @@ async def stream_chat_with_tools(
         )
 
         # Collect streamed response
-        full_content = ""
-        tool_calls_data = {}
+        acc = StreamAccumulator()
 
         for chunk in stream:
-            delta = chunk.choices[0].delta
-
-            # Stream text content
-            if delta.content:
-                print(delta.content, end="", flush=True)
-                full_content += delta.content
-
-            # Collect tool calls
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    idx = tc.index
-                    if idx not in tool_calls_data:
-                        tool_calls_data[idx] = {
-                            "id": "",
-                            "type": "function",
-                            "function": {"name": "", "arguments": ""},
-                        }
-
-                    if tc.id:
-                        tool_calls_data[idx]["id"] = tc.id
-                    if tc.function.name:
-                        tool_calls_data[idx]["function"]["name"] = (
-                            tc.function.name
-                        )
-                    if tc.function.arguments:
-                        tool_calls_data[idx]["function"]["arguments"] += (
-                            tc.function.arguments
-                        )
+            # Stream text content, tool calls are collected as they come
+            text = acc.add_chunk(chunk)
+            if text:
+                print(text, end="", flush=True)
 
         print()  # New line after streaming
 
-        # Convert tool_calls_data to list
-        tool_calls_list = (
-            [tool_calls_data[i] for i in sorted(tool_calls_data.keys())]
-            if tool_calls_data
-            else None
-        )
+        full_content = acc.content
+        tool_calls_list = acc.tool_calls_list()
 
         # Add assistant message to conversation
-        messages.append(
-            {
-                "role": "assistant",
-                "content": full_content or None,
-                "tool_calls": tool_calls_list,
-            }
-        )
+        messages.append(acc.to_message())
 
         print("itt", iteration, messages[-1])
         # Check if we need to call tools
         if tool_calls_list:
             print(f"\n🔄 Processing {len(tool_calls_list)} tool call(s)...\n")
 
-            # Create tool call objects for processing
-            class ToolCall:
-                def __init__(self, data):
-                    self.id = data["id"]
-                    self.type = data["type"]
-                    self.function = type(
-                        "Function",
-                        (),
-                        {
-                            "name": data["function"]["name"],
-                            "arguments": data["function"]["arguments"],
-                        },
-                    )()
-
-            tool_call_objects = [ToolCall(tc) for tc in tool_calls_list]
-
             # Execute all tool calls
-            tool_results = await process_tool_calls(session, tool_call_objects)
+            tool_results = await process_tool_calls(session, tool_calls_list)
 
             # Add tool results to messages
             messages.extend(tool_results)
@@ -295,44 +244,41 @@ async def run_client():
         print("❌ Error: OPENAI_API_KEY environment variable not set")
         print("Set it with: export OPENAI_API_KEY=your_key_here")
         return
-
-    # Define server parameters
-    server_params = StdioServerParameters(
-        command="python", args=["mcp-server.py"], env=None
-    )
+    # TLS to the providers while the MCP session comes up
+    warming = asyncio.create_task(registry.warm())
 
     print("🚀 Starting MCP client with OpenAI integration...\n")
 
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            # Initialize the session
-            await session.initialize()
-            print("✅ Connected to MCP server\n")
-
-            # Example 1: Simple query requiring one tool
-            # await chat_with_tools(session, "What's the weather like in Tokyo?")
-
-            # # Example 2: Complex query requiring multiple tools
-            # await chat_with_tools(
-            #     session,
-            #     "What's the weather in New York, what time is it there, and what's 15% of 250?",
-            # )
-
-            # Example 3: Streaming response with tools
-            # await stream_chat_with_tools(
-            #     session,
-            #     "Tell me the weather in London and calculate the sum of 123 + 456 + 789",
-            # )
-
-            # Example 4: Query that needs sequential tool calls
-            await stream_chat_with_tools(
-                session,
-                "Compare the weather between San Francisco and Seattle, then calculate which temperature is higher by how many degrees. Before calling a function write a little message about the function and a little resume at the end.",
-            )
+    # MCP_TRANSPORT=inprocess|stdio|http selects how we reach mcp-server.py
+    async with open_mcp_session(MCP_TRANSPORT, "mcp-server.py") as session:
+        print(f"✅ Connected to MCP server over {MCP_TRANSPORT}\n")
+        await warming
+
+        # Example 1: Simple query requiring one tool
+        # await chat_with_tools(session, "What's the weather like in Tokyo?")
+
+        # # Example 2: Complex query requiring multiple tools
+        # await chat_with_tools(
+        #     session,
+        #     "What's the weather in New York, what time is it there, and what's 15% of 250?",
+        # )
+
+        # Example 3: Streaming response with tools
+        # await stream_chat_with_tools(
+        #     session,
+        #     "Tell me the weather in London and calculate the sum of 123 + 456 + 789",
+        # )
+
+        # Example 4: Query that needs sequential tool calls
+        await stream_chat_with_tools(
+            session,
+            "Compare the weather between San Francisco and Seattle, then calculate which temperature is higher by how many degrees. Before calling a function write a little message about the function and a little resume at the end.",
+        )
 
-            print("\n" + "=" * 60)
-            print("✅ All conversations completed!")
-            print("=" * 60)
+        print("\n" + "=" * 60)
+        print("✅ All conversations completed!")
+        print("=" * 60)
+    await registry.aclose()
 
 
 if __name__ == "__main__":
@@ -1,25 +1,27 @@
 """
 MCP Server with SSE (Server-Sent Events) over HTTP
 Install: pip install mcp aiohttp aiohttp-sse
+Run: python mcp-server-http.py          (HTTP on :3000, for MCPHTTPClient)
+     python mcp-server-http.py --stdio  (same tools over MCP stdio)
 """
 
 import asyncio
 import json
 import logging
+import sys
 from datetime import datetime
 from typing import Any, Dict
 from aiohttp import web
 from aiohttp_sse import sse_response
 from mcp.server import Server
+from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 import mcp.types as types
 
+from log_setup import configure_logging
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+configure_logging()
 logger = logging.getLogger("mcp-server")
 
 # Create server instance
@@ -166,7 +168,7 @@ async def list_tools() -> list[Tool]:
             },
         ),
     ]
-    logger.info(f"✅ Returning {len(tools)} tools")
+    logger.info("✅ Returning %s tools", len(tools))
     return tools
 
 
@@ -175,8 +177,9 @@ async def call_tool(
     name: str, arguments: dict
 ) -> list[TextContent | ImageContent | EmbeddedResource]:
     """Handle tool calls"""
-    logger.info(f"🔧 Tool call received: {name}")
-    logger.debug(f"   Arguments: {json.dumps(arguments, indent=2)}")
+    logger.info("🔧 Tool call received: %s", name)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   Arguments: %s", json.dumps(arguments, indent=2))
 
     start_time = datetime.now()
 
@@ -198,7 +201,7 @@ async def call_tool(
                 return [
                     TextContent(type="text", text="⚠️ No message provided.")
                 ]
-            logger.info(f"   💬 Sending message to assistant: {message}")
+            logger.info("   💬 Sending message to assistant: %s", message)
             await asyncio.sleep(0.15)
             return [
                 TextContent(
@@ -229,14 +232,14 @@ async def call_tool(
                 "actu",
             ]
             if page not in valid_pages:
-                logger.warning(f"   ⚠️ Invalid page requested: {page}")
+                logger.warning("   ⚠️ Invalid page requested: %s", page)
                 return [
                     TextContent(
                         type="text",
                         text=f"❌ Invalid page '{page}'. Please choose one of: {', '.join(valid_pages)}.",
                     )
                 ]
-            logger.info(f"   🧭 Navigating to page: {page}")
+            logger.info("   🧭 Navigating to page: %s", page)
             await asyncio.sleep(0.1)  # simulate navigation
             return [
                 TextContent(
@@ -246,7 +249,7 @@ async def call_tool(
             ]
         elif name == "selectModel":
             model = arguments.get("modelName", "").strip()
-            logger.info(f"   🧠 Selecting model: {model}")
+            logger.info("   🧠 Selecting model: %s", model)
             await asyncio.sleep(0.15)
             valid_models = [
                 "mistral-large",
@@ -278,7 +281,7 @@ async def call_tool(
         elif name == "displayMemoryManager":
             category = arguments.get("category", "").strip()
             logger.info(
-                f"   📂 Displaying memory manager for category: {category}"
+                "   📂 Displaying memory manager for category: %s", category
             )
             valid_categories = [
                 "userProfile",
@@ -313,7 +316,7 @@ async def call_tool(
             ]
 
         # --- Unknown tool fallback ---
-        logger.warning(f"   ⚠️ Unknown tool requested: {name}")
+        logger.warning("   ⚠️ Unknown tool requested: %s", name)
         return [
             TextContent(
                 type="text",
@@ -323,7 +326,7 @@ async def call_tool(
         ]
 
     except Exception as e:
-        logger.error(f"   ❌ Tool execution error: {str(e)}", exc_info=True)
+        logger.error("   ❌ Tool execution error: %s", str(e), exc_info=True)
         return [
             TextContent(
                 type="text",
@@ -333,7 +336,7 @@ async def call_tool(
 
     finally:
         duration = (datetime.now() - start_time).total_seconds()
-        logger.info(f"   ⏱️ Tool execution completed in {duration:.3f}s")
+        logger.info("   ⏱️ Tool execution completed in %.3fs", duration)
 
 
 # HTTP Handler for MCP over SSE
@@ -345,7 +348,7 @@ class MCPHTTPHandler:
     async def handle_sse(self, request: web.Request) -> web.Response:
         """Handle SSE connections for streaming MCP requests"""
         client_id = request.remote
-        self.logger.info(f"🔌 New SSE connection from {client_id}")
+        self.logger.info("🔌 New SSE connection from %s", client_id)
 
         async with sse_response(request) as resp:
             try:
@@ -360,25 +363,28 @@ class MCPHTTPHandler:
 
             except asyncio.CancelledError:
                 self.logger.info(
-                    f"🔌 SSE connection closed by client {client_id}"
+                    "🔌 SSE connection closed by client %s", client_id
                 )
             except Exception as e:
-                self.logger.error(f"❌ SSE error for {client_id}: {str(e)}")
+                self.logger.error("❌ SSE error for %s: %s", client_id, str(e))
 
         return resp
 
     async def handle_request(self, request: web.Request) -> web.Response:
         """Handle POST requests for MCP operations"""
         client_id = request.remote
-        self.logger.info(f"📨 HTTP request received from {client_id}")
+        self.logger.info("📨 HTTP request received from %s", client_id)
 
         try:
             data = await request.json()
             method = data.get("method")
             params = data.get("params", {})
 
-            self.logger.info(f"   Method: {method}")
-            self.logger.debug(f"   Params: {json.dumps(params, indent=2)}")
+            self.logger.info("   Method: %s", method)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "   Params: %s", json.dumps(params, indent=2)
+                )
 
             if method == "tools/list":
                 tools = await list_tools()
@@ -392,7 +398,7 @@ class MCPHTTPHandler:
                         for tool in tools
                     ]
                 }
-                self.logger.info(f"   ✓ Returning {len(tools)} tools")
+                self.logger.info("   ✓ Returning %s tools", len(tools))
                 return web.json_response(response_data)
 
             elif method == "tools/call":
@@ -407,21 +413,21 @@ class MCPHTTPHandler:
                         for content in result
                     ]
                 }
-                self.logger.info(f"   ✓ Tool call completed successfully")
+                self.logger.info("   ✓ Tool call completed successfully")
                 return web.json_response(response_data)
 
             else:
-                self.logger.warning(f"   ⚠️ Unknown method: {method}")
+                self.logger.warning("   ⚠️ Unknown method: %s", method)
                 return web.json_response(
                     {"error": f"Unknown method: {method}"}, status=400
                 )
 
         except json.JSONDecodeError as e:
-            self.logger.error(f"   ❌ Invalid JSON: {str(e)}")
+            self.logger.error("   ❌ Invalid JSON: %s", str(e))
             return web.json_response({"error": "Invalid JSON"}, status=400)
         except Exception as e:
             self.logger.error(
-                f"   ❌ Request handling error: {str(e)}", exc_info=True
+                "   ❌ Request handling error: %s", str(e), exc_info=True
             )
             return web.json_response({"error": str(e)}, status=500)
 
@@ -461,13 +467,13 @@ async def main():
     site = web.TCPSite(runner, host, port)
     await site.start()
 
-    logger.info(f"")
-    logger.info(f"✅ Server running on http://{host}:{port}")
-    logger.info(f"   📍 Endpoints:")
-    logger.info(f"      POST http://localhost:{port}/mcp - MCP requests")
-    logger.info(f"      GET  http://localhost:{port}/mcp/sse - SSE streaming")
-    logger.info(f"      GET  http://localhost:{port}/health - Health check")
-    logger.info(f"")
+    logger.info("")
+    logger.info("✅ Server running on http://%s:%s", host, port)
+    logger.info("   📍 Endpoints:")
+    logger.info("      POST http://localhost:%s/mcp - MCP requests", port)
+    logger.info("      GET  http://localhost:%s/mcp/sse - SSE streaming", port)
+    logger.info("      GET  http://localhost:%s/health - Health check", port)
+    logger.info("")
     logger.info("=" * 60)
     logger.info("📊 Server ready to accept connections...")
     logger.info("=" * 60)
@@ -481,5 +487,13 @@ async def main():
         logger.info("✅ Server stopped")
 
 
+async def main_stdio():
+    """Serve the same tools over MCP stdio, e.g. for MCP_TRANSPORT=stdio"""
+    async with stdio_server() as (read_stream, write_stream):
+        await app.run(
+            read_stream, write_stream, app.create_initialization_options()
+        )
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main_stdio() if "--stdio" in sys.argv[1:] else main())
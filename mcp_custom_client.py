@@ -1,17 +1,23 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 import uvicorn
-from rtc_client import rtc_client
+from agent_manager import load_agent_manager
+from direct_actions import DirectActions
+from llm_clients import registry
+from log_setup import configure_logging
+from mcp_peer_sessions import MCPConnectionManager
+from orchestrator import Orchestrator, default_providers
+from planner import DIR, ULTDIR, Planner
+from stream_accumulator import StreamAccumulator
+from tool_stream import EagerToolDispatcher
 
 
 import asyncio
-import os
 import json
 import logging
+import time
 from datetime import timedelta
 from typing import Any, Dict, List
-from groq import AsyncGroq
-from openai import AsyncOpenAI
 from mcp.client.session import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
 
@@ -19,15 +25,13 @@ from aiortc import RTCPeerConnection, RTCSessionDescription, RTCDataChannel
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+configure_logging(fmt="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("mcp-client")
 
-# OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Pooled, pre-warmed SDK clients (llm_clients)
+openai_client = registry.client("openai")
+# Streamed turns: every provider with an API key set
+orchestrator = Orchestrator(default_providers(registry))
 
 SERVER_URL = "http://localhost:3000/mcp"
 TIMEOUT = timedelta(seconds=60)
@@ -43,7 +47,7 @@ async def process_tool_calls(session: ClientSession, tool_calls):
         tool_name = tool_call.function.name
         tool_args = json.loads(tool_call.function.arguments or "{}")
 
-        logger.info(f"🔧 Executing MCP tool: {tool_name}, {tool_args}")
+        logger.info("🔧 Executing MCP tool: %s, %s", tool_name, tool_args)
         result = await session.call_tool(tool_name, tool_args)
 
         # Extract result text
@@ -57,7 +61,7 @@ async def process_tool_calls(session: ClientSession, tool_calls):
 
         result_text = "\n".join(content)
         logger.info(
-            f"✅ Tool '{tool_name}' completed ({len(result_text)} chars)"
+            "✅ Tool '%s' completed (%s chars)", tool_name, len(result_text)
         )
 
         tool_results.append(
@@ -81,7 +85,7 @@ async def build_openai_tools(session: ClientSession) -> List[Dict[str, Any]]:
         logger.warning("⚠️ No tools available from MCP server.")
         return []
 
-    logger.info(f"✅ Loaded {len(tools)} tools")
+    logger.info("✅ Loaded %s tools", len(tools))
     openai_tools = []
     for tool in tools:
         openai_tools.append(
@@ -105,7 +109,7 @@ async def chat_with_tools(
 ):
     """Run OpenAI chat completion with MCP tool calling"""
     logger.info("\n" + "=" * 60)
-    logger.info(f"💬 User Query: {user_message}")
+    logger.info("💬 User Query: %s", user_message)
     logger.info("=" * 60)
 
     tools = await build_openai_tools(session)
@@ -121,7 +125,7 @@ async def chat_with_tools(
     ]
 
     for iteration in range(5):
-        logger.info(f"🔄 Iteration {iteration + 1}/5")
+        logger.info("🔄 Iteration %s/5", iteration + 1)
         response = await openai_client.chat.completions.create(
             model=model,
             messages=messages,
@@ -152,7 +156,7 @@ async def chat_with_tools(
 
         if message.tool_calls:
             logger.info(
-                f"🛠️  AI requested {len(message.tool_calls)} tool call(s)"
+                "🛠️  AI requested %s tool call(s)", len(message.tool_calls)
             )
             tool_results = await process_tool_calls(
                 session, message.tool_calls
@@ -167,12 +171,13 @@ async def chat_with_tools(
     return None
 
 
-async def stream_chat_with_tools(
-    session: ClientSession, user_message: str, model="gpt-4o-mini"
-):
-    """Run a streaming OpenAI chat completion with MCP tool calling"""
+async def stream_chat_with_tools(session: ClientSession, user_message: str):
+    """
+    Run a streaming chat completion with MCP tool calling; the
+    orchestrator picks the provider and model
+    """
     logger.info("\n" + "=" * 60)
-    logger.info(f"💬 Streaming Query: {user_message}")
+    logger.info("💬 Streaming Query: %s", user_message)
     logger.info("=" * 60)
 
     tools = await session.list_tools()
@@ -202,92 +207,50 @@ async def stream_chat_with_tools(
     ]
 
     print("\n🤖 Alma: ", end="", flush=True)
+    turn_saved = 0.0
     for iteration in range(5):
-        tool_calls_data = {}
-        full_content = ""
+        acc = StreamAccumulator()
+        dispatcher = EagerToolDispatcher(
+            lambda tc: process_tool_calls(session, [tc]), acc
+        )
 
-        stream = await openai_client.chat.completions.create(
-            model=model,
+        # gpt-4o-mini and the Groq gpt-oss models, hedged (orchestrator)
+        stream = await orchestrator.chat.completions.create(
             messages=messages,
             tools=openai_tools,
             tool_choice="auto",
             stream=True,
         )
-        # stream = await AsyncGroq(
-        #     api_key=os.getenv("GROQ_API_KEY")
-        # ).chat.completions.create(
-        #     model="openai/gpt-oss-120b",
-        #     messages=messages,
-        #     tools=openai_tools,
-        #     tool_choice="auto",
-        #     stream=True,
-        # )
 
         async for chunk in stream:
-            delta = chunk.choices[0].delta
-            if delta.content:
-                print(delta.content, end="", flush=True)
-                full_content += delta.content
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    idx = tc.index
-                    tool_calls_data.setdefault(
-                        idx,
-                        {
-                            "id": "",
-                            "type": "function",
-                            "function": {"name": "", "arguments": ""},
-                        },
-                    )
-                    if tc.id:
-                        tool_calls_data[idx]["id"] = tc.id
-                    if tc.function.name:
-                        tool_calls_data[idx]["function"]["name"] = (
-                            tc.function.name
-                        )
-                    if tc.function.arguments:
-                        tool_calls_data[idx]["function"]["arguments"] += (
-                            tc.function.arguments
-                        )
+            text = dispatcher.add_chunk(chunk)
+            if text:
+                print(text, end="", flush=True)
 
+        dispatcher.finish()
+        stream_end = time.perf_counter()
         print()  # newline after stream
 
-        tool_calls_list = (
-            [tool_calls_data[i] for i in sorted(tool_calls_data.keys())]
-            if tool_calls_data
-            else None
-        )
-        messages.append(
-            {
-                "role": "assistant",
-                "content": full_content or None,
-                "tool_calls": tool_calls_list,
-            }
-        )
+        full_content = acc.content
+        tool_calls_list = acc.tool_calls_list()
+        messages.append(acc.to_message())
 
         if tool_calls_list:
-            logger.info(f"🧩 {len(tool_calls_list)} tool call(s) detected")
-
-            class ToolCall:
-                def __init__(self, d):
-                    self.id = d["id"]
-                    self.type = d["type"]
-                    self.function = type(
-                        "Function",
-                        (),
-                        {
-                            "name": d["function"]["name"],
-                            "arguments": d["function"]["arguments"],
-                        },
-                    )()
+            logger.info("🧩 %s tool call(s) detected", len(tool_calls_list))
 
-            tool_objects = [ToolCall(tc) for tc in tool_calls_list]
-            results = await process_tool_calls(session, tool_objects)
+            results = await dispatcher.results()
+            saved = dispatcher.latency_saved(stream_end, time.perf_counter())
+            turn_saved += saved
+            logger.info(
+                "⚡ Early tool dispatch saved %.0f ms (turn total %.0f ms)",
+                saved * 1000,
+                turn_saved * 1000,
+            )
             messages.extend(results)
             print("\n🤖 Alma: ", end="", flush=True)
 
             print()  # newline after stream
-            logger.info(f"CONV {messages}")
+            logger.debug("CONV %s", messages)
             print(full_content)
         else:
             print()
@@ -305,21 +268,97 @@ async def stream_chat_with_tools(
 
 pcs = set()
 
-recognizers = {}
+# One MCP ClientSession per RTCPeerConnection, voice turns run in it
+mcp_sessions = MCPConnectionManager(stream_chat_with_tools)
+# Peer -> its "text" channel, earcons go back on it
+text_channels = {}
+
+
+def current_mcp_session(pc):
+    peer_session = mcp_sessions.get(pc)
+    return peer_session.session if peer_session is not None else None
+
+
+def play_earcon(pc, name: str):
+    channel = text_channels.get(pc)
+    if channel is not None and channel.readyState == "open":
+        channel.send(json.dumps({"type": "earcon", "name": name}))
+
+
+# UI commands run their tool directly, without the LLM tool loop
+direct_actions = DirectActions(current_mcp_session, play_earcon)
+# PLANNER_AGENT: only turns it marks _ultdir_ try the direct path
+planner = Planner()
+# AMNGR: page agents, each built on its first turn; None without AutoGen
+agent_manager = load_agent_manager()
+
+
+def on_text_message(pc, peer_session, message):
+    """Text channel message: a client context update or a user turn"""
+    if not isinstance(message, str) or not message.strip():
+        return
+    try:
+        msg = json.loads(message)
+    except ValueError:
+        msg = None
+    if isinstance(msg, dict) and msg.get("type") == "context":
+        if msg.get("action") == "update" and agent_manager is not None:
+            agent_manager.context_update(pc, msg.get("payload") or {})
+        return
+    task = asyncio.ensure_future(dispatch_turn(pc, peer_session, message))
+    task.add_done_callback(log_turn_failure)
+
+
+def log_turn_failure(task: asyncio.Future):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Turn dispatch failed", exc_info=task.exception())
+
+
+async def dispatch_turn(pc, peer_session, message: str):
+    decision = await planner.decide(message)
+    if decision == ULTDIR:
+        # UI commands act through tools: directly, else in the tool loop
+        if await direct_actions.execute(pc, message) is None:
+            peer_session.submit_turn(message)
+        return
+    if decision == DIR and agent_manager is not None:
+        # Nothing to do on the UI: the page's agent answers
+        try:
+            await agent_reply(pc, message)
+            return
+        except Exception:
+            logger.exception("Page agent failed, using the tool loop")
+    peer_session.submit_turn(message)
+
+
+async def agent_reply(pc, message: str):
+    page, _ = await agent_manager.route(pc, message)
+    reply = await agent_manager.run(pc, page, message)
+    channel = text_channels.get(pc)
+    if channel is not None and channel.readyState == "open":
+        channel.send(
+            json.dumps(
+                {"type": "agent_reply", "page": page, "text": reply},
+                ensure_ascii=False,
+            )
+        )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code (optional)
     print("Server starting...")
+    # TLS to the providers in the background, kept up when idle
+    registry.start(warm=True)
+    # SmolLM EOS loads off the event loop, punctuation rules until then
+    planner.start()
     yield
     # Shutdown code
     print("Server shutting down...")
+    await mcp_sessions.close_all()
     for pc in pcs:
         await pc.close()
-        recognizer, push_stream = recognizers[pc]
-        push_stream.close()
-        recognizer.stop_continuous_recognition()
+    await registry.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -335,9 +374,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-channels = {}  # mutable container
-channel_ready = asyncio.Future()
-
 
 @app.post("/offer")
 async def offer(request: Request):
@@ -348,21 +384,51 @@ async def offer(request: Request):
     pcs.add(pc)
     logger.info("[LOG] RTCPeerConnection created.")
 
-    # Queues for communication
-    queue_in: asyncio.Queue = asyncio.Queue()
+    # --- Initialize MCP Client for this peer ---
+    peer_session = mcp_sessions.open(pc)
 
     # --- Data Channels from Browser ---
     @pc.on("datachannel")
     def on_datachannel(channel: RTCDataChannel):
-        logger.info(f"[LOG] Data channel received: {channel.label}")
+        logger.info("[LOG] Data channel received: %s", channel.label)
 
         if channel.label == "text-out":
             logger.info("[LOG] Server received mcp_read channel")
-            channel.on("message", lambda msg: queue_in.put_nowait(msg))
-            channels["out"] = channel
+            peer_session.attach_channel(channel)
+
+        elif channel.label == "text":
+            text_channels[pc] = channel
+
+            # Recognized user turns, dispatched into this peer's session,
+            # and the client's page on screen for the page agents
+            @channel.on("message")
+            def on_text(message):
+                on_text_message(pc, peer_session, message)
+
+            def request_context():
+                channel.send(
+                    json.dumps({"type": "context", "action": "request"})
+                )
+
+            if channel.readyState == "open":
+                request_context()
+            else:
+                channel.on("open", request_context)
 
-            if not channel_ready.done():
-                channel_ready.set_result(True)
+    @pc.on("connectionstatechange")
+    async def on_connectionstatechange():
+        logger.info(
+            "[LOG] %s connection state: %s",
+            peer_session.peer_id,
+            pc.connectionState,
+        )
+        if pc.connectionState in ("failed", "closed"):
+            await mcp_sessions.close(pc)
+            await pc.close()
+            pcs.discard(pc)
+            text_channels.pop(pc, None)
+            if agent_manager is not None:
+                await agent_manager.forget(pc)
 
     # --- Set Remote Description and Create Answer ---
     await pc.setRemoteDescription(offer)
@@ -370,25 +436,6 @@ async def offer(request: Request):
     await pc.setLocalDescription(answer)
     logger.info("[LOG] SDP answer created and set.")
 
-    # --- Initialize MCP Client ---
-    async def run_mcp_client():
-        await channel_ready
-        print(channels)
-        logger.info("[MCP] Initializing MCP session...")
-        async with rtc_client(queue_in, channels["out"]) as (
-            read_stream,
-            write_stream,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                logger.info("[MCP] Wants to connect")
-                await session.initialize()
-                logger.info("[MCP] Connected to MCP server (Session ID:)")
-                await stream_chat_with_tools(
-                    session, "Create a new note in Scribe."
-                )
-
-    asyncio.create_task(run_mcp_client())
-
     return {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
 
 
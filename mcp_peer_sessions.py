@@ -0,0 +1,192 @@
+"""
+Per-peer MCP sessions over WebRTC data channels
+Each RTCPeerConnection gets its own ClientSession, kept alive for the
+life of the peer. Voice turns are queued into it and run one at a time.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from mcp.client.session import ClientSession
+
+from rtc_client import rtc_client
+
+logger = logging.getLogger("mcp-peer-sessions")
+
+TurnHandler = Callable[[ClientSession, str], Awaitable[Any]]
+
+CLOSE_TIMEOUT = 5.0
+
+
+class PeerMCPSession:
+    """MCP client session bound to a single peer connection"""
+
+    def __init__(self, peer_id: str, turn_handler: TurnHandler):
+        self.peer_id = peer_id
+        self.turn_handler = turn_handler
+        self.queue_in: asyncio.Queue = asyncio.Queue()
+        self.turns: asyncio.Queue = asyncio.Queue()
+        self.channel = None
+        self.channel_ready = asyncio.Event()
+        self.session: Optional[ClientSession] = None
+        # Set once the session is up, or failed: then error is set
+        self.ready = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self.turns_done = 0
+
+    def attach_channel(self, channel):
+        """Bind the data channel carrying MCP JSON-RPC for this peer"""
+        self.channel = channel
+        channel.on("message", self.queue_in.put_nowait)
+        self.channel_ready.set()
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        """Open the MCP session once the channel is up and serve turns"""
+        try:
+            await self._serve()
+        except Exception as e:
+            # initialize() or the transport failed: nothing will serve
+            # the queued turns, fail them instead of leaving them pending
+            logger.error(
+                "[MCP] Session failed for peer %s: %s",
+                self.peer_id,
+                e,
+                exc_info=True,
+            )
+            self.error = e
+            self.ready.set()
+            self._fail_turns(e)
+        finally:
+            self.session = None
+
+    def _fail_turns(self, error: BaseException):
+        while not self.turns.empty():
+            item = self.turns.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(error)
+
+    async def _serve(self):
+        await self.channel_ready.wait()
+        if self.channel is None:
+            # Closed before the peer opened its channel
+            logger.info("[MCP] Peer %s closed, no channel", self.peer_id)
+            return
+        logger.info("[MCP] Initializing MCP session for peer %s", self.peer_id)
+        async with rtc_client(self.queue_in, self.channel) as (
+            read_stream,
+            write_stream,
+        ):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                self.session = session
+                self.ready.set()
+                logger.info("[MCP] Connected to peer %s", self.peer_id)
+
+                while True:
+                    item = await self.turns.get()
+                    if item is None:  # end signal
+                        break
+                    text, future = item
+                    try:
+                        result = await self.turn_handler(session, text)
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as e:
+                        logger.error(
+                            "[MCP] Turn failed for peer %s: %s",
+                            self.peer_id,
+                            e,
+                            exc_info=True,
+                        )
+                        if not future.done():
+                            future.set_exception(e)
+                    finally:
+                        self.turns_done += 1
+
+        logger.info("[MCP] Session closed for peer %s", self.peer_id)
+
+    def submit_turn(self, text: str) -> asyncio.Future:
+        """Queue a voice turn, resolved with the turn handler's result"""
+        future = asyncio.get_running_loop().create_future()
+        if self.error is not None:
+            future.set_exception(self.error)
+        else:
+            self.turns.put_nowait((text, future))
+        return future
+
+    async def close(self):
+        """Stop serving turns and tear the MCP session down"""
+        # Cancel turns still waiting in the queue
+        while not self.turns.empty():
+            _, future = self.turns.get_nowait()
+            future.cancel()
+
+        self.turns.put_nowait(None)
+        self.queue_in.put_nowait(None)
+        # Unblock run() if the channel never showed up
+        self.channel_ready.set()
+
+        if self.task is None or self.task.done():
+            return
+        try:
+            await asyncio.wait_for(self.task, CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "[MCP] Session for peer %s did not stop, cancelling",
+                self.peer_id,
+            )
+        except Exception as e:
+            logger.error(
+                "[MCP] Session for peer %s ended: %s", self.peer_id, e
+            )
+
+
+class MCPConnectionManager:
+    """Owns one PeerMCPSession per RTCPeerConnection"""
+
+    def __init__(self, turn_handler: TurnHandler):
+        self.turn_handler = turn_handler
+        self.sessions: Dict[Any, PeerMCPSession] = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def open(self, pc) -> PeerMCPSession:
+        """Create and start the session for a new peer"""
+        if pc in self.sessions:
+            return self.sessions[pc]
+        self._next_id += 1
+        peer_session = PeerMCPSession(
+            f"peer-{self._next_id}", self.turn_handler
+        )
+        self.sessions[pc] = peer_session
+        peer_session.start()
+        logger.info(
+            "[MCP] Opened %s (%d active)", peer_session.peer_id, len(self)
+        )
+        return peer_session
+
+    def get(self, pc) -> Optional[PeerMCPSession]:
+        return self.sessions.get(pc)
+
+    def submit_turn(self, pc, text: str) -> asyncio.Future:
+        return self.sessions[pc].submit_turn(text)
+
+    async def close(self, pc):
+        peer_session = self.sessions.pop(pc, None)
+        if peer_session is None:
+            return
+        await peer_session.close()
+        logger.info(
+            "[MCP] Closed %s (%d active)", peer_session.peer_id, len(self)
+        )
+
+    async def close_all(self):
+        await asyncio.gather(*(self.close(pc) for pc in list(self.sessions)))
@@ -0,0 +1,166 @@
+"""
+MCP transport selection: in-process, stdio or streamable HTTP
+In-process connects ClientSession straight to the Server instance's run()
+through anyio memory streams, so SessionMessage objects are handed over
+as-is with no JSON encoding and no subprocess or socket in between.
+Set MCP_TRANSPORT=inprocess|stdio|http to switch.
+  inprocess  any script defining an mcp `Server` as `app` (mcp-server.py,
+             mcp-server-http.py)
+  stdio      the script run with --stdio: mcp-server.py always speaks
+             stdio, mcp-server-http.py only with --stdio
+  http       a streamable-HTTP MCP server at MCP_SERVER_URL. Not
+             mcp-server-http.py, whose POST /mcp API is spoken by
+             MCPHTTPClient in mcp-client-http.py
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Any, Dict, List
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.server import Server
+from mcp.shared.message import SessionMessage
+
+logger = logging.getLogger("mcp-transports")
+
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "inprocess")
+MCP_SERVER_SCRIPT = os.getenv("MCP_SERVER_SCRIPT", "mcp-server.py")
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:3000/mcp")
+TIMEOUT = timedelta(seconds=60)
+
+TRANSPORTS = ("inprocess", "stdio", "http")
+
+_servers: Dict[str, Server] = {}
+
+
+def load_server(script: str = MCP_SERVER_SCRIPT) -> Server:
+    """Import a server script (mcp-server.py, ...) and return its `app`"""
+    path = os.path.abspath(script)
+    if path not in _servers:
+        name = os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _servers[path] = module.app
+    return _servers[path]
+
+
+@asynccontextmanager
+async def inprocess_client(server: Server):
+    """
+    Run `server` in this event loop and yield (read_stream, write_stream)
+    for a ClientSession, symmetrical to stdio_client.
+    """
+    client_write, server_read = anyio.create_memory_object_stream[
+        SessionMessage | Exception
+    ](1)
+    server_write, client_read = anyio.create_memory_object_stream[
+        SessionMessage
+    ](1)
+
+    async with client_write, server_read, server_write, client_read:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(
+                lambda: server.run(
+                    server_read,
+                    server_write,
+                    server.create_initialization_options(),
+                )
+            )
+            yield client_read, client_write
+
+            # Once the caller's 'async with' block exits, we shut down
+            tg.cancel_scope.cancel()
+
+
+@asynccontextmanager
+async def open_mcp_session(
+    transport: str = MCP_TRANSPORT,
+    server_script: str = MCP_SERVER_SCRIPT,
+    server_url: str = MCP_SERVER_URL,
+):
+    """Yield an initialized ClientSession over the selected transport"""
+    if transport not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown MCP transport '{transport}', use one of {TRANSPORTS}"
+        )
+    logger.info("🔌 Opening MCP session over %s", transport)
+
+    if transport == "inprocess":
+        streams = inprocess_client(load_server(server_script))
+    elif transport == "stdio":
+        streams = stdio_client(
+            StdioServerParameters(
+                command=sys.executable,
+                args=[server_script, "--stdio"],
+                env=None,
+            )
+        )
+    else:
+        streams = streamablehttp_client(url=server_url, timeout=TIMEOUT)
+
+    async with streams as (read_stream, write_stream, *_):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            yield session
+
+
+class SessionToolClient:
+    """
+    MCPHTTPClient-compatible facade (list_tools / call_tool returning
+    plain dicts) over a ClientSession, for mcp-client-http.py. Over
+    http use MCPHTTPClient instead: mcp-server-http.py does not speak
+    streamable HTTP.
+    """
+
+    def __init__(
+        self,
+        transport: str = MCP_TRANSPORT,
+        server_script: str = "mcp-server-http.py",
+    ):
+        if transport == "http" and server_script == "mcp-server-http.py":
+            raise ValueError(
+                "mcp-server-http.py does not speak streamable HTTP, use"
+                " MCPHTTPClient for MCP_TRANSPORT=http"
+            )
+        self.transport = transport
+        self.server_script = server_script
+        self._cm = None
+        self.session: ClientSession = None
+
+    async def __aenter__(self):
+        self._cm = open_mcp_session(self.transport, self.server_script)
+        self.session = await self._cm.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._cm.__aexit__(exc_type, exc_val, exc_tb)
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        tools = await self.session.list_tools()
+        return [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "inputSchema": tool.inputSchema,
+            }
+            for tool in tools.tools
+        ]
+
+    async def call_tool(
+        self, name: str, arguments: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        result = await self.session.call_tool(name, arguments)
+        return {
+            "content": [
+                {"type": c.type, "text": getattr(c, "text", str(c))}
+                for c in result.content
+            ]
+        }
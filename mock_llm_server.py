@@ -0,0 +1,296 @@
+"""
+Mock OpenAI/Groq-compatible chat completions server for load tests
+POST /v1/chat/completions answers like the real API, streamed (SSE, with
+tool_calls deltas) or not, from a keyword script and a latency profile:
+  - last message is a tool result   -> short text answer
+  - tools offered and a script hit  -> the scripted tool call(s)
+  - otherwise                       -> text answer
+Point the SDKs at it, no client change needed:
+  export OPENAI_BASE_URL=http://localhost:8000/v1
+  export GROQ_BASE_URL=http://localhost:8000/openai
+Install: pip install aiohttp
+Run: python mock_llm_server.py --profile openai --port 8000
+     (--cert cert.pem --key key.pem for https)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from log_setup import configure_logging
+
+configure_logging()
+logger = logging.getLogger("mock-llm")
+
+
+@dataclass
+class LatencyProfile:
+    ttft: float  # seconds before the first chunk
+    tps: float  # streamed tokens per second
+    jitter: float = 0.0  # +/- fraction applied to ttft
+
+
+PROFILES = {
+    "instant": LatencyProfile(ttft=0.0, tps=0.0),
+    "groq": LatencyProfile(ttft=0.15, tps=400.0, jitter=0.2),
+    "openai": LatencyProfile(ttft=0.35, tps=90.0, jitter=0.3),
+    "slow": LatencyProfile(ttft=1.0, tps=30.0, jitter=0.5),
+}
+
+# (keywords in the user message, [(tool, arguments), ...])
+SCRIPT = [
+    (("page", "go to", "open"), [("navigateToPage", {"page": "docs"})]),
+    (("model",), [("selectModel", {"modelName": "gpt-4o"})]),
+    (("eco",), [("toggleEcoMode", {})]),
+    (
+        ("memory", "profile"),
+        [("displayMemoryManager", {"category": "userProfile"})],
+    ),
+    (("ask", "search", "what", "how"), [("sendMessage", {"message": "?"})]),
+    (
+        ("everything", "all"),
+        [
+            ("navigateToPage", {"page": "chat"}),
+            ("selectModel", {"modelName": "mistral-large"}),
+            ("toggleEcoMode", {}),
+        ],
+    ),
+]
+TEXT_REPLY = "C'est fait, je m'en occupe tout de suite."
+TOOL_DONE_REPLY = "Voilà, l'action a bien été effectuée."
+
+
+class MockLLM:
+    def __init__(self, profile: LatencyProfile, seed: int = 0):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.streamed_chunks = 0
+
+    # --- scripted behaviour ---
+
+    def plan(self, body: Dict[str, Any]):
+        """Return (text, tool_calls) for this request"""
+        messages = body.get("messages", [])
+        if messages and messages[-1].get("role") == "tool":
+            return TOOL_DONE_REPLY, []
+
+        offered = {
+            tool["function"]["name"] for tool in body.get("tools") or []
+        }
+        user = next(
+            (
+                m.get("content") or ""
+                for m in reversed(messages)
+                if m.get("role") == "user"
+            ),
+            "",
+        ).lower()
+        for keywords, calls in SCRIPT:
+            if any(k in user for k in keywords):
+                calls = [c for c in calls if c[0] in offered]
+                if calls:
+                    return None, calls
+        return TEXT_REPLY, []
+
+    # --- wire format ---
+
+    def chunk(self, cid, model, delta, finish_reason=None) -> bytes:
+        payload = {
+            "id": cid,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            ],
+        }
+        self.streamed_chunks += 1
+        return b"data: " + json.dumps(payload).encode() + b"\n\n"
+
+    def stream_deltas(self, text: Optional[str], calls):
+        """Yield delta dicts the way the API splits them"""
+        yield {"role": "assistant", "content": "" if text else None}
+        if text:
+            for word in text.split(" "):
+                yield {"content": word + " "}
+            return
+        for index, (name, arguments) in enumerate(calls):
+            yield {
+                "tool_calls": [
+                    {
+                        "index": index,
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": ""},
+                    }
+                ]
+            }
+            encoded = json.dumps(arguments)
+            for i in range(0, len(encoded), 8):
+                yield {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "function": {"arguments": encoded[i : i + 8]},
+                        }
+                    ]
+                }
+
+    async def first_token_delay(self):
+        ttft = self.profile.ttft
+        if self.profile.jitter:
+            ttft *= 1 + self.random.uniform(
+                -self.profile.jitter, self.profile.jitter
+            )
+        if ttft > 0:
+            await asyncio.sleep(ttft)
+
+    # --- handlers ---
+
+    async def handle_completions(self, request: web.Request):
+        body = await request.json()
+        self.requests += 1
+        model = body.get("model", "mock")
+        cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        text, calls = self.plan(body)
+        finish_reason = "tool_calls" if calls else "stop"
+
+        await self.first_token_delay()
+        if not body.get("stream"):
+            return web.json_response(
+                self.completion(cid, model, text, calls, finish_reason)
+            )
+
+        resp = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+            }
+        )
+        await resp.prepare(request)
+        token_delay = 1 / self.profile.tps if self.profile.tps else 0
+        for i, delta in enumerate(self.stream_deltas(text, calls)):
+            if i and token_delay:
+                await asyncio.sleep(token_delay)
+            await resp.write(self.chunk(cid, model, delta))
+        await resp.write(self.chunk(cid, model, {}, finish_reason))
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    def completion(self, cid, model, text, calls, finish_reason):
+        message: Dict[str, Any] = {"role": "assistant", "content": text}
+        if calls:
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "arguments": json.dumps(arguments),
+                    },
+                }
+                for name, arguments in calls
+            ]
+        return {
+            "id": cid,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+            },
+        }
+
+    async def handle_models(self, request: web.Request):
+        # The SDKs' models.list(), what LLMClientRegistry warms with
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {"id": "mock", "object": "model", "owned_by": "mock"}
+                ],
+            }
+        )
+
+    async def handle_stats(self, request: web.Request):
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "streamed_chunks": self.streamed_chunks,
+            }
+        )
+
+
+def create_app(profile: LatencyProfile, seed: int = 0) -> web.Application:
+    mock = MockLLM(profile, seed)
+    webapp = web.Application()
+    # OpenAI SDK base_url .../v1, Groq SDK base_url .../openai(/v1)
+    for prefix in ("/v1", "/openai/v1"):
+        webapp.router.add_post(
+            f"{prefix}/chat/completions", mock.handle_completions
+        )
+        webapp.router.add_get(f"{prefix}/models", mock.handle_models)
+    webapp.router.add_get("/stats", mock.handle_stats)
+    return webapp
+
+
+def ssl_context(cert: Optional[str], key: Optional[str]):
+    if not cert:
+        return None
+    import ssl
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def main(
+    profile_name: str,
+    port: int,
+    seed: int,
+    cert: Optional[str] = None,
+    key: Optional[str] = None,
+):
+    runner = web.AppRunner(create_app(PROFILES[profile_name], seed))
+    await runner.setup()
+    context = ssl_context(cert, key)
+    await web.TCPSite(runner, "0.0.0.0", port, ssl_context=context).start()
+    logger.info(
+        "🧪 Mock LLM on %s://localhost:%s/v1 (profile %s: %s)",
+        "https" if context else "http",
+        port,
+        profile_name,
+        PROFILES[profile_name],
+    )
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--profile", choices=PROFILES, default="openai")
+    parser.add_argument("--seed", type=int, default=0)
+    # TLS, to measure handshakes (LLMClientRegistry warm-up)
+    parser.add_argument("--cert")
+    parser.add_argument("--key")
+    args = parser.parse_args()
+    asyncio.run(main(args.profile, args.port, args.seed, args.cert, args.key))
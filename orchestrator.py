@@ -0,0 +1,283 @@
+"""
+ORCHESTRATOR: one streamed chat completion over several LLM providers
+The same prompts run on gpt-4o-mini (OpenAI) and openai/gpt-oss-20b or
+-120b (Groq). Each Provider keeps a rolling scoreboard of time to first
+token and tokens per second, and a request goes to the one expected to
+finish a reply first. If that one has no token by its own p90 TTFT, the
+next one is asked as well (hedged request): whichever streams a valid
+first token (content or a tool call, not reasoning) wins and the other
+is cancelled. race=True asks every provider at once instead.
+A provider failing before its first token fails over to the next one,
+a failure mid-stream is raised to the caller.
+Drop-in for the SDK clients of the voice scripts:
+    stream = await orchestrator.chat.completions.create(messages=...)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from llm_clients import LLMClientRegistry, registry
+from turn_tracing import WINDOW, SpanHistogram
+
+logger = logging.getLogger("orchestrator")
+
+
+def valid(chunk) -> bool:
+    """A chunk the user gets something from"""
+    if not chunk.choices:
+        return False
+    delta = chunk.choices[0].delta
+    return bool(delta.content or getattr(delta, "tool_calls", None))
+
+
+async def close_stream(stream):
+    # openai/groq AsyncStream.close(), async generators aclose()
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is None:
+        return
+    try:
+        await close()
+    except Exception as e:
+        logger.debug("closing stream: %r", e)
+
+
+class Provider:
+    def __init__(self, name: str, client, model: str):
+        self.name = name
+        self.client = client
+        self.model = model
+
+        # Scoreboard
+        self.ttft = SpanHistogram()
+        self.tps: Deque[float] = deque(maxlen=WINDOW)
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.failing = 0  # errors in a row
+
+    def expected(self, tokens: int) -> Optional[float]:
+        """Seconds to stream `tokens` tokens, None without data yet"""
+        ttft = self.ttft.quantile(0.5)
+        if ttft is None or not self.tps:
+            return None
+        return ttft + tokens / (sum(self.tps) / len(self.tps))
+
+    async def first_token(self, messages, kwargs):
+        """(stream, chunks up to the first valid one), None if empty"""
+        self.requests += 1
+        start = time.perf_counter()
+        stream = None
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model, messages=messages, stream=True, **kwargs
+            )
+            buffered = []
+            async for chunk in stream:
+                buffered.append(chunk)
+                if valid(chunk):
+                    self.ttft.observe(time.perf_counter() - start)
+                    return stream, buffered
+        except asyncio.CancelledError:
+            # Lost the race: the TTFT is unknown (censored), not sampled.
+            # Short of min_samples it is ranked first and gets measured
+            self.cancelled += 1
+            if stream is not None:
+                await close_stream(stream)
+            raise
+        except BaseException:
+            if stream is not None:
+                await close_stream(stream)
+            raise
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        q = {p: self.ttft.quantile(p) for p in (0.5, 0.9)}
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "ttft_p50_ms": (q[0.5] or 0.0) * 1000,
+            "ttft_p90_ms": (q[0.9] or 0.0) * 1000,
+            "tps": sum(self.tps) / len(self.tps) if self.tps else 0.0,
+        }
+
+
+def default_providers(clients: Optional[LLMClientRegistry] = None):
+    """The providers whose API key is set, on the registry's clients"""
+    clients = clients or registry
+    providers = []
+    if os.getenv("OPENAI_API_KEY"):
+        providers.append(
+            Provider(
+                "openai/gpt-4o-mini", clients.client("openai"), "gpt-4o-mini"
+            )
+        )
+    if os.getenv("GROQ_API_KEY"):
+        groq = clients.client("groq")
+        providers.append(
+            Provider("groq/gpt-oss-20b", groq, "openai/gpt-oss-20b")
+        )
+        providers.append(
+            Provider("groq/gpt-oss-120b", groq, "openai/gpt-oss-120b")
+        )
+    return providers
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge_quantile: float = 0.9,
+        min_samples: int = 10,
+        hedge_after: float = 1.0,
+        expected_tokens: int = 60,
+        race: bool = False,
+    ):
+        if not providers:
+            raise ValueError("no LLM provider configured")
+        self.providers = providers
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.hedge_after = hedge_after  # until the primary has a p90
+        self.expected_tokens = expected_tokens
+        self.race = race
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create)
+        )
+
+        # Stats
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def ranked(self) -> List[Provider]:
+        """
+        Healthy first, then providers still short of min_samples (in the
+        given order, so each gets measured), then by expected reply time
+        """
+
+        def key(provider: Provider):
+            expected = provider.expected(self.expected_tokens)
+            known = provider.ttft.count >= self.min_samples
+            return (
+                provider.failing > 0,
+                known,
+                expected if known and expected is not None else 0.0,
+            )
+
+        return sorted(self.providers, key=key)
+
+    def hedge_delay(self, provider: Provider) -> float:
+        if provider.ttft.count < self.min_samples:
+            return self.hedge_after
+        return provider.ttft.quantile(self.hedge_quantile)
+
+    async def create(
+        self, messages, stream: bool = True, model=None, **kwargs
+    ) -> AsyncIterator:
+        """chat.completions.create, streaming only; model is ignored"""
+        if not stream:
+            raise ValueError("Orchestrator only streams")
+        return self._stream(messages, kwargs)
+
+    async def _stream(self, messages, kwargs):
+        self.requests += 1
+        ranked = self.ranked()
+        primary = ranked[0]
+        start = time.perf_counter()
+        pending: Dict[asyncio.Task, Provider] = {}
+
+        def launch(provider: Provider):
+            task = asyncio.create_task(provider.first_token(messages, kwargs))
+            pending[task] = provider
+
+        first, backups = (
+            (ranked, []) if self.race else (ranked[:1], ranked[1:])
+        )
+        for provider in first:
+            launch(provider)
+        hedge_at = self.hedge_delay(primary) if backups else None
+        winner = None
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while winner is None:
+                if not pending:
+                    if not backups:
+                        raise error or RuntimeError("no provider answered")
+                    self.failovers += 1
+                    launch(backups.pop(0))
+                    continue
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(0.0, start + hedge_at - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Primary slower than its p90: ask the next one too
+                    self.hedges += 1
+                    hedged = True
+                    hedge_at = None
+                    launch(backups.pop(0))
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        provider.errors += 1
+                        provider.failing += 1
+                        error = e
+                        logger.warning("%s failed: %r", provider.name, e)
+                        continue
+                    if result is None:
+                        continue  # ended without a token
+                    if winner is None:
+                        winner = provider, *result
+                    else:  # tied, keep one
+                        provider.cancelled += 1
+                        await close_stream(result[0])
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        provider, stream, buffered = winner
+        provider.wins += 1
+        provider.failing = 0
+        if hedged and provider is not primary:
+            self.hedge_wins += 1
+        first_at = time.perf_counter()
+        tokens = 0
+        try:
+            for chunk in buffered:
+                yield chunk
+            tokens = 1
+            async for chunk in stream:
+                tokens += valid(chunk)
+                yield chunk
+        finally:
+            await close_stream(stream)
+        elapsed = time.perf_counter() - first_at
+        if tokens > 1 and elapsed > 0:
+            provider.tps.append((tokens - 1) / elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {p.name: p.stats() for p in self.providers},
+        }
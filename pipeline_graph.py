@@ -0,0 +1,479 @@
+"""
+Async dataflow engine for the voice pipeline topology (graph.py)
+Nodes are stages served by `concurrency` worker tasks reading one bounded
+inbox, so a slow stage backpressures whatever feeds it. A handler takes
+(payload, ctx) and returns a payload, None (nothing to send), or is an
+async generator of payloads (streamed LLM text, TTS chunks).
+Each output follows the node's outgoing edges:
+  - router(payload) -> target name(s), when the node has one
+    (conditional edges, PLANNER_AGENT -> _hcut_ / _dir_ / ...)
+  - otherwise every edge whose when(payload) holds, all by default
+Nodes without a handler (and edges to them) only exist in the diagram.
+Cancellation is per scope (a session): cancel(scope, from_nodes) drops
+queued work and cancels running handlers in those nodes and everything
+downstream, then calls their on_cancel callbacks (stop TTS, flush the
+player). A node added with cancels=[...] does it when an item reaches
+it, like _hcut_ cutting ORCHESTRATOR and what follows.
+Metrics: per edge queue wait (put -> picked up) and depth, per node
+handler time, as Prometheus text (render) or dicts (stats).
+to_dot() draws the clustered Graphviz diagram from the live definition.
+"""
+
+import asyncio
+import inspect
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from turn_tracing import SpanHistogram
+
+logger = logging.getLogger("pipeline-graph")
+
+# Handler(payload, ctx) -> payload | None | awaitable | async generator
+Handler = Callable[[Any, "Context"], Any]
+
+
+class Envelope:
+    __slots__ = ("scope", "payload", "seq", "edge", "enqueued")
+
+    def __init__(self, scope, payload, seq: int, edge, enqueued: float):
+        self.scope = scope
+        self.payload = payload
+        self.seq = seq  # ordering against cancel marks
+        self.edge = edge
+        self.enqueued = enqueued
+
+
+class Context:
+    """What a handler knows about the item it processes"""
+
+    __slots__ = ("graph", "node", "scope", "edge")
+
+    def __init__(self, graph, node, scope, edge):
+        self.graph = graph
+        self.node = node
+        self.scope = scope
+        self.edge = edge  # Edge it arrived on, None if submitted
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.edge.source if self.edge is not None else None
+
+
+class Edge:
+    __slots__ = (
+        "source",
+        "target",
+        "when",
+        "feedback",
+        "attrs",
+        "wait",
+        "depth",
+    )
+
+    def __init__(
+        self, source: str, target: str, when=None, feedback=False, **attrs
+    ):
+        self.source = source
+        self.target = target
+        self.when = when
+        # Closes a cycle back to the start (next turn), cancellation
+        # does not flow through it
+        self.feedback = feedback
+        self.attrs = attrs
+        self.wait = SpanHistogram()
+        self.depth = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.source}->{self.target}"
+
+    def stats(self) -> Dict[str, Any]:
+        q = self.wait.quantiles()
+        return {
+            "sent": self.wait.count,
+            "depth": self.depth,
+            "wait_p50_ms": q.get(0.5, 0.0) * 1000,
+            "wait_p99_ms": q.get(0.99, 0.0) * 1000,
+        }
+
+
+class Node:
+    def __init__(
+        self,
+        name: str,
+        handler: Optional[Handler] = None,
+        router: Optional[Callable[[Any], Any]] = None,
+        concurrency: int = 1,
+        maxsize: int = 32,
+        cluster: Optional[str] = None,
+        cancels: Iterable[str] = (),
+        declared: bool = True,
+        **attrs,
+    ):
+        self.name = name
+        self.handler = handler
+        self.router = router
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self.cluster = cluster
+        self.cancels = list(cancels)
+        self.declared = declared  # False: only seen as an edge end
+        self.attrs = attrs
+        self.edges: List[Edge] = []
+        self.cancel_callbacks: List[Callable[[Any], None]] = []
+
+        # Runtime
+        self.inbox: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.busy: Dict[asyncio.Task, Envelope] = {}
+        self._cutting: Set[asyncio.Task] = set()
+        self.cut: Dict[Any, int] = {}  # scope -> cancel mark
+
+        # Stats
+        self.handled = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_time = SpanHistogram()
+
+    @property
+    def runnable(self) -> bool:
+        return self.handler is not None
+
+    def on_cancel(self, callback: Callable[[Any], None]):
+        """callback(scope) when this node's work for scope is cut"""
+        self.cancel_callbacks.append(callback)
+        return callback
+
+    def stats(self) -> Dict[str, Any]:
+        q = self.busy_time.quantiles()
+        return {
+            "handled": self.handled,
+            "queued": self.inbox.qsize() if self.inbox else 0,
+            "busy": len(self.busy),
+            "cancelled": self.cancelled,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "p50_ms": q.get(0.5, 0.0) * 1000,
+            "p99_ms": q.get(0.99, 0.0) * 1000,
+        }
+
+
+class PipelineGraph:
+    def __init__(self, name: str = "pipeline", **graph_attrs):
+        self.name = name
+        self.graph_attrs = graph_attrs
+        self.nodes: Dict[str, Node] = {}
+        self.edges: List[Edge] = []
+        self.clusters: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count()
+        self.running = False
+
+    # --- definition ---
+
+    def add_cluster(self, name: str, **attrs):
+        self.clusters[name] = attrs
+
+    def add_node(self, name: str, handler: Optional[Handler] = None, **opts):
+        node = self.nodes.get(name)
+        if node is not None and node.declared:
+            raise ValueError(f"node {name!r} already defined")
+        new = Node(name, handler, **opts)
+        if node is not None:
+            # Was only an edge end so far
+            new.edges = node.edges
+            new.router = new.router or node.router
+        self.nodes[name] = new
+        return new
+
+    def node(self, name: str) -> Node:
+        return self.nodes[name]
+
+    def _ensure(self, name: str) -> Node:
+        if name not in self.nodes:
+            self.nodes[name] = Node(name, declared=False)
+        return self.nodes[name]
+
+    def add_edge(
+        self, source: str, target: str, when=None, feedback=False, **attrs
+    ) -> Edge:
+        self._ensure(target)
+        edge = Edge(source, target, when, feedback, **attrs)
+        self._ensure(source).edges.append(edge)
+        self.edges.append(edge)
+        return edge
+
+    def add_conditional_edges(
+        self,
+        source: str,
+        router: Callable[[Any], Any],
+        targets: Iterable[str],
+        **attrs,
+    ):
+        """router(payload) -> one of targets, a list of them, or None"""
+        for target in targets:
+            self.add_edge(source, target, **attrs)
+        self._ensure(source).router = router
+
+    def set_handler(self, name: str, handler: Handler, **opts) -> Node:
+        """Make a node of the drawn topology executable"""
+        node = self.nodes[name]
+        node.handler = handler
+        for key, value in opts.items():
+            setattr(node, key, value)
+        return node
+
+    def downstream(self, names: Iterable[str]) -> List[Node]:
+        """Runnable nodes reachable from names (included), not via feedback"""
+        seen: Dict[str, Node] = {}
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen[name] = self.nodes[name]
+            stack.extend(
+                edge.target
+                for edge in self.nodes[name].edges
+                if not edge.feedback
+            )
+        return [node for node in seen.values() if node.runnable]
+
+    # --- runtime ---
+
+    async def start(self):
+        for node in self.nodes.values():
+            if not node.runnable:
+                continue
+            node.inbox = asyncio.Queue(node.maxsize)
+            node.workers = [
+                asyncio.create_task(
+                    self._worker(node), name=f"{node.name}-{i}"
+                )
+                for i in range(node.concurrency)
+            ]
+        self.running = True
+
+    async def stop(self):
+        self.running = False
+        for node in self.nodes.values():
+            for worker in node.workers:
+                worker.cancel()
+        for node in self.nodes.values():
+            await asyncio.gather(*node.workers, return_exceptions=True)
+            node.workers = []
+
+    async def submit(self, name: str, payload, scope=None):
+        """Feed an entry node, waits while its inbox is full"""
+        envelope = Envelope(
+            scope, payload, next(self._seq), None, time.perf_counter()
+        )
+        await self.nodes[name].inbox.put(envelope)
+
+    def cancel(self, scope, from_nodes: Optional[Iterable[str]] = None):
+        """Cut scope's queued and running work from from_nodes down"""
+        if from_nodes is None:
+            nodes = [n for n in self.nodes.values() if n.runnable]
+        else:
+            nodes = self.downstream(from_nodes)
+        mark = next(self._seq)
+        current = asyncio.current_task()
+        cancelled = 0
+        for node in nodes:
+            node.cut[scope] = mark
+            for worker, envelope in list(node.busy.items()):
+                if envelope.scope == scope and worker is not current:
+                    node._cutting.add(worker)
+                    worker.cancel()
+                    node.cancelled += 1
+                    cancelled += 1
+            for callback in node.cancel_callbacks:
+                try:
+                    callback(scope)
+                except Exception:
+                    logger.exception("%s cancel callback failed", node.name)
+        logger.debug(
+            "scope %s cut from %s: %d running handlers cancelled",
+            scope,
+            from_nodes,
+            cancelled,
+        )
+        return cancelled
+
+    def forget(self, scope):
+        """Session over: drop its cancel marks"""
+        for node in self.nodes.values():
+            node.cut.pop(scope, None)
+
+    def _targets(self, node: Node, payload) -> List[Edge]:
+        if node.router is not None:
+            chosen = node.router(payload)
+            if chosen is None:
+                return []
+            if isinstance(chosen, str):
+                chosen = (chosen,)
+            return [edge for edge in node.edges if edge.target in chosen]
+        return [
+            edge
+            for edge in node.edges
+            if edge.when is None or edge.when(payload)
+        ]
+
+    async def _emit(self, node: Node, scope, payload):
+        for edge in self._targets(node, payload):
+            target = self.nodes[edge.target]
+            if not target.runnable:
+                continue
+            envelope = Envelope(
+                scope, payload, next(self._seq), edge, time.perf_counter()
+            )
+            edge.depth += 1
+            await target.inbox.put(envelope)
+
+    async def _run(self, node: Node, envelope: Envelope):
+        ctx = Context(self, node, envelope.scope, envelope.edge)
+        result = node.handler(envelope.payload, ctx)
+        if inspect.isasyncgen(result):
+            async for output in result:
+                if output is not None:
+                    await self._emit(node, envelope.scope, output)
+            return
+        if inspect.isawaitable(result):
+            result = await result
+        if result is not None:
+            await self._emit(node, envelope.scope, result)
+
+    async def _worker(self, node: Node):
+        me = asyncio.current_task()
+        while True:
+            try:
+                envelope = await node.inbox.get()
+                if envelope.edge is not None:
+                    envelope.edge.depth -= 1
+                    envelope.edge.wait.observe(
+                        time.perf_counter() - envelope.enqueued
+                    )
+                if envelope.seq < node.cut.get(envelope.scope, -1):
+                    node.dropped += 1  # queued before a cut
+                    continue
+                if node.cancels:
+                    self.cancel(envelope.scope, node.cancels)
+                node.busy[me] = envelope
+                start = time.perf_counter()
+                try:
+                    await self._run(node, envelope)
+                    node.handled += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    node.errors += 1
+                    logger.exception("%s handler failed", node.name)
+                finally:
+                    node.busy.pop(me, None)
+                    node.busy_time.observe(time.perf_counter() - start)
+            except asyncio.CancelledError:
+                if me not in node._cutting:
+                    raise  # stop()
+                # Cut by cancel(): keep serving the other scopes
+                node._cutting.discard(me)
+                me.uncancel()
+
+    # --- metrics ---
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "nodes": {
+                name: node.stats()
+                for name, node in self.nodes.items()
+                if node.runnable
+            },
+            "edges": {
+                edge.name: edge.stats()
+                for edge in self.edges
+                if self.nodes[edge.target].runnable
+            },
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP alma_graph_edge_wait_seconds Queue wait per edge",
+            "# TYPE alma_graph_edge_wait_seconds summary",
+        ]
+        live = [e for e in self.edges if self.nodes[e.target].runnable]
+        for edge in live:
+            label = f'edge="{edge.name}"'
+            for q, value in edge.wait.quantiles().items():
+                lines.append(
+                    f"alma_graph_edge_wait_seconds{{{label},"
+                    f'quantile="{q}"}} {value}'
+                )
+            lines.append(
+                f"alma_graph_edge_wait_seconds_sum{{{label}}}"
+                f" {edge.wait.total}"
+            )
+            lines.append(
+                f"alma_graph_edge_wait_seconds_count{{{label}}}"
+                f" {edge.wait.count}"
+            )
+        lines += [
+            "# HELP alma_graph_edge_depth Items queued on an edge",
+            "# TYPE alma_graph_edge_depth gauge",
+        ]
+        for edge in live:
+            lines.append(
+                f'alma_graph_edge_depth{{edge="{edge.name}"}} {edge.depth}'
+            )
+        lines += [
+            "# HELP alma_graph_node_cancelled_total Handlers cut by cancel",
+            "# TYPE alma_graph_node_cancelled_total counter",
+        ]
+        for node in self.nodes.values():
+            if node.runnable:
+                lines.append(
+                    f'alma_graph_node_cancelled_total{{node="{node.name}"}}'
+                    f" {node.cancelled}"
+                )
+        return "\n".join(lines) + "\n"
+
+    # --- diagram ---
+
+    def to_dot(self, metrics: bool = False):
+        """
+        graphviz.Digraph of the definition; with metrics=True live edges
+        are labelled with their p50 queue wait and current depth
+        """
+        from graphviz import Digraph
+
+        dot = Digraph(comment=self.name, format="pdf")
+        for key, value in self.graph_attrs.items():
+            dot.attr(**{key: value})
+
+        declared = [n for n in self.nodes.values() if n.declared]
+        for node in declared:
+            if "rank" in node.attrs:
+                attrs = dict(node.attrs)
+                rank = attrs.pop("rank")
+                with dot.subgraph() as sub:
+                    sub.attr(rank=rank)
+                    sub.node(node.name, **attrs)
+        for cluster, attrs in self.clusters.items():
+            with dot.subgraph(name=f"cluster_{cluster}") as sub:
+                if attrs:
+                    sub.attr(**attrs)
+                for node in declared:
+                    if node.cluster == cluster:
+                        sub.node(node.name, **node.attrs)
+        for node in declared:
+            if node.cluster is None and "rank" not in node.attrs:
+                dot.node(node.name, **node.attrs)
+
+        for edge in self.edges:
+            attrs = dict(edge.attrs)
+            if metrics and edge.wait.count:
+                p50 = edge.wait.quantiles()[0.5] * 1000
+                attrs["label"] = f"{p50:.1f} ms / {edge.depth}"
+            dot.edge(edge.source, edge.target, **attrs)
+        return dot
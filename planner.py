@@ -0,0 +1,450 @@
+"""
+PLANNER_AGENT: turn-taking decisions for each transcript (graph.py)
+  _ncompl_  sentence not finished yet            -> accumulate, wait
+  _int_p_   user talks over the reply, unfinished -> accumulate, wait
+  _hcut_    "stop", "attends"... over the reply   -> cut everything
+  _scut_    complete new request over the reply  -> cut short, answer
+  _nint_p   backchannel ("oui", "mmh") over it    -> keep talking
+  _dir_     complete request                      -> answer (lphrase)
+  _ultdir_  complete UI command ("ferme ...")     -> AMNGR, no reply
+Two tiers. The first one is local and takes milliseconds: lexicon rules,
+then an end-of-sentence probability from the SmolLM EOS model of
+sentence_complete.py, batched across sessions (EOSBatcher). Only final
+texts whose probability falls in the ambiguous band go to the LLM
+planner, which falls back to the local guess when it is late; an
+ambiguous partial just keeps accumulating until the next one.
+Install (model): pip install transformers torch lightning peft torchmetrics
+Without torch, PunctuationEOS (punctuation and trailing-word rules)
+stands in for the model. The servers load the model in the background
+(BackgroundEOS) and use PunctuationEOS until it is ready, so importing
+them never waits on the hub download or torch.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from turn_tracing import SpanHistogram
+
+logger = logging.getLogger("planner")
+
+NCOMPL, HCUT, SCUT, INT_P = "_ncompl_", "_hcut_", "_scut_", "_int_p_"
+DIR, ULTDIR, NINT_P = "_dir_", "_ultdir_", "_nint_p"
+DECISIONS = (NCOMPL, HCUT, SCUT, INT_P, DIR, ULTDIR, NINT_P)
+# End-of-sentence probability bands, in between goes to the LLM
+COMPLETE_ABOVE = 0.75
+INCOMPLETE_BELOW = 0.25
+
+# Matched against the lowercased text, without trailing punctuation
+HARD_CUT = re.compile(
+    r"^(stop|arr[eê]te|attends|tais[- ]toi|chut|non non|pause"
+    r"|wait|hold on|shut up|be quiet)\b"
+)
+BACKCHANNEL = re.compile(
+    r"^(oui|ouais|d'accord|ok|okay|mmh+|hm+|ah|ah bon|je vois|super"
+    r"|yes|yeah|right|uh-huh|i see|cool)$"
+)
+UI_COMMAND = re.compile(
+    r"^(ferme|ouvre|affiche|active|d[ée]sactive|va (sur|à|a)|retour"
+    r"|utilise|choisis|passe (sur|à)|r[ée]g[ée]n[èe]re|relance|cr[ée]e"
+    r"|close|open|show|toggle|enable|disable|go (to|back)|use|switch to"
+    r"|regenerate)\b"
+)
+# A sentence does not end on these
+TRAILING_INCOMPLETE = re.compile(
+    r"\b(et|ou|mais|donc|car|que|qui|de|du|des|le|la|les|un|une|pour"
+    r"|avec|sur|dans|à|a|en|mon|ma|mes|ton|ta|est-ce|and|or|but|so"
+    r"|the|a|an|to|of|for|with|in|on|my|your|that|is)$"
+)
+
+
+class PunctuationEOS:
+    """Model-free end-of-sentence probability, the fallback scorer"""
+
+    runs_inline = True  # microseconds, no thread hop needed
+
+    def predict(self, texts: Sequence[str]) -> List[float]:
+        scores = []
+        for text in texts:
+            stripped = text.strip().lower()
+            if not stripped:
+                scores.append(0.0)
+            elif stripped.endswith((",", "...", "…", "-")):
+                scores.append(0.1)  # before ".": "je voudrais savoir..."
+            elif stripped.endswith(("?", "!", ".")):
+                scores.append(0.9)
+            elif TRAILING_INCOMPLETE.search(stripped):
+                scores.append(0.05)
+            elif len(stripped.split()) < 3:
+                scores.append(0.4)
+            else:
+                scores.append(0.6)
+        return scores
+
+
+class SmolLMEOS:
+    """ZivK/smollm2-end-of-sentence, as loaded by sentence_complete.py"""
+
+    def __init__(self, device: str = "cpu"):
+        import importlib.util
+        import sys
+
+        from huggingface_hub import hf_hub_download
+
+        repo_id = "ZivK/smollm2-end-of-sentence"
+        checkpoint_path = hf_hub_download(repo_id, "token_model.ckpt")
+        model_src_path = hf_hub_download(repo_id, "model.py")
+        spec = importlib.util.spec_from_file_location("SmolLM", model_src_path)
+        smollm_model = importlib.util.module_from_spec(spec)
+        sys.modules["smollm_model"] = smollm_model
+        spec.loader.exec_module(smollm_model)
+        self.device = device
+        self.model = smollm_model.SmolLM.load_from_checkpoint(
+            checkpoint_path
+        ).to(device)
+        self.model.eval()
+
+    def predict(self, texts: Sequence[str]) -> List[float]:
+        """
+        Texts are batched by token count, never padded: the model scores
+        the last position, which would be a pad token in a padded row,
+        and the tokenizer need not define one. Each score is then the
+        one sentence_complete.py gets for the text alone.
+        """
+        from torch import no_grad, sigmoid
+
+        tokenizer = self.model.tokenizer
+        by_length: Dict[int, List[int]] = {}
+        for i, text in enumerate(texts):
+            length = len(tokenizer(text)["input_ids"])
+            by_length.setdefault(length, []).append(i)
+
+        scores = [0.0] * len(texts)
+        with no_grad():
+            for indices in by_length.values():
+                inputs = tokenizer(
+                    [texts[i] for i in indices], return_tensors="pt"
+                ).to(self.device)
+                probs = sigmoid(self.model(inputs)).reshape(-1)
+                for i, p in zip(indices, probs):
+                    scores[i] = float(p)
+        return scores
+
+
+class BackgroundEOS:
+    """
+    PunctuationEOS until SmolLMEOS has loaded on a background thread,
+    started by start() (lifespan) or else by the first predict()
+    """
+
+    def __init__(self, loader: Callable[[], Any] = SmolLMEOS):
+        self.loader = loader
+        self.fallback = PunctuationEOS()
+        self.model = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def runs_inline(self) -> bool:
+        return self.model is None
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        threading.Thread(
+            target=self._load, name="eos-load", daemon=True
+        ).start()
+        return self
+
+    def _load(self):
+        try:
+            model = self.loader()
+        except Exception as e:
+            logger.warning("SmolLM EOS unavailable (%s), using punctuation", e)
+            return
+        self.model = model
+        logger.info("SmolLM EOS ready")
+
+    def predict(self, texts: Sequence[str]) -> List[float]:
+        self.start()
+        return (self.model or self.fallback).predict(texts)
+
+
+def load_eos_model(background: bool = False):
+    """
+    SmolLM when torch and the checkpoint are available. background=True
+    returns a BackgroundEOS at once, call its start() to begin loading
+    """
+    if background:
+        return BackgroundEOS()
+    try:
+        return SmolLMEOS()
+    except Exception as e:
+        logger.warning("SmolLM EOS unavailable (%s), using punctuation", e)
+        return PunctuationEOS()
+
+
+class EOSBatcher:
+    """
+    Groups concurrent sessions' texts into one model call: the first
+    request waits up to max_wait for others, the batch runs in a thread
+    """
+
+    def __init__(self, model, max_batch: int = 32, max_wait: float = 0.005):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def score(self, text: str) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._run(self._take())
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        return batch
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_wait)
+        self._flush_task = None
+        self._run(self._take())
+
+    def _run(self, batch):
+        if not batch:
+            return
+        self.batches += 1
+        self.texts += len(batch)
+        texts = [text for text, _ in batch]
+        if getattr(self.model, "runs_inline", False):
+            try:
+                self._resolve(batch, self.model.predict(texts))
+            except Exception as e:
+                self._fail(batch, e)
+            return
+        task = asyncio.create_task(self._predict_in_thread(batch, texts))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _predict_in_thread(self, batch, texts):
+        try:
+            scores = await asyncio.to_thread(self.model.predict, texts)
+        except Exception as e:
+            self._fail(batch, e)
+        else:
+            self._resolve(batch, scores)
+
+    def _resolve(self, batch, scores):
+        for (_, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
+
+    def _fail(self, batch, error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+LLM_PROMPT = (
+    "You decide turn-taking for a French voice assistant. Given what the "
+    "user said so far and whether the assistant is currently speaking, "
+    "answer with exactly one label:\n"
+    "_ncompl_ the user has not finished their sentence\n"
+    "_int_p_ the user talks over the assistant, not finished yet\n"
+    "_hcut_ the user wants the assistant to stop talking\n"
+    "_scut_ the user talks over the assistant with a complete new request\n"
+    "_nint_p a backchannel that does not need an answer\n"
+    "_dir_ a complete request that needs a spoken answer\n"
+    "_ultdir_ a complete UI command (open, close, toggle, navigate)"
+)
+
+
+class LLMPlanner:
+    """Second tier: one short chat completion per ambiguous text"""
+
+    def __init__(
+        self,
+        client,
+        model: str = "openai/gpt-oss-20b",
+        timeout: float = 0.6,
+    ):
+        self.client = client
+        self.model = model
+        self.timeout = timeout
+
+    async def decide(self, text: str, playing: bool) -> Optional[str]:
+        messages = [
+            {"role": "system", "content": LLM_PROMPT},
+            {
+                "role": "user",
+                "content": json.dumps(
+                    {"transcript": text, "assistant_speaking": playing},
+                    ensure_ascii=False,
+                ),
+            },
+        ]
+        try:
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=8,
+                    temperature=0,
+                ),
+                self.timeout,
+            )
+        except Exception as e:
+            logger.warning("LLM planner failed: %r", e)
+            return None
+        content = response.choices[0].message.content or ""
+        for decision in DECISIONS:
+            if decision in content or decision.strip("_") in content:
+                return decision
+        return None
+
+
+class Planner:
+    def __init__(
+        self,
+        eos_model=None,
+        llm: Optional[LLMPlanner] = None,
+        complete_above: float = COMPLETE_ABOVE,
+        incomplete_below: float = INCOMPLETE_BELOW,
+        max_batch: int = 32,
+        max_wait: float = 0.005,
+    ):
+        self.batcher = EOSBatcher(
+            eos_model or load_eos_model(background=True), max_batch, max_wait
+        )
+        self.llm = llm
+        self.complete_above = complete_above
+        self.incomplete_below = incomplete_below
+        self.decision_callbacks: List[Callable[[str, str], None]] = []
+
+        # Stats
+        self.latency: Dict[str, SpanHistogram] = {
+            d: SpanHistogram() for d in DECISIONS
+        }
+        self.by_tier: Counter = Counter()
+        self.escalated = 0
+        self.llm_fallbacks = 0
+
+    def start(self):
+        """Begin loading a background EOS model (server lifespan)"""
+        start = getattr(self.batcher.model, "start", None)
+        if start is not None:
+            start()
+
+    def on_decision(self, callback: Callable[[str, str], None]):
+        """callback(decision, tier)"""
+        self.decision_callbacks.append(callback)
+        return callback
+
+    def rules(self, text: str, playing: bool) -> Optional[str]:
+        words = text.strip().lower().rstrip(".!?,; ")
+        if not words:
+            return None
+        if playing and HARD_CUT.match(words):
+            return HCUT
+        if playing and BACKCHANNEL.match(words):
+            return NINT_P
+        return None
+
+    def from_score(self, text: str, playing: bool, p: float) -> Optional[str]:
+        if p >= self.complete_above:
+            return self._complete(text, playing)
+        if p <= self.incomplete_below:
+            return INT_P if playing else NCOMPL
+        return None
+
+    def _complete(self, text: str, playing: bool) -> str:
+        if UI_COMMAND.match(text.strip().lower()):
+            return ULTDIR
+        return SCUT if playing else DIR
+
+    async def decide(
+        self, text: str, playing: bool = False, final: bool = True
+    ) -> str:
+        start = time.perf_counter()
+        tier = "rules"
+        decision = self.rules(text, playing)
+        if decision is None:
+            tier = "eos"
+            p = await self.batcher.score(text)
+            decision = self.from_score(text, playing, p)
+            if decision is None and not final:
+                decision = INT_P if playing else NCOMPL
+            if decision is None:
+                tier = "llm"
+                self.escalated += 1
+                if self.llm is not None:
+                    decision = await self.llm.decide(text, playing)
+                if decision is None:
+                    self.llm_fallbacks += 1
+                    decision = (
+                        self._complete(text, playing)
+                        if p >= 0.5
+                        else (INT_P if playing else NCOMPL)
+                    )
+        self.latency[decision].observe(time.perf_counter() - start)
+        self.by_tier[tier] += 1
+        for callback in self.decision_callbacks:
+            callback(decision, tier)
+        return decision
+
+    async def handle(self, turn: Dict[str, Any], ctx=None) -> Dict[str, Any]:
+        """
+        pipeline_graph handler for PLANNER_AGENT: turn carries "text",
+        "playing" and "final", route on the returned "decision"
+        """
+        decision = await self.decide(
+            turn["text"], turn.get("playing", False), turn.get("final", True)
+        )
+        return dict(turn, decision=decision)
+
+    def attach(self, graph, concurrency: int = 64):
+        return graph.set_handler(
+            "PLANNER_AGENT",
+            self.handle,
+            router=lambda turn: turn["decision"],
+            concurrency=concurrency,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.by_tier.values())
+        return {
+            "decisions": total,
+            "by_tier": dict(self.by_tier),
+            "escalated": self.escalated,
+            "escalation_rate": self.escalated / total if total else 0.0,
+            "llm_fallbacks": self.llm_fallbacks,
+            "eos_batches": self.batcher.batches,
+            "eos_batch_mean": (
+                self.batcher.texts / self.batcher.batches
+                if self.batcher.batches
+                else 0.0
+            ),
+            "latency_ms": {
+                d: {q: v * 1000 for q, v in h.quantiles().items()}
+                for d, h in self.latency.items()
+                if h.count
+            },
+        }
@@ -1,10 +1,80 @@
 // processor.js
+// Default: posts each float32 render quantum as-is (legacy pages).
+// With processorOptions { format: "pcm16" }: downsamples to targetRate,
+// converts to int16 and posts frameMs frames with a 12-byte header
+// (little-endian, parsed by audio_ingest.parse_frame_header):
+//   uint32 seq | uint32 capture time ms | uint16 sample rate | uint16 samples
+// The page can switch the rate to the one the server negotiated for its
+// recognizer with port.postMessage({ targetRate }).
+const HEADER_BYTES = 12;
+
 class AudioProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const opts = (options && options.processorOptions) || {};
+    this.pcm16 = opts.format === "pcm16";
+    if (!this.pcm16) return;
+
+    this.frameMs = opts.frameMs || 20;
+    this.seq = 0;
+    this.configure(opts.targetRate || 16000);
+    this.port.onmessage = (event) => {
+      if (event.data && event.data.targetRate) {
+        this.configure(event.data.targetRate);
+      }
+    };
+  }
+
+  configure(targetRate) {
+    this.targetRate = Math.min(targetRate, sampleRate);
+    this.frameSamples = Math.round((this.targetRate * this.frameMs) / 1000);
+    // Input samples per output sample; averaging over each step is the
+    // anti-alias filter (a boxcar), enough for speech recognition
+    this.step = sampleRate / this.targetRate;
+    this.acc = 0;
+    this.accCount = 0;
+    this.phase = 0;
+    this.newFrame();
+  }
+
+  newFrame() {
+    this.buffer = new ArrayBuffer(HEADER_BYTES + 2 * this.frameSamples);
+    this.samples = new Int16Array(this.buffer, HEADER_BYTES);
+    this.filled = 0;
+  }
+
+  pushSample(value) {
+    const clipped = Math.max(-1, Math.min(1, value || 0)); // NaN -> 0
+    this.samples[this.filled++] = clipped * 32767;
+    if (this.filled < this.frameSamples) return;
+
+    const header = new DataView(this.buffer, 0, HEADER_BYTES);
+    header.setUint32(0, this.seq++ >>> 0, true);
+    header.setUint32(4, Math.round(currentTime * 1000) >>> 0, true);
+    header.setUint16(8, this.targetRate, true);
+    header.setUint16(10, this.frameSamples, true);
+    this.port.postMessage(this.buffer, [this.buffer]);
+    this.newFrame();
+  }
+
   process(inputs) {
     const input = inputs[0][0]; // first channel
-    if (input) {
+    if (!input) return true;
+    if (!this.pcm16) {
       // Send the float32 buffer to main thread
       this.port.postMessage(input.buffer, [input.buffer]);
+      return true;
+    }
+    for (let i = 0; i < input.length; i++) {
+      this.acc += input[i];
+      this.accCount++;
+      this.phase += 1;
+      if (this.phase >= this.step) {
+        this.phase -= this.step;
+        this.pushSample(this.acc / this.accCount);
+        this.acc = 0;
+        this.accCount = 0;
+      }
     }
     return true; // keep alive
   }
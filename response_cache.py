@@ -0,0 +1,441 @@
+"""
+Response cache for repeated voice queries
+Users say the same things again ("qu'est-ce que tu peux faire ici ?",
+"retour à l'accueil"), and every repeat paid the LLM turn and the TTS.
+Replies are cached per (normalized transcript, page, tool catalogue
+version), so a new page or a changed MCP tool list never gets an old
+answer, with two tiers:
+  exact     same normalized transcript
+  semantic  cosine similarity of CPU sentence embeddings over a NumPy
+            matrix of every cached query, within the same page/catalogue
+A semantic match must also name the same pages, models, numbers,
+negations and capitalized names (guard_terms): "va sur trad" is close to
+"va sur scribe", "la météo à Tokyo" to "la météo à Kyoto". Only replies
+whose tool calls take no arguments are in the semantic tier: "envoie un
+message à Marc" never gets Paul's sendMessage replayed. Without
+sentence-transformers there is no semantic tier, hashed n-grams are
+too coarse for it (HashingEmbedder is kept for the bench).
+A turn that depends on the conversation ("oui", "et demain ?", an answer
+to the assistant's question) is neither looked up nor cached, see
+depends_on_history().
+Entries expire after ttl and the least recently used go first. A hit
+gives back the reply text, its actions (tool calls) and the TTS audio
+once attach_audio() has stored it.
+The servers load MiniLM in the background (load_embedder(background=
+True), started from lifespan): until it is ready, or known missing, the
+cache is skipped, lookup() answers "loading" and put() stores nothing.
+Install (embeddings): pip install sentence-transformers
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from direct_actions import MEMORY_CATEGORIES, MODELS, PAGES
+from stream_accumulator import ToolCall
+from turn_tracing import SpanHistogram
+
+logger = logging.getLogger("response-cache")
+
+NEGATIONS = {"ne", "n'", "pas", "plus", "jamais", "non", "not", "no", "don't"}
+PROTECTED = set(PAGES) | set(MEMORY_CATEGORIES) | set(MODELS) | NEGATIONS
+# Turns that only make sense after the previous reply
+FOLLOW_UPS = {
+    "et", "oui", "non", "ok", "okay", "d'accord", "pourquoi", "mais",
+    "puis", "ensuite", "aussi", "encore", "pareil", "and", "yes", "why",
+    "also", "again",
+}  # fmt: skip
+ANAPHORS = {
+    "ça", "cela", "celui", "celle", "ceux", "celles", "them", "those",
+    "same",
+}  # fmt: skip
+# "refais-le", "envoie-lui"
+PRONOUN_SUFFIX = re.compile(r"\w-(?:le|la|les|lui|leur)\b", re.IGNORECASE)
+
+Key = Tuple[str, str, str]  # normalized text, page, catalogue version
+
+
+def normalize(text: str) -> str:
+    """Exact-tier key: case and punctuation do not matter, numbers do"""
+    text = re.sub(r"([a-z])'", r"\1' ", text.lower())
+    return " ".join(re.sub(r"[^\w' ]+", " ", text).split())
+
+
+def guard_terms(text: str) -> frozenset:
+    """Words a semantic match may not change, text as heard"""
+    # Capitalized past the first word: a name, a city, a product
+    names = {
+        word.lower()
+        for word in re.findall(r"\w+", text)[1:]
+        if word[0].isupper()
+    }
+    words = {
+        word
+        for word in normalize(text).split()
+        if word in PROTECTED or any(c.isdigit() for c in word)
+    }
+    return frozenset(words | names)
+
+
+def depends_on_history(text: str, last_reply: str = "") -> bool:
+    """
+    The turn needs the conversation: an answer to the assistant's
+    question, a follow-up ("et demain ?") or a pronoun ("refais-le")
+    """
+    words = normalize(text).split()
+    if not words or last_reply.rstrip().endswith("?"):
+        return True
+    return (
+        len(words) < 2
+        or words[0] in FOLLOW_UPS
+        or any(word in ANAPHORS for word in words)
+        or PRONOUN_SUFFIX.search(text) is not None
+    )
+
+
+def takes_arguments(action: Dict[str, Any]) -> bool:
+    arguments = action.get("arguments")
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments or "{}")
+        except ValueError:
+            return True
+    return bool(arguments)
+
+
+def catalogue_version(tools: Sequence[Dict[str, Any]]) -> str:
+    """Short hash of the tool names and schemas offered to the LLM"""
+    blob = json.dumps(
+        sorted(tools, key=lambda tool: str(tool.get("name"))),
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(blob.encode()).hexdigest()[:12]
+
+
+class HashingEmbedder:
+    """Character n-gram + word features hashed into a fixed vector"""
+
+    threshold = 0.8
+
+    def __init__(self, dim: int = 1024, ngrams: Sequence[int] = (3, 4)):
+        self.dim = dim
+        self.ngrams = ngrams
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f" {text} "
+            features = [
+                padded[i : i + n]
+                for n in self.ngrams
+                for i in range(len(padded) - n + 1)
+            ] + text.split()
+            index = [zlib.crc32(f.encode()) % self.dim for f in features]
+            np.add.at(vectors[row], index, 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class SentenceEmbedder:
+    """Multilingual MiniLM (French and English) on CPU"""
+
+    threshold = 0.9
+
+    def __init__(
+        self,
+        model: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        device: str = "cpu",
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model, device=device)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(
+            list(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+class BackgroundEmbedder:
+    """
+    SentenceEmbedder loaded on a daemon thread by start(). ready once it
+    is loaded or failed to load; failed means exact tier only
+    """
+
+    threshold = SentenceEmbedder.threshold
+
+    def __init__(self, loader: Callable[[], Any] = SentenceEmbedder):
+        self.loader = loader
+        self.model = None
+        self.failed = False
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None or self.failed
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        threading.Thread(
+            target=self._load, name="embedder-load", daemon=True
+        ).start()
+        return self
+
+    def _load(self):
+        try:
+            self.model = self.loader()
+        except Exception as e:
+            logger.warning("MiniLM unavailable (%s), exact tier only", e)
+            self.failed = True
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.embed(texts)
+
+
+def load_embedder(background: bool = False):
+    """
+    MiniLM when sentence-transformers is installed, else None.
+    background=True returns a BackgroundEmbedder, start() it
+    """
+    if background:
+        return BackgroundEmbedder()
+    try:
+        return SentenceEmbedder()
+    except Exception as e:
+        logger.warning("MiniLM unavailable (%s), exact tier only", e)
+        return None
+
+
+class CachedResponse:
+    __slots__ = (
+        "key",
+        "text",
+        "reply",
+        "actions",
+        "audio",
+        "sample_rate",
+        "created",
+        "ttl",
+        "hits",
+        "slot",
+        "semantic",
+    )
+
+    def __init__(
+        self,
+        key: Key,
+        text: str,
+        reply: str,
+        actions: List[Dict[str, Any]],
+        ttl: float,
+    ):
+        self.key = key
+        self.text = text  # as first heard
+        self.reply = reply
+        self.actions = actions
+        self.audio: Optional[bytes] = None  # PCM16 mono
+        self.sample_rate = 0
+        self.created = time.monotonic()
+        self.ttl = ttl
+        self.hits = 0
+        self.slot = -1  # row in the embedding matrix
+        # Tool calls without arguments: safe to give to a paraphrase
+        self.semantic = not any(takes_arguments(a) for a in actions)
+
+    def expired(self, now: float) -> bool:
+        return now - self.created > self.ttl
+
+    def tool_calls(self) -> List[ToolCall]:
+        """Cached {"name", "arguments"} actions, to run again"""
+        calls = []
+        for index, action in enumerate(self.actions):
+            call = ToolCall(index)
+            call.id = f"cached_{index}"
+            call.function.name = action["name"]
+            call.function.arguments = action["arguments"]
+            calls.append(call)
+        return calls
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        embedder=None,
+        size: int = 1024,
+        ttl: float = 600.0,
+        threshold: Optional[float] = None,
+    ):
+        self.embedder = embedder  # None: exact tier only
+        self.size = size
+        self.ttl = ttl
+        self.threshold = threshold or getattr(embedder, "threshold", 0.9)
+        self.entries: "OrderedDict[Key, CachedResponse]" = OrderedDict()
+        # Semantic tier: one row per entry, rows of other contexts masked
+        self.matrix: Optional[np.ndarray] = None
+        self.contexts = np.full(size, -1, dtype=np.int32)
+        self.slot_keys: List[Optional[Key]] = [None] * size
+        self.free = list(range(size - 1, -1, -1))
+        self.context_ids: Dict[Tuple[str, str], int] = {}
+        self._last: Optional[Tuple[str, np.ndarray]] = None
+        # Azure SDK callbacks and the event loop both use it
+        self._lock = threading.RLock()
+
+        # Stats
+        self.lookups: Counter = Counter()  # exact / semantic / miss
+        self.rejected = 0  # similar enough, but guard terms differ
+        self.expired = 0
+        self.evicted = 0
+        self.latency = SpanHistogram()
+
+    @property
+    def ready(self) -> bool:
+        """False while a background embedder is still loading"""
+        return getattr(self.embedder, "ready", True)
+
+    @property
+    def _semantic(self) -> bool:
+        return self.embedder is not None and not getattr(
+            self.embedder, "failed", False
+        )
+
+    def _vector(self, normalized: str) -> np.ndarray:
+        # put() after a missed lookup() embeds the same text
+        if self._last is not None and self._last[0] == normalized:
+            return self._last[1]
+        vector = self.embedder.embed([normalized])[0]
+        self._last = (normalized, vector)
+        return vector
+
+    def _context(self, page: str, catalogue: str) -> int:
+        return self.context_ids.setdefault(
+            (page, catalogue), len(self.context_ids)
+        )
+
+    def _remove(self, key: Key):
+        entry = self.entries.pop(key)
+        if entry.slot >= 0:
+            self.contexts[entry.slot] = -1
+            self.slot_keys[entry.slot] = None
+            self.free.append(entry.slot)
+
+    def lookup(
+        self, text: str, page: str = "", catalogue: str = ""
+    ) -> Tuple[Optional[CachedResponse], str]:
+        """(entry, "exact" | "semantic"), (None, "miss" | "loading")"""
+        if not self.ready:
+            self.lookups["loading"] += 1
+            return None, "loading"
+        start = time.perf_counter()
+        normalized = normalize(text)
+        key = (normalized, page, catalogue)
+        now = time.monotonic()
+        with self._lock:
+            entry, how = self.entries.get(key), "exact"
+            if entry is not None and entry.expired(now):
+                self._remove(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                entry, how = self._similar(text, key, now), "semantic"
+            if entry is None:
+                how = "miss"
+            else:
+                self.entries.move_to_end(entry.key)
+                entry.hits += 1
+            self.lookups[how] += 1
+        self.latency.observe(time.perf_counter() - start)
+        return entry, how
+
+    def _similar(self, text: str, key: Key, now: float):
+        context = self.context_ids.get(key[1:])
+        if not self._semantic or self.matrix is None or context is None:
+            return None
+        scores = self.matrix @ self._vector(key[0])
+        scores[self.contexts != context] = -1.0
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.threshold:
+            return None
+        entry = self.entries[self.slot_keys[slot]]
+        if entry.expired(now):
+            self._remove(entry.key)
+            self.expired += 1
+            return None
+        if guard_terms(entry.text) != guard_terms(text):
+            self.rejected += 1
+            return None
+        return entry
+
+    def put(
+        self,
+        text: str,
+        reply: str,
+        actions: Optional[List[Dict[str, Any]]] = None,
+        page: str = "",
+        catalogue: str = "",
+        ttl: Optional[float] = None,
+    ) -> Optional[CachedResponse]:
+        """The new entry, None while the embedder is loading"""
+        if not self.ready:
+            return None
+        normalized = normalize(text)
+        key = (normalized, page, catalogue)
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            while len(self.entries) >= self.size:
+                self._remove(next(iter(self.entries)))
+                self.evicted += 1
+            entry = CachedResponse(
+                key, text, reply, actions or [], ttl or self.ttl
+            )
+            if self._semantic and entry.semantic:
+                vector = self._vector(normalized)
+                if self.matrix is None:
+                    self.matrix = np.zeros(
+                        (self.size, len(vector)), dtype=np.float32
+                    )
+                entry.slot = self.free.pop()
+                self.matrix[entry.slot] = vector
+                self.contexts[entry.slot] = self._context(page, catalogue)
+                self.slot_keys[entry.slot] = key
+            self.entries[key] = entry
+        return entry
+
+    def attach_audio(
+        self, entry: CachedResponse, audio: bytes, sample_rate: int
+    ):
+        """The reply's TTS, once it was synthesized in full"""
+        entry.audio = audio
+        entry.sample_rate = sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self.lookups.values())
+        hits = self.lookups["exact"] + self.lookups["semantic"]
+        return {
+            "entries": len(self.entries),
+            "semantic_entries": int((self.contexts >= 0).sum()),
+            "lookups": dict(self.lookups),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "with_audio": sum(
+                e.audio is not None for e in self.entries.values()
+            ),
+            "lookup_ms": {
+                q: v * 1000 for q, v in self.latency.quantiles().items()
+            },
+        }
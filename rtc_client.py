@@ -57,14 +57,19 @@ async def rtc_client(
         and sends them into read_stream_writer.
         """
         async with read_stream_writer:
-            try:
+            while True:
                 raw_text = await queue_in.get()
-                message = types.JSONRPCMessage.model_validate_json(raw_text)
-                session_message = SessionMessage(message)
-                await read_stream_writer.send(session_message)
-            except ValidationError as exc:
-                # If JSON parse or model validation fails, send the exception
-                await read_stream_writer.send(exc)
+                if raw_text is None:  # end signal, peer went away
+                    break
+                try:
+                    message = types.JSONRPCMessage.model_validate_json(
+                        raw_text
+                    )
+                    session_message = SessionMessage(message)
+                    await read_stream_writer.send(session_message)
+                except ValidationError as exc:
+                    # If JSON parse or model validation fails, send the exception
+                    await read_stream_writer.send(exc)
 
     async def ws_writer():
         """
@@ -87,5 +92,5 @@ async def rtc_client(
         # Yield the receive/send streams
         yield (read_stream, write_stream)
 
-        # # Once the caller's 'async with' block exits, we shut down
-        # tg.cancel_scope.cancel()
+        # Once the caller's 'async with' block exits, we shut down
+        tg.cancel_scope.cancel()
@@ -0,0 +1,180 @@
+"""
+Production launcher for the FastAPI voice servers
+  - uvloop event loop when installed (pip install uvloop), asyncio if not
+  - no reload, so no file watcher and no second process
+  - startup breakdown: interpreter, imports per top-level package, app
+    module body, lifespan startup, until the socket listens
+Heavy optional imports (sounddevice, scipy.signal) are deferred by the
+modules themselves to when they are needed, this shows what is left.
+Run: python serve.py stream_voice_clean:app --port 8080
+     python serve.py voice:app --profile   # print the breakdown, exit
+"""
+
+import argparse
+import asyncio
+import builtins
+import importlib
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+T0 = time.perf_counter()
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux), None elsewhere"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after "(comm)", starttime is field 22
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class ImportProfile:
+    """
+    Self time of first imports per top-level package, through
+    builtins.__import__ (what `import x` statements call)
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self._children: List[float] = []
+        self._import = builtins.__import__
+
+    def _timed_import(
+        self, name, globals=None, locals=None, fromlist=(), level=0
+    ):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._children.append(0.0)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            self.seconds[name.partition(".")[0]] += elapsed - children
+            if self._children:
+                self._children[-1] += elapsed
+
+    def load(self, module_name: str) -> Tuple[object, float]:
+        """Import module_name, returns it and its own body time"""
+        builtins.__import__ = self._timed_import
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        finally:
+            builtins.__import__ = self._import
+        elapsed = time.perf_counter() - start
+        return module, elapsed - self._children.pop()
+
+
+def loop_factory():
+    try:
+        import uvloop
+    except ImportError:
+        return None, "asyncio"
+    return uvloop.new_event_loop, "uvloop"
+
+
+def load_app(app_path: str, profile: ImportProfile):
+    module_name, _, attr = app_path.partition(":")
+    # Same lookup as uvicorn: modules next to this file
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    module, body = profile.load(module_name)
+    return getattr(module, attr or "app"), body
+
+
+def report(phases, imports: Dict[str, float], loop_name: str, top: int = 8):
+    total = sum(seconds for _, seconds in phases)
+    print(f"[startup] {total:.3f} s to listening ({loop_name} loop)")
+    for label, seconds in phases:
+        print(f"[startup]   {label:<20} {seconds:6.3f} s")
+        if label == "imports":
+            ranked = sorted(imports.items(), key=lambda kv: -kv[1])
+            for package, package_seconds in ranked[:top]:
+                print(f"[startup]     {package:<18} {package_seconds:6.3f} s")
+            rest = sum(s for _, s in ranked[top:])
+            if rest:
+                print(
+                    f"[startup]     {f'{len(ranked) - top} others':<18}"
+                    f" {rest:6.3f} s"
+                )
+
+
+def serve(
+    app_path: str,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    log_level: str = "info",
+    profile_only: bool = False,
+):
+    profile = ImportProfile()
+    t_import = time.perf_counter()
+    import uvicorn
+
+    factory, loop_name = loop_factory()
+    uvicorn_seconds = time.perf_counter() - t_import
+    app, body = load_app(app_path, profile)
+    imports = dict(profile.seconds)
+    imports["uvicorn"] = imports.get("uvicorn", 0.0) + uvicorn_seconds
+    t_loaded = time.perf_counter()
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        reload=False,
+        log_level=log_level,
+        lifespan="on",
+    )
+    server = uvicorn.Server(config)
+
+    async def main():
+        task = asyncio.create_task(server.serve())
+        t_serve = time.perf_counter()
+        while not server.started and not task.done():
+            await asyncio.sleep(0.001)
+        if server.started:
+            interpreter = process_age()
+            phases = [
+                (
+                    "interpreter",
+                    (interpreter or 0.0) - (time.perf_counter() - T0),
+                ),
+                ("imports", sum(imports.values())),
+                ("app module body", body),
+                ("config", t_serve - t_loaded),
+                ("lifespan + bind", time.perf_counter() - t_serve),
+            ]
+            if interpreter is None:
+                phases.pop(0)
+            report(phases, imports, loop_name)
+            if profile_only:
+                server.should_exit = True
+        await task
+
+    with asyncio.Runner(loop_factory=factory) as runner:
+        runner.run(main())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("app", help="module:attribute, e.g. voice:app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="exit once listening, after printing the startup breakdown",
+    )
+    args = parser.parse_args()
+    serve(args.app, args.host, args.port, args.log_level, args.profile)
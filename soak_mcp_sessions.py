@@ -0,0 +1,266 @@
+"""
+Soak test for per-peer MCP sessions (mcp_peer_sessions.py)
+Simulates many browser peers, each running its own MCP server behind a
+fake data channel, and checks turn isolation and memory stability:
+the heap and RSS must not keep growing from one cycle to the next, and
+no task may outlive close_all, including sessions closed before their
+peer opened a channel.
+Install: pip install mcp anyio
+Run: python soak_mcp_sessions.py --peers 200 --rounds 5 --cycles 3
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+import anyio
+import mcp.types as types
+from mcp.server import Server
+from mcp.shared.message import SessionMessage
+from mcp.types import TextContent, Tool
+
+from mcp_peer_sessions import MCPConnectionManager
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("soak-mcp-sessions")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), 0 where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def build_peer_server(peer_id: str) -> Server:
+    """MCP server standing in for one browser tab (mcp_instance.ts)"""
+    server = Server(f"browser-{peer_id}")
+
+    @server.list_tools()
+    async def list_tools() -> list[Tool]:
+        return [
+            Tool(
+                name="whoami",
+                description="Return the peer id and echo the text",
+                inputSchema={
+                    "type": "object",
+                    "properties": {"text": {"type": "string"}},
+                },
+            )
+        ]
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+        await asyncio.sleep(0.001)
+        return [
+            TextContent(
+                type="text", text=f"{peer_id}|{arguments.get('text', '')}"
+            )
+        ]
+
+    return server
+
+
+class FakeChannel:
+    """Minimal RTCDataChannel: send() goes to the browser-side server"""
+
+    def __init__(self, to_server):
+        self.to_server = to_server
+        self.readyState = "open"
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def send(self, data: str):
+        self.to_server.send_nowait(data)
+
+    def deliver(self, data: str):
+        self.handlers["message"](data)
+
+
+class SimulatedPeer:
+    """One browser: fake channel pair plus an MCP server task"""
+
+    def __init__(self, index: int):
+        self.peer_id = f"sim-{index}"
+        self.pc = object()  # stands in for RTCPeerConnection as a dict key
+        self.to_server, self.from_client = anyio.create_memory_object_stream(
+            100
+        )
+        self.channel = FakeChannel(self.to_server)
+        self.task = None
+
+    async def serve(self):
+        server = build_peer_server(self.peer_id)
+        in_writer, in_reader = anyio.create_memory_object_stream(100)
+        out_writer, out_reader = anyio.create_memory_object_stream(100)
+
+        async def pump_in():
+            async with in_writer:
+                async for raw in self.from_client:
+                    message = types.JSONRPCMessage.model_validate_json(raw)
+                    await in_writer.send(SessionMessage(message))
+
+        async def pump_out():
+            async with out_reader:
+                async for session_message in out_reader:
+                    msg_dict = session_message.message.model_dump(
+                        by_alias=True, mode="json", exclude_none=True
+                    )
+                    self.channel.deliver(json.dumps(msg_dict))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(pump_in)
+            tg.start_soon(pump_out)
+            await server.run(
+                in_reader, out_writer, server.create_initialization_options()
+            )
+            tg.cancel_scope.cancel()
+
+    def close(self):
+        self.to_server.close()
+        if self.task:
+            self.task.cancel()
+
+
+async def whoami_turn(session, text: str):
+    """Turn handler: one tool call, returns the tool's text"""
+    result = await session.call_tool("whoami", {"text": text})
+    return result.content[0].text
+
+
+async def run_round(manager, peers, round_no: int):
+    futures = {}
+    for peer in peers:
+        token = f"{peer.peer_id}-r{round_no}"
+        futures[peer] = (token, manager.submit_turn(peer.pc, token))
+
+    leaks = 0
+    for peer, (token, future) in futures.items():
+        answer = await future
+        if answer != f"{peer.peer_id}|{token}":
+            leaks += 1
+            logger.error("Cross-peer answer for %s: %s", peer.peer_id, answer)
+    return leaks
+
+
+async def main(
+    n_peers: int,
+    rounds: int,
+    cycles: int,
+    max_heap_growth_mb: float,
+    max_rss_growth_mb: float,
+):
+    tracemalloc.start()
+    gc.collect()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tasks_before = len(asyncio.all_tasks())
+    # Growth is measured from the end of the first cycle: it warms up
+    # imports, pydantic validators and allocator pools
+    warm_heap = warm_rss = None
+
+    for cycle in range(cycles):
+        manager = MCPConnectionManager(whoami_turn)
+        peers = [SimulatedPeer(i) for i in range(n_peers)]
+        # Peers that go away before opening their channel
+        no_channel = [object() for _ in range(max(1, n_peers // 10))]
+
+        t0 = time.perf_counter()
+        for peer in peers:
+            peer.task = asyncio.create_task(peer.serve())
+            manager.open(peer.pc).attach_channel(peer.channel)
+        for pc in no_channel:
+            manager.open(pc)
+        await asyncio.gather(*(manager.get(p.pc).ready.wait() for p in peers))
+        t_open = time.perf_counter() - t0
+
+        leaks = 0
+        round_times = []
+        for r in range(rounds):
+            t0 = time.perf_counter()
+            leaks += await run_round(manager, peers, r)
+            round_times.append(time.perf_counter() - t0)
+
+        gc.collect()
+        peak, _ = tracemalloc.get_traced_memory()
+
+        no_channel_tasks = [manager.get(pc).task for pc in no_channel]
+        t0 = time.perf_counter()
+        await manager.close_all()
+        for peer in peers:
+            peer.close()
+        await asyncio.gather(*(p.task for p in peers), return_exceptions=True)
+        t_close = time.perf_counter() - t0
+
+        del peers, no_channel
+        gc.collect()
+        await asyncio.sleep(0)
+        after, _ = tracemalloc.get_traced_memory()
+        rss = rss_bytes()
+        tasks_left = len(asyncio.all_tasks()) - tasks_before
+        if warm_heap is None:
+            warm_heap, warm_rss = after, rss
+
+        turns = n_peers * rounds
+        print(
+            f"\n=== cycle {cycle + 1}: {n_peers} peers x {rounds} rounds ==="
+        )
+        print(f"  • open + initialize:  {t_open:.2f}s")
+        print(
+            f"  • turns:              {turns} in {sum(round_times):.2f}s "
+            f"({turns / sum(round_times):.0f} turns/s)"
+        )
+        print(f"  • cross-peer leaks:   {leaks}")
+        print(f"  • active after close: {len(manager)}")
+        print(f"  • tasks after close:  {tasks_left}")
+        print(f"  • close all:          {t_close:.2f}s")
+        print(
+            f"  • memory: peak +{(peak - baseline) / 1e6:.1f} MB, "
+            f"after close +{(after - baseline) / 1e6:.2f} MB, "
+            f"since cycle 1 heap +{(after - warm_heap) / 1e6:.2f} MB, "
+            f"RSS +{(rss - warm_rss) / 1e6:.1f} MB"
+        )
+
+        assert leaks == 0, "turns were answered by another peer's session"
+        assert len(manager) == 0, "sessions left open after close_all"
+        assert tasks_left == 0, f"{tasks_left} tasks outlived close_all"
+        assert not any(
+            t.cancelled() or t.exception() for t in no_channel_tasks
+        ), "sessions closed before their channel did not end cleanly"
+        assert (after - warm_heap) / 1e6 <= max_heap_growth_mb, (
+            "heap keeps growing across cycles"
+        )
+        assert (rss - warm_rss) / 1e6 <= max_rss_growth_mb, (
+            "RSS keeps growing across cycles"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--peers", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--max-heap-growth-mb", type=float, default=1.0)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.peers,
+            args.rounds,
+            args.cycles,
+            args.max_heap_growth_mb,
+            args.max_rss_growth_mb,
+        )
+    )
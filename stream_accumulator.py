@@ -0,0 +1,108 @@
+"""
+Shared accumulator for streamed chat completion deltas
+Collects text and tool_calls from OpenAI/Groq streaming chunks into
+slot-based records, and turns them into the assistant message dict.
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+class Function:
+    """Tool call function part, same attributes as the OpenAI SDK object"""
+
+    __slots__ = ("name", "arguments")
+
+    def __init__(self, name: str = "", arguments: str = ""):
+        self.name = name
+        self.arguments = arguments
+
+
+class ToolCall:
+    """One streamed tool call, arguments are joined once on close()"""
+
+    __slots__ = ("index", "id", "type", "function", "_parts")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.id = ""
+        self.type = "function"
+        self.function = Function()
+        self._parts: List[str] = []
+
+    def add_arguments(self, fragment: str):
+        self._parts.append(fragment)
+
+    def close(self) -> "ToolCall":
+        self.function.arguments = "".join(self._parts)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "function": {
+                "name": self.function.name,
+                "arguments": self.function.arguments,
+            },
+        }
+
+
+class StreamAccumulator:
+    """Accumulates one streamed assistant turn"""
+
+    __slots__ = ("_content", "tool_calls", "finish_reason")
+
+    def __init__(self):
+        self._content: List[str] = []
+        self.tool_calls: Dict[int, ToolCall] = {}
+        self.finish_reason: Optional[str] = None
+
+    def add_content(self, text: str):
+        self._content.append(text)
+
+    def add_tool_call_delta(self, tc) -> ToolCall:
+        """Merge one delta.tool_calls entry, return its record"""
+        call = self.tool_calls.get(tc.index)
+        if call is None:
+            call = self.tool_calls[tc.index] = ToolCall(tc.index)
+        if tc.id:
+            call.id = tc.id
+        if tc.function.name:
+            call.function.name = tc.function.name
+        if tc.function.arguments:
+            call.add_arguments(tc.function.arguments)
+        return call
+
+    def add_chunk(self, chunk) -> Optional[str]:
+        """Merge a streaming chunk, return its text delta if any"""
+        choice = chunk.choices[0]
+        delta = choice.delta
+        text = delta.content
+        if text:
+            self._content.append(text)
+        # A chunk may carry text and tool calls together
+        if delta.tool_calls:
+            for tc in delta.tool_calls:
+                self.add_tool_call_delta(tc)
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        return text or None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    def tool_calls_list(self) -> List[ToolCall]:
+        """Tool calls in index order, with their arguments joined"""
+        return [self.tool_calls[i].close() for i in sorted(self.tool_calls)]
+
+    def to_message(self) -> Dict[str, Any]:
+        """Assistant message dict to append to the conversation"""
+        tool_calls = self.tool_calls_list()
+        return {
+            "role": "assistant",
+            "content": self.content or None,
+            "tool_calls": [tc.to_dict() for tc in tool_calls]
+            if tool_calls
+            else None,
+        }
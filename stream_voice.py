@@ -1,5 +1,4 @@
 import asyncio
-import openai
 from contextlib import asynccontextmanager
 import json
 from fastapi import FastAPI, Request, WebSocket
@@ -10,14 +9,19 @@ from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 import uvicorn
 import time
-
-import sounddevice as sd
+import logging
 
 import numpy as np
-from scipy.signal import resample_poly
 
 import azure.cognitiveservices.speech as speechsdk
 
+from audio_ring import AudioRing, RingPlayer
+from llm_clients import registry
+from log_setup import configure_logging, debug_enabled, log_sampled
+
+configure_logging()
+logger = logging.getLogger("voice")
+
 TARGET_SR = 48000
 
 
@@ -35,6 +39,8 @@ def float32_to_pcm16_resampled(float32_bytes, input_sr, target_sr=TARGET_SR):
 
     # If sample rates differ, resample
     if input_sr != target_sr:
+        from scipy.signal import resample_poly
+
         audio = resample_poly(audio, target_sr, input_sr)
 
     # Clip to [-1,1]
@@ -49,6 +55,8 @@ def float32_to_pcm16_resampled(float32_bytes, input_sr, target_sr=TARGET_SR):
 async def lifespan(app: FastAPI):
     # Startup code (optional)
     print("Server starting...")
+    # TLS to the LLM provider in the background, kept up when idle
+    registry.start(warm=True)
     yield
     # Shutdown code
     print("Server shutting down...")
@@ -57,6 +65,7 @@ async def lifespan(app: FastAPI):
         recognizer, push_stream = recognizers[pc]
         push_stream.close()
         recognizer.stop_continuous_recognition()
+    await registry.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -105,6 +114,7 @@ speech_syn_config.speech_synthesis_language = "fr-FR"
 speech_syn_config.set_speech_synthesis_output_format(
     speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm
 )
+TTS_SR = 16000
 speech_syn_config.speech_synthesis_voice_name = "fr-FR-DeniseNeural"
 
 
@@ -113,17 +123,21 @@ def handle_synth(start_voice_time):
 
 
 class RealTimePushCallback(speechsdk.audio.PushAudioOutputStreamCallback):
-    def __init__(self):
+    def __init__(self, sample_rate: int = TTS_SR):
         super().__init__()
-        self.audio_data = bytearray()
+        # SDK thread -> PortAudio callback thread, 10 s of audio
+        self.ring = AudioRing(10 * sample_rate)
+        self.sample_rate = sample_rate
+        self.player = None
 
     def write(self, audio_buffer: memoryview) -> int:
-        # Called as soon as a chunk of audio is ready
-        self.audio_data += audio_buffer
-        print(f"Received {audio_buffer.nbytes} bytes of audio")
-        # Here you could send audio_buffer to a speaker or data channel
-        audio_array = np.frombuffer(audio_buffer, dtype=np.int16)
-        sd.play(audio_array, 16000, blocking=False)
+        # Called as soon as a chunk of audio is ready, on an SDK thread
+        log_sampled(logger, "tts audio", "%d bytes", audio_buffer.nbytes)
+        if self.player is None:
+            # Opened on first audio, so headless servers never touch it
+            self.player = RingPlayer(self.ring, self.sample_rate).start()
+        # Blocks while the ring is full: synthesis waits for playback
+        self.ring.write(audio_buffer, block=True)
         return audio_buffer.nbytes
 
     def close(self) -> None:
@@ -146,7 +160,8 @@ connection.open(True)  # True = block until connection established
 #     speechsdk.PropertyId.SpeechSynthesis_RtfTimeoutThreshold, "10"
 # )
 
-client = openai.OpenAI()
+# Shared pool, warmed in lifespan
+client = registry.sync_client("openai")
 
 
 # -----------------------------
@@ -182,7 +197,7 @@ async def offer(request: Request):
     def on_recognizing(evt):
         text = evt.result.text
         if text:
-            print(f"[Recognizing Text] {text}")
+            log_sampled(logger, "[Recognizing Text]", "%s", text)
 
     @recognizer.recognized.connect
     def on_recognized(evt):
@@ -213,22 +228,18 @@ async def offer(request: Request):
             conversation.append({"role": "user", "content": text})
 
             try:
-                start_time = time.time()
                 stream = client.chat.completions.create(
                     model="gpt-4o-mini", messages=conversation, stream=True
                 )
 
-                print(stream)
                 buffer = ""
                 for event in stream:
                     # print(event)
-                    end_time = time.time()
-                    print("TTFT " + str(end_time - start_time), "s")
                     delta_text = event.choices[0].delta.content
                     if delta_text:
                         buffer += delta_text
                         tts_request.input_stream.write(delta_text)
-                        print("delta_text", delta_text)
+                        log_sampled(logger, "delta_text", "%r", delta_text)
                 print("[GPT END]", end="\n")
                 tts_request.input_stream.close()
 
@@ -296,16 +307,19 @@ async def offer(request: Request):
                     print(
                         f"[ERROR] Received chunk length {len(message)} is not divisible by 2 (invalid PCM16)"
                     )
-                else:
+                elif debug_enabled(logger):
                     # Optional: check first few samples
-                    import struct
-
-                    first_samples = struct.unpack(
-                        "<5h", message[:10]
-                    )  # little-endian 16-bit
-                    # print(
-                    #     f"[LOG] Checked {len(message)} bytes, first 5 samples: {first_samples}"
-                    # )
+                    log_sampled(
+                        logger,
+                        "audio chunk",
+                        "%d bytes, first samples %s",
+                        len(message),
+                        np.frombuffer(
+                            message,
+                            dtype=np.float32,
+                            count=min(5, len(message) // 4),
+                        ),
+                    )
 
                 # print(
                 #     f"[LOG] Received audio chunk: {len(message)} bytes, first 10 bytes: {list(message[:10])}"
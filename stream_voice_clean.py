@@ -1,6 +1,7 @@
 import asyncio
 from collections import deque
 import openai
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 import json
 from fastapi import FastAPI, Request, WebSocket
@@ -8,53 +9,56 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from aiortc import RTCPeerConnection, RTCSessionDescription, RTCDataChannel
 from fastapi.middleware.cors import CORSMiddleware
-import numpy as np
 import uvicorn
-import time
-
-import sounddevice as sd
-
-import numpy as np
-from scipy.signal import resample_poly
+import logging
 
 import azure.cognitiveservices.speech as speechsdk
 from azure.cognitiveservices.speech import ResultFuture
 
-TARGET_SR = 48000
-
-from groq import Groq
-
-client = Groq()
-
-
-def float32_to_pcm16_resampled(float32_bytes, input_sr, target_sr=TARGET_SR):
-    """
-    Convert raw float32 audio bytes (mono) into PCM16 at target sample rate.
-    """
-    # Interpret as float32
-    audio = np.frombuffer(float32_bytes, dtype=np.float32)
 
-    # Handle silence or NaN
-    if audio.size == 0:
-        return b""
-    audio = np.nan_to_num(audio)
 
-    # If sample rates differ, resample
-    if input_sr != target_sr:
-        audio = resample_poly(audio, target_sr, input_sr)
+from log_setup import configure_logging, log_sampled
+from audio_ingest import (
+    FRAME_PROTOCOL,
+    AudioIngest,
+    negotiate_sample_rate,
+)
+from turn_tracing import add_metrics_route, tracer
+from voice_supervisor import add_load_route
+from vad import VAD_ENABLED, VADGate, load_turn_detection
+from barge_in import BargeInDetector
+from planner import INCOMPLETE_BELOW, load_eos_model
+from transcript_accumulator import (
+    TranscriptAccumulator,
+    encode_text_out,
+)
+from llm_clients import registry
+from audio_ring import AudioRing, RingPlayer, RingWriter
+from response_cache import (
+    ResponseCache,
+    catalogue_version,
+    depends_on_history,
+    load_embedder,
+)
+from lphrase import LPhrase
 
-    # Clip to [-1,1]
-    audio = np.clip(audio, -1.0, 1.0)
+configure_logging()
+logger = logging.getLogger("voice")
 
-    # Convert to PCM16
-    pcm16 = (audio * 32767).astype(np.int16)
-    return pcm16.tobytes()
+# Shared pool, warmed in lifespan
+client = registry.sync_client("groq")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code (optional)
     print("Server starting...")
+    # TLS to the LLM provider in the background, kept up when idle
+    registry.start(warm=True)
+    # SmolLM EOS loads off the event loop, punctuation rules until then
+    eos_model.start()
+    # MiniLM too, the response cache is skipped until it is ready
+    responses.embedder.start()
     yield
     # Shutdown code
     print("Server shutting down...")
@@ -63,6 +67,7 @@ async def lifespan(app: FastAPI):
         recognizer, push_stream = recognizers[pc]
         push_stream.close()
         recognizer.stop_continuous_recognition()
+    await registry.aclose()
 
 
 import threading
@@ -104,6 +109,7 @@ def tts_worker():
 threading.Thread(target=tts_worker, daemon=True).start()
 
 app = FastAPI(lifespan=lifespan)
+add_metrics_route(app)
 
 # Allow all origins (for development)
 app.add_middleware(
@@ -117,6 +123,8 @@ app.add_middleware(
 )
 
 pcs = set()
+# Sessions and CPU, for voice_supervisor's /offer routing
+add_load_route(app, pcs)
 
 # -----------------------------
 # Azure Speech SDK Setup
@@ -129,6 +137,8 @@ BUFFER_SIZE = 16000  # 0.5 second at 16kHz, PCM16
 # per channel buffer
 chunk_buffers = {}
 input_sample_rate = 48000
+# Recognizer rate: Azure's speech models run at 16 kHz, no need for more
+STT_SR = negotiate_sample_rate("azure", input_sample_rate)
 
 rec_endpoint = "https://swedencentral.api.cognitive.microsoft.com/"
 endpoint = "wss://swedencentral.tts.speech.microsoft.com/cognitiveservices/websocket/v2"
@@ -136,7 +146,7 @@ speech_config = speechsdk.SpeechConfig(
     subscription=speech_key, endpoint=rec_endpoint
 )
 stream_format = speechsdk.audio.AudioStreamFormat(
-    samples_per_second=TARGET_SR, bits_per_sample=16, channels=1
+    samples_per_second=STT_SR, bits_per_sample=16, channels=1
 )
 
 speech_config.speech_recognition_language = "fr-FR"
@@ -153,6 +163,7 @@ speech_syn_config.speech_synthesis_language = "fr-FR"
 speech_syn_config.set_speech_synthesis_output_format(
     speechsdk.SpeechSynthesisOutputFormat.Raw48Khz16BitMonoPcm
 )
+TTS_SR = 48000
 speech_syn_config.speech_synthesis_voice_name = (
     "fr-FR-VivienneMultilingualNeural"
 )
@@ -208,78 +219,264 @@ recognizer = speechsdk.SpeechRecognizer(
 task_pool = deque([])
 result_pool = deque([])
 
+# One recognizer, one transcript: deltas go out on text-out
+SESSION = "azure"
+transcripts = TranscriptAccumulator()
+# PLANNER_AGENT's local tier: an incomplete final waits for the rest,
+# at most HOLD_SECONDS
+eos_model = load_eos_model(background=True)
+HOLD_SECONDS = 1.5
+held = {"seq": 0, "timer": None}
+transcript_lock = threading.Lock()
+# Finals are scored and answered in order, one at a time
+turn_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn")
+# Repeated queries replay the cached reply and its audio, no LLM or TTS
+responses = ResponseCache(load_embedder(background=True))
+# No tools here: the system prompt is what the answers depend on
+prompt_version = catalogue_version([conversation[0]])
+# Page on screen, from the client's {"type": "context"} updates
+client_context = {"page": ""}
+# Audio of the reply being synthesized, cached once it completed
+tts_capture = {"entry": None, "chunks": None}
+cached_ring = AudioRing(30 * TTS_SR)
+# The ring's one producer: replies longer than it are written as it plays
+cached_writer = RingWriter(cached_ring)
+cached_player = None
+# Spoken budget per turn, what is past it only goes on screen
+lphrase = LPhrase()
+
+
+def play_cached(audio: bytes):
+    global cached_player
+    if cached_player is None:
+        # Opened on first use, so headless servers never touch it
+        cached_player = RingPlayer(cached_ring, TTS_SR).start()
+    barge_in.tts_audio(audio)
+    if tracer.current is not None:
+        tracer.current.tts_audio()
+    cached_writer.write(audio)  # off the SDK thread
+
+
+@transcripts.on_delta
+def on_transcript_delta(scope, delta):
+    # encoded per channel protocol in push_text_loop
+    loop.call_soon_threadsafe(recognized_text_queue.put_nowait, delta)
+
+
+@lphrase.on_screen
+def on_reply_rest(scope, rest):
+    message = {"type": "reply_rest", "text": rest}
+    loop.call_soon_threadsafe(recognized_text_queue.put_nowait, message)
+
+
+def stop_speaking():
+    """Barge-in: cut the current TTS as soon as the user talks"""
+    stop_flag.set()
+    synthesizer.stop_speaking_async()
+    cached_writer.flush()
+    # Cut short, not worth caching
+    tts_capture["entry"] = tts_capture["chunks"] = None
+    barge_in.tts_stopped()
+    tracer.barge_in()
+
+
+if VAD_ENABLED:
+    # Silence never reaches Azure, speech start is known locally
+    vad_gate = VADGate(push_stream, STT_SR, **load_turn_detection())
+    barge_in = BargeInDetector(vad_gate, STT_SR, reference_sr=TTS_SR)
+
+    @vad_gate.on_speech_start
+    def on_local_speech_start():
+        tracer.speech_started()
+
+    @vad_gate.on_speech_end
+    def on_local_speech_end():
+        logger.debug("VAD %s", vad_gate.stats())
+
+else:
+    barge_in = BargeInDetector(push_stream, STT_SR, reference_sr=TTS_SR)
+
+    @recognizer.speech_start_detected.connect
+    def on_speech_start(evt):
+        tracer.speech_started()
+
+
+audio_ingest = AudioIngest(barge_in, input_sample_rate, STT_SR)
+
+
+@barge_in.on_pause
+def on_barge_in():
+    # Azure playback cannot be paused, so the tentative decision already
+    # cuts it; the STT partial only confirms or flags a false positive.
+    # The detector needs 120 ms of loud frames, a cough or click is less
+    print("[LOG] local barge-in, stopping current TTS")
+    stop_speaking()
+
+
+@barge_in.on_revert
+def on_barge_in_reverted():
+    logger.warning("Barge-in not confirmed by STT, reply was cut for noise")
+
+
+@synthesizer.synthesizing.connect
+def on_synthesizing(evt):
+    barge_in.tts_audio(evt.result.audio_data)
+    if tts_capture["chunks"] is not None:
+        tts_capture["chunks"].append(bytes(evt.result.audio_data))
+    if tracer.current is not None:
+        tracer.current.tts_audio()
+
+
+@synthesizer.synthesis_completed.connect
+def on_synthesis_completed(evt):
+    # Playback may still be draining, barge-in is only timed until here
+    if tracer.current is not None:
+        tracer.current.tts_stopped()
+    entry, chunks = tts_capture["entry"], tts_capture["chunks"]
+    if entry is not None and chunks:
+        responses.attach_audio(entry, b"".join(chunks), TTS_SR)
+    tts_capture["entry"] = tts_capture["chunks"] = None
+
 
 @recognizer.recognizing.connect
 def on_recognizing(evt):
     text = evt.result.text
     if text:
-        print(f"[Recognizing Text] {text}")
-        loop.call_soon_threadsafe(recognized_text_queue.put_nowait, text)
+        log_sampled(logger, "[Recognizing Text]", "%s", text)
+        with transcript_lock:
+            transcripts.partial(SESSION, text)
 
-    # print(result_queue)
-    # print(result_queue.empty())
-    # if not result_queue.empty():
-    print("[LOG] stopping current TTS")
-    stop_flag.set()
-    synthesizer.stop_speaking_async()
+    # Confirms a local barge-in, or stops TTS the detector missed
+    barge_in.on_partial(text)
 
 
 @recognizer.recognized.connect
 def on_recognized(evt):
     text = evt.result.text
-    global_start_time = time.time()
-    if text:
-        print(f"[Recognized Text] {text}")
-
-        # create request with TextStream input type
-        tts_request = speechsdk.SpeechSynthesisRequest(
-            input_type=speechsdk.SpeechSynthesisRequestInputType.TextStream
+    if not text:
+        return
+    with transcript_lock:
+        # Merged after any fragment held as incomplete, and held until
+        # scored so the next segment's partials merge after it
+        text = transcripts.final(SESSION, text).full
+        transcripts.hold(SESSION)
+        held["seq"] = seq = held["seq"] + 1
+        if held["timer"] is not None:
+            held["timer"].cancel()
+            held["timer"] = None
+    # Scoring and the LLM turn run off the SDK callback thread
+    ended = evt.result.offset + evt.result.duration
+    turn_executor.submit(on_final, text, ended, seq)
+
+
+def on_final(text: str, ended: int, seq: int):
+    if eos_model.predict([text])[0] > INCOMPLETE_BELOW:
+        answer_held(text, ended, seq)
+        return
+    print(f"[Recognized Text] incomplete, waiting: {text}")
+    with transcript_lock:
+        if held["seq"] != seq:
+            return  # the next segment already came in
+        # Nothing more said: answer what there is
+        held["timer"] = threading.Timer(
+            HOLD_SECONDS,
+            turn_executor.submit,
+            (answer_held, text, ended, seq),
         )
-        tts_task = synthesizer.speak_async(tts_request)
+        held["timer"].start()
+
+
+def answer_held(text: str, ended: int, seq: int):
+    with transcript_lock:
+        if held["seq"] != seq:
+            return  # merged into a later final
+        held["timer"] = None
+        transcripts.commit(SESSION)
+    answer(text, ended)
+
+
+def answer(text: str, ended: int):
+    turn = tracer.start_turn(audio_ingest.clock.since(ended))
+    print(f"[Recognized Text] turn {turn.turn_id}: {text}")
+
+    # "oui", "et demain ?": the answer depends on the conversation
+    last = conversation[-1]
+    last_reply = last["content"] if last["role"] == "assistant" else ""
+    cacheable = not depends_on_history(text, last_reply or "")
+    cached, how = None, "bypass"
+    if cacheable:
+        cached, how = responses.lookup(
+            text, client_context["page"], prompt_version
+        )
+    if cached is not None and cached.audio is not None:
+        print(f"[Cache {how}] {cached.reply}")
         conversation.append({"role": "user", "content": text})
+        conversation.append({"role": "assistant", "content": cached.reply})
+        play_cached(cached.audio)
+        # The audio is the spoken part only
+        rest = lphrase.split(cached.reply)[1]
+        if rest:
+            on_reply_rest(SESSION, rest)
+        return
+
+    # create request with TextStream input type
+    tts_request = speechsdk.SpeechSynthesisRequest(
+        input_type=speechsdk.SpeechSynthesisRequestInputType.TextStream
+    )
+    tts_capture["entry"], tts_capture["chunks"] = None, []
+    tts_task = synthesizer.speak_async(tts_request)
+    conversation.append({"role": "user", "content": text})
+
+    try:
+        turn.llm_started()
+        stream = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=conversation,
+            stream=True,
+            max_tokens=lphrase.max_tokens,
+        )
 
-        try:
-            start_time = time.time()
-            stream = client.chat.completions.create(
-                model="gpt-4o-mini", messages=conversation, stream=True
+        buffer = ""
+        reply = lphrase.begin(SESSION)
+        for event in stream:
+            # print(event)
+            turn.llm_token()
+            delta_text = event.choices[0].delta.content
+            if delta_text:
+                buffer += delta_text
+                spoken = reply.feed(delta_text)
+                if spoken:
+                    tts_request.input_stream.write(spoken)
+                log_sampled(logger, "delta_text", "%r", delta_text)
+        spoken = reply.finish()
+        if spoken:
+            tts_request.input_stream.write(spoken)
+        lphrase.end(SESSION)
+        turn.llm_finished()
+        print("[GPT END]", end="\n")
+
+        if buffer and cacheable:
+            tts_capture["entry"] = responses.put(
+                text,
+                buffer,
+                page=client_context["page"],
+                catalogue=prompt_version,
             )
+        task_pool.append("curr_task")
+        tts_request.input_stream.close()
 
-            flag = False
-            print(stream)
-            buffer = ""
-            for event in stream:
-                # print(event)
-                if not flag:
-                    print("Starting...")
-                    print("Time to first token: ", time.time() - start_time)
-                    flag = True
-                end_time = time.time()
-                print("TTFT " + str(end_time - start_time), "s")
-                delta_text = event.choices[0].delta.content
-                if delta_text:
-                    buffer += delta_text
-                    tts_request.input_stream.write(delta_text)
-                    print("delta_text", delta_text)
-            print("[GPT END]", end="\n")
-
-            task_pool.append("curr_task")
-            tts_request.input_stream.close()
-
-            result_queue.put(tts_task)
-
-            conversation.append({"role": "assistant", "content": buffer})
-            print(conversation)
-            # wait all tts audio bytes return
-            start_voice_time = time.time()
-            # result = tts_task.get()
-            # print("result", result)
-            print("result time ", time.time() - start_voice_time)
-            print(f"overrall taken: {time.time() - global_start_time}")
-        except Exception as e:
-            print(e)
+        result_queue.put(tts_task)
 
-        # if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        # print("Speech synthesized to speaker for text [{}]".format(text))
+        conversation.append({"role": "assistant", "content": buffer})
+        logger.debug("conversation %s", conversation)
+        # wait all tts audio bytes return
+        # result = tts_task.get()
+        # print("result", result)
+    except Exception as e:
+        print(e)
+
+    # if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+    # print("Speech synthesized to speaker for text [{}]".format(text))
 
 
 recognizer.canceled.connect(
@@ -320,43 +517,39 @@ async def offer(request: Request):
             print(f"[LOG] Data channel {channel.label} closed.")
 
         if channel.label == "audio":
+            channel.on("message", audio_ingest.handler_for(channel))
 
+        elif channel.label == "text":
+            # Page on screen, part of the response cache key
             @channel.on("message")
-            def on_message(message):
-                # Log message type and length
-                if isinstance(message, bytes):
-                    if channel not in chunk_buffers:
-                        chunk_buffers[channel] = bytearray()
-                    if len(message) % 2 != 0:
-                        print(
-                            f"[ERROR] Received chunk length {len(message)} is not divisible by 2 (invalid PCM16)"
-                        )
-                    else:
-                        # Optional: check first few samples
-                        import struct
-
-                        first_samples = struct.unpack(
-                            "<5h", message[:10]
-                        )  # little-endian 16-bit
-                        # print(
-                        #     f"[LOG] Checked {len(message)} bytes, first 5 samples: {first_samples}"
-                        # )
-
-                    # print(
-                    #     f"[LOG] Received audio chunk: {len(message)} bytes, first 10 bytes: {list(message[:10])}"
-                    # )
-                    # print("chuck", (message[:5]))
-                    # print(f"[WARN] Received bytes message: {len(message)}")
-                    pcm_bytes = float32_to_pcm16_resampled(
-                        message, input_sr=input_sample_rate
+            def on_text(message):
+                try:
+                    msg = json.loads(message)
+                except (TypeError, ValueError):
+                    return
+                if msg.get("type") == "context" and msg.get("action") == (
+                    "update"
+                ):
+                    payload = msg.get("payload") or {}
+                    client_context["page"] = str(
+                        payload.get("current_page", "")
                     )
-                    push_stream.write(pcm_bytes)
-                else:
-                    print(f"[WARN] Received non-bytes message: {message}")
+
+            def request_context():
+                channel.send(
+                    json.dumps({"type": "context", "action": "request"})
+                )
+
+            if channel.readyState == "open":
+                request_context()
+            else:
+                channel.on("open", request_context)
 
         elif channel.label == "text-out":
             # Function to push recognized text to client
             print(f"[WARN] Received LLM message: {recognized_text_queue}")
+            # TEXT_PROTOCOL clients decode deltas, others get plain text
+            protocol = getattr(channel, "protocol", "")
 
             async def push_text_loop():
                 while True:
@@ -366,7 +559,8 @@ async def offer(request: Request):
                     )
                     if text is None:  # end signal
                         break
-                    if channel.readyState == "open":
+                    text = encode_text_out(text, protocol)
+                    if text is not None and channel.readyState == "open":
                         channel.send(text)
 
             # Get the current running event loop
@@ -391,7 +585,12 @@ async def offer(request: Request):
     await pc.setLocalDescription(answer)
     print("[LOG] SDP answer created and set.")
 
-    return {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
+    return {
+        "sdp": pc.localDescription.sdp,
+        "type": pc.localDescription.type,
+        # pcm16 frame clients capture at this rate (processor.js)
+        "audio": {"protocol": FRAME_PROTOCOL, "sample_rate": STT_SR},
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+Eager tool dispatch for streamed OpenAI tool calls
+Arguments are scanned incrementally per tool-call index, and a tool is
+executed as soon as its JSON object is complete and the next index
+starts (or finish_reason arrives), instead of after the whole stream.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from stream_accumulator import StreamAccumulator, ToolCall
+
+logger = logging.getLogger("tool-stream")
+
+
+class IncrementalJSONObject:
+    """Brace/string scanner telling when a streamed JSON object is closed"""
+
+    __slots__ = ("depth", "started", "complete", "_in_string", "_escape")
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.complete = False
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, fragment: str) -> bool:
+        """Scan a new argument fragment, return True once the object closes"""
+        if self.complete:
+            return True
+
+        for ch in fragment:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}":
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    self.complete = True
+                    break
+        return self.complete
+
+
+class EagerToolDispatcher:
+    """Feeds a StreamAccumulator and starts each tool as soon as it can"""
+
+    def __init__(
+        self,
+        execute: Callable[[ToolCall], Awaitable[List[Dict]]],
+        accumulator: Optional[StreamAccumulator] = None,
+    ):
+        # execute(tool_call) -> list of tool result messages,
+        # e.g. lambda tc: process_tool_calls(session, [tc])
+        self.execute = execute
+        self.acc = accumulator or StreamAccumulator()
+        self.parsers: Dict[int, IncrementalJSONObject] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.durations: Dict[int, float] = {}
+        self.current_index: Optional[int] = None
+        self._last_task: Optional[asyncio.Task] = None
+
+    def add_chunk(self, chunk) -> Optional[str]:
+        """Merge a streaming chunk, return its text delta if any"""
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta.content:
+            self.acc.add_content(delta.content)
+        if delta.tool_calls:
+            for tc in delta.tool_calls:
+                self.feed(tc)
+        if choice.finish_reason:
+            self.acc.finish_reason = choice.finish_reason
+            self.finish()
+        return delta.content or None
+
+    def feed(self, tc):
+        """Add one delta.tool_calls entry"""
+        idx = tc.index
+        if self.current_index is not None and idx != self.current_index:
+            # A new index started: the previous call is done if it parsed
+            if self.parsers[self.current_index].complete:
+                self._dispatch(self.current_index)
+        self.current_index = idx
+
+        self.acc.add_tool_call_delta(tc)
+        parser = self.parsers.setdefault(idx, IncrementalJSONObject())
+        if tc.function.arguments:
+            parser.feed(tc.function.arguments)
+
+    def finish(self):
+        """finish_reason arrived (or the stream ended): dispatch the rest"""
+        for idx in sorted(self.acc.tool_calls):
+            self._dispatch(idx)
+
+    def _dispatch(self, idx: int):
+        if idx in self.tasks:
+            return
+        tool_call = self.acc.tool_calls[idx].close()
+        logger.debug(
+            "⚡ Dispatching tool #%d %s", idx, tool_call.function.name
+        )
+        # Chain on the previous call so tools still run in stream order
+        self.tasks[idx] = self._last_task = asyncio.create_task(
+            self._run_after(self._last_task, idx, tool_call)
+        )
+
+    async def _run_after(
+        self, previous: Optional[asyncio.Task], idx: int, tool_call
+    ):
+        if previous is not None:
+            await asyncio.wait([previous])
+        start = time.perf_counter()
+        try:
+            return await self.execute(tool_call)
+        finally:
+            self.durations[idx] = time.perf_counter() - start
+
+    async def results(self) -> List[Dict]:
+        """Tool result messages, in tool-call order"""
+        results = []
+        for idx in sorted(self.tasks):
+            results.extend(await self.tasks[idx])
+        return results
+
+    def latency_saved(self, stream_end: float, tools_done: float) -> float:
+        """Seconds saved versus running every tool after the stream ended"""
+        sequential = sum(self.durations.values())
+        return max(0.0, sequential - (tools_done - stream_end))
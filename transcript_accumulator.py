@@ -0,0 +1,198 @@
+"""
+accumulate stage (graph.py): per-session transcript state
+Azure fires `recognizing` with the whole hypothesis every time, mostly
+the previous one plus a word. Each hypothesis is diffed against the last
+one (common prefix, linear time) and only the change goes out, as a
+TranscriptDelta: keep the first `keep` characters, append `text`.
+`stable` is the length of the word-aligned prefix both hypotheses agree
+on. Repeated hypotheses produce nothing.
+A final that PLANNER_AGENT finds incomplete (_ncompl_, _int_p_) is held:
+the next segment's partials and final are merged after it, so the
+planner sees "je voudrais savoir si il fait beau" rather than two
+halves, and the client keeps the held part without resending it.
+text-out wire format, TEXT_PROTOCOL (the data channel protocol the client
+opens text-out with, index.html): one JSON value per message,
+  [keep, text] or [keep, text, 1] for a final: the client does
+  hypothesis = hypothesis.slice(0, keep) + text
+  {"type": "reply_rest", "text": ...}: reply text too long to be spoken
+Channels opened without it (older clients) get each hypothesis whole, as
+plain text, and nothing else.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+TEXT_PROTOCOL = "transcript-delta-v1"
+
+
+def common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix of a and b"""
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:  # one C comparison in the usual case, text grew
+        return n
+    i = 0
+    while a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TranscriptDelta:
+    __slots__ = ("keep", "text", "stable", "final", "full")
+
+    def __init__(
+        self, keep: int, text: str, stable: int, final: bool, full: str
+    ):
+        self.keep = keep
+        self.text = text
+        self.stable = stable
+        self.final = final
+        self.full = full  # the merged hypothesis, for local consumers
+
+    def apply(self, hypothesis: str) -> str:
+        return hypothesis[: self.keep] + self.text
+
+    def to_json(self) -> str:
+        message = (
+            [self.keep, self.text, 1] if self.final else [self.keep, self.text]
+        )
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_text_out(message, protocol: str) -> Optional[str]:
+    """A TranscriptDelta or dict message for a text-out channel speaking
+    protocol, None when that client can't show it"""
+    if protocol == TEXT_PROTOCOL:
+        if isinstance(message, TranscriptDelta):
+            return message.to_json()
+        return json.dumps(message, ensure_ascii=False)
+    if isinstance(message, TranscriptDelta):
+        return message.full
+    return None
+
+
+class TranscriptState:
+    def __init__(self):
+        self.held = ""  # incomplete finals waiting for the rest
+        self.hypothesis = ""  # held + current segment, as the client has it
+        self.closed = False  # a final went out, not held (yet)
+        self.stable = 0
+
+    def merged(self, segment: str) -> str:
+        if not self.held:
+            return segment
+        return f"{self.held} {segment}" if segment else self.held
+
+
+class TranscriptAccumulator:
+    def __init__(self):
+        self.sessions: Dict[Any, TranscriptState] = {}
+        self.delta_callbacks: List[Callable[[Any, TranscriptDelta], None]] = []
+
+        # Stats
+        self.partials = 0
+        self.duplicates = 0
+        self.finals = 0
+        self.merged_finals = 0
+        self.deltas = 0
+        self.full_bytes = 0  # sending every hypothesis whole
+        self.delta_bytes = 0  # TranscriptDelta.to_json() instead
+        self.full_chars = 0  # text downstream would re-read
+        self.delta_chars = 0
+
+    def on_delta(self, callback: Callable[[Any, TranscriptDelta], None]):
+        """callback(scope, delta)"""
+        self.delta_callbacks.append(callback)
+        return callback
+
+    def state(self, scope) -> TranscriptState:
+        state = self.sessions.get(scope)
+        if state is None:
+            state = self.sessions[scope] = TranscriptState()
+        return state
+
+    def partial(self, scope, text: str) -> Optional[TranscriptDelta]:
+        """A recognizing event, None when it changes nothing"""
+        self.partials += 1
+        return self._update(scope, text, final=False)
+
+    def final(self, scope, text: str) -> TranscriptDelta:
+        """A recognized event, delta.full is what the planner should see"""
+        self.finals += 1
+        if self.state(scope).held:
+            self.merged_finals += 1
+        return self._update(scope, text, final=True)
+
+    def hold(self, scope):
+        """The last final is incomplete: merge the next segment after it"""
+        state = self.state(scope)
+        state.held = state.hypothesis
+        state.closed = False
+
+    def commit(self, scope):
+        """The utterance was consumed, the next partial starts over"""
+        state = self.state(scope)
+        state.held = ""
+        state.closed = True
+
+    def forget(self, scope):
+        self.sessions.pop(scope, None)
+
+    def _update(self, scope, text: str, final: bool):
+        state = self.state(scope)
+        self.full_bytes += len(text.encode())
+        self.full_chars += len(text)
+        if state.closed:
+            # A final nobody held: the next segment is a new utterance
+            state.held = ""
+            state.hypothesis = ""
+            state.stable = 0
+            state.closed = False
+        full = state.merged(text)
+        previous = state.hypothesis
+        if full == previous and not final:
+            self.duplicates += 1
+            return None
+        keep = common_prefix(previous, full)
+        stable = keep
+        if keep < len(full):  # back to the last word both agree on
+            stable = full.rfind(" ", 0, keep + 1) + 1
+        delta = TranscriptDelta(keep, full[keep:], stable, final, full)
+        state.hypothesis = full
+        state.stable = stable
+        state.closed = final
+
+        self.deltas += 1
+        self.delta_bytes += len(delta.to_json().encode())
+        self.delta_chars += len(delta.text)
+        for callback in self.delta_callbacks:
+            callback(scope, delta)
+        return delta
+
+    async def handle(self, turn: Dict[str, Any], ctx=None):
+        """
+        pipeline_graph handler for accumulate: _ncompl_ and _int_p_
+        turns are held, nothing goes on until the next final
+        """
+        self.hold(ctx.scope if ctx is not None else turn.get("scope"))
+        return None
+
+    def attach(self, graph, concurrency: int = 64):
+        return graph.set_handler(
+            "accumulate", self.handle, concurrency=concurrency
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "partials": self.partials,
+            "duplicates": self.duplicates,
+            "finals": self.finals,
+            "merged_finals": self.merged_finals,
+            "deltas": self.deltas,
+            "full_bytes": self.full_bytes,
+            "delta_bytes": self.delta_bytes,
+            "byte_ratio": (
+                self.delta_bytes / self.full_bytes if self.full_bytes else 0.0
+            ),
+            "full_chars": self.full_chars,
+            "delta_chars": self.delta_chars,
+        }
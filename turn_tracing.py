@@ -0,0 +1,277 @@
+"""
+Per-turn latency tracing for the voice pipeline (STT -> LLM -> TTS -> play)
+A turn id is assigned at speech end (the recognizer's recognized event),
+and each stage marks its span once on the perf_counter monotonic clock:
+  stt_final       speech end in the audio stream -> recognized event
+  llm_ttft        LLM request -> first streamed token
+  llm_done        LLM request -> last streamed token
+  tts_first_byte  recognized -> first synthesized audio byte
+  first_audio     recognized -> first audio handed to the player
+  barge_in        user speech start -> TTS stopped
+Spans feed histograms served in Prometheus text format on /metrics.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("turn-tracing")
+
+SPANS = (
+    "stt_final",
+    "llm_connect",
+    "llm_ttft",
+    "llm_done",
+    "tts_first_byte",
+    "first_audio",
+    "barge_in",
+)
+BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024  # quantiles are computed over the last WINDOW samples
+
+# Azure offsets/durations are in 100 ns ticks
+TICKS_PER_SECOND = 10_000_000
+
+
+class SpanHistogram:
+    """Cumulative buckets plus a sliding window for p50/p95/p99"""
+
+    __slots__ = ("counts", "total", "count", "window", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.window: Deque[float] = deque(maxlen=WINDOW)
+        # Observed from the event loop and from Azure SDK threads
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+            self.window.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self.window)
+        if not samples:
+            return {}
+        return {
+            q: samples[min(len(samples) - 1, int(q * len(samples)))]
+            for q in QUANTILES
+        }
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Any quantile of the window, None before the first sample"""
+        with self._lock:
+            samples = sorted(self.window)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class AudioClock:
+    """
+    Remembers when each pushed chunk reached the recognizer, so the
+    recognized event's audio offset maps back to a monotonic time.
+    """
+
+    def __init__(self, sample_rate: int, bytes_per_sample: int = 2):
+        self.ticks_per_byte = TICKS_PER_SECOND / (
+            sample_rate * bytes_per_sample
+        )
+        self.ticks = 0.0
+        # (audio position after the chunk, perf_counter when pushed)
+        self._marks: Deque[Tuple[float, float]] = deque(maxlen=30_000)
+
+    def push(self, n_bytes: int):
+        self.ticks += n_bytes * self.ticks_per_byte
+        self._marks.append((self.ticks, time.perf_counter()))
+
+    def since(self, ticks: int) -> Optional[float]:
+        """Seconds since the audio at `ticks` was pushed, None if unknown"""
+        pushed_at = None
+        # Snapshot: push() runs on the event loop, this on an SDK thread
+        for position, at in reversed(list(self._marks)):
+            if position < ticks:
+                break
+            pushed_at = at
+        if pushed_at is None:
+            return None
+        return time.perf_counter() - pushed_at
+
+
+class Turn:
+    """One user turn, each span is recorded the first time it is marked"""
+
+    __slots__ = (
+        "turn_id",
+        "start",
+        "spans",
+        "tracer",
+        "finished",
+        "speaking",
+        "_llm_start",
+    )
+
+    def __init__(self, tracer: "TurnTracer", turn_id: int):
+        self.tracer = tracer
+        self.turn_id = turn_id
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.finished = False
+        self.speaking = False
+        self._llm_start: Optional[float] = None
+
+    def record(self, span: str, seconds: float):
+        if span in self.spans:
+            return
+        self.spans[span] = seconds
+        self.tracer.histograms[span].observe(seconds)
+
+    def mark(self, span: str, since: Optional[float] = None):
+        """Record `span` as the time elapsed since `since` (or turn start)"""
+        if span not in self.spans:
+            start = self.start if since is None else since
+            self.record(span, time.perf_counter() - start)
+
+    def llm_started(self):
+        self._llm_start = time.perf_counter()
+
+    def llm_token(self):
+        """Call on every streamed token; only the first one is a span"""
+        if "llm_ttft" not in self.spans:
+            self.mark("llm_ttft", self._llm_start)
+
+    def llm_finished(self):
+        self.mark("llm_done", self._llm_start)
+
+    def tts_audio(self):
+        """Call on every synthesized audio chunk"""
+        self.speaking = True
+        self.mark("tts_first_byte")
+
+    def tts_stopped(self):
+        self.speaking = False
+
+    def finish(self):
+        """Log the turn's spans once (also done when the next turn starts)"""
+        if self.finished:
+            return
+        self.finished = True
+        logger.info(
+            "⏱️ turn %d %s",
+            self.turn_id,
+            " ".join(
+                f"{span}={self.spans[span]:.3f}s"
+                for span in SPANS
+                if span in self.spans
+            ),
+        )
+
+
+class TurnTracer:
+    """Assigns turn ids and owns the span histograms"""
+
+    def __init__(self, histograms: Optional[Dict[str, SpanHistogram]] = None):
+        # Sessions can share one set of histograms (offline bench)
+        self.histograms: Dict[str, SpanHistogram] = histograms or {
+            span: SpanHistogram() for span in SPANS
+        }
+        self.turns_total = 0
+        self.current: Optional[Turn] = None
+        self._ids = itertools.count(1)
+        self._speech_start: Optional[float] = None
+
+    def start_turn(self, stt_final: Optional[float] = None) -> Turn:
+        """Speech ended (recognized event): open a new turn"""
+        if self.current is not None:
+            self.current.finish()
+        turn = Turn(self, next(self._ids))
+        if stt_final is not None:
+            turn.record("stt_final", stt_final)
+        self.turns_total += 1
+        self.current = turn
+        return turn
+
+    def speech_started(self):
+        """Recognizer detected the user speaking (barge-in reference)"""
+        self._speech_start = time.perf_counter()
+
+    def barge_in(self):
+        """TTS of the current turn was stopped because the user spoke"""
+        turn = self.current
+        if turn is None or self._speech_start is None or not turn.speaking:
+            return
+        turn.mark("barge_in", self._speech_start)
+        turn.tts_stopped()
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = [
+            "# HELP alma_turns_total Voice turns started",
+            "# TYPE alma_turns_total counter",
+            f"alma_turns_total {self.turns_total}",
+            "# HELP alma_turn_span_seconds Voice turn stage latency",
+            "# TYPE alma_turn_span_seconds histogram",
+        ]
+        for span, hist in self.histograms.items():
+            for bound, count in zip(BUCKETS, hist.counts):
+                lines.append(
+                    f'alma_turn_span_seconds_bucket{{span="{span}",'
+                    f'le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'alma_turn_span_seconds_bucket{{span="{span}",le="+Inf"}} '
+                f"{hist.count}"
+            )
+            lines.append(
+                f'alma_turn_span_seconds_sum{{span="{span}"}} {hist.total}'
+            )
+            lines.append(
+                f'alma_turn_span_seconds_count{{span="{span}"}} {hist.count}'
+            )
+
+        lines += [
+            "# HELP alma_turn_span_quantile_seconds Voice turn stage "
+            f"latency quantiles over the last {WINDOW} turns",
+            "# TYPE alma_turn_span_quantile_seconds summary",
+        ]
+        for span, hist in self.histograms.items():
+            for q, value in hist.quantiles().items():
+                lines.append(
+                    f'alma_turn_span_quantile_seconds{{span="{span}",'
+                    f'quantile="{q}"}} {value}'
+                )
+            lines.append(
+                f'alma_turn_span_quantile_seconds_sum{{span="{span}"}} '
+                f"{hist.total}"
+            )
+            lines.append(
+                f'alma_turn_span_quantile_seconds_count{{span="{span}"}} '
+                f"{hist.count}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+tracer = TurnTracer()
+
+
+def add_metrics_route(app, path: str = "/metrics"):
+    """Serve tracer.render() on a FastAPI app"""
+    from fastapi.responses import PlainTextResponse
+
+    async def metrics():
+        return PlainTextResponse(
+            tracer.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    app.add_api_route(path, metrics, methods=["GET"])
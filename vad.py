@@ -0,0 +1,241 @@
+"""
+Local voice activity detection in front of the recognizer push stream
+Energy (SNR over an adaptive noise floor) times a speech-band spectral
+ratio gives a per-frame score in [0, 1], compared to conf.json's
+turn_detection threshold. The floor is measured on the first
+calibration_ms (nothing can trigger meanwhile), follows non-speech
+frames, and is raised to the minimum energy of the last noise_window_ms
+of all frames (minimum statistics), so steady noise that starts loud
+enough to count as speech stops counting within that window.
+Only speech reaches PushAudioInputStream:
+  - prefix_padding_ms of audio before the trigger is sent with it
+  - silence_duration_ms of hangover keeps the gate open between words
+  - after the hangover, flush_ms of zeros lets Azure finalize the phrase
+Speech start is raised locally, before the recognizer sees anything,
+so TTS can be interrupted at once (barge-in).
+Set ALMA_LOCAL_VAD=0 to push everything like before.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, List
+
+import numpy as np
+
+logger = logging.getLogger("vad")
+
+VAD_ENABLED = os.getenv("ALMA_LOCAL_VAD", "1") != "0"
+CONF_PATH = os.path.join(os.path.dirname(__file__), "conf.json")
+
+
+def load_turn_detection(path: str = CONF_PATH) -> dict:
+    """threshold / prefix_padding_ms / silence_duration_ms from conf.json"""
+    defaults = {
+        "threshold": 0.5,
+        "prefix_padding_ms": 300,
+        "silence_duration_ms": 200,
+    }
+    try:
+        with open(path) as f:
+            conf = json.load(f)
+        turn = conf["session"]["audio"]["input"]["turn_detection"]
+    except (OSError, KeyError, ValueError):
+        return defaults
+    return {key: turn.get(key, value) for key, value in defaults.items()}
+
+
+class VADGate:
+    """
+    PushAudioInputStream-compatible writer (PCM16 mono) that forwards
+    only speech to `downstream`. write() returns the bytes forwarded.
+    """
+
+    takes_views = True  # write() copies what it keeps, memoryviews do
+
+    def __init__(
+        self,
+        downstream,
+        sample_rate: int,
+        threshold: float = 0.5,
+        prefix_padding_ms: int = 300,
+        silence_duration_ms: int = 200,
+        frame_ms: int = 20,
+        min_speech_ms: int = 40,
+        flush_ms: int = 500,
+        snr_db: float = 9.0,
+        calibration_ms: int = 200,
+        noise_window_ms: int = 1500,
+    ):
+        self.downstream = downstream
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.threshold = threshold
+        self.hangover_frames = max(1, silence_duration_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.flush = bytes(2 * sample_rate * flush_ms // 1000)
+        self.snr_db = snr_db
+
+        # Voice band bins of a frame's rfft: pitch up to the upper formants,
+        # excludes mains hum and most of broadband hiss
+        freqs = np.fft.rfftfreq(self.frame_len, 1 / sample_rate)
+        self._band = slice(
+            int(np.searchsorted(freqs, 80)),
+            int(np.searchsorted(freqs, 4000, side="right")),
+        )
+        self._window = np.hanning(self.frame_len).astype(np.float32)
+
+        self._prefix: Deque[np.ndarray] = deque(
+            maxlen=max(1, prefix_padding_ms // frame_ms)
+        )
+        self._pending = bytearray()
+        self._noise_db = -60.0
+        self.calibration_frames = max(1, calibration_ms // frame_ms)
+        # Minimum statistics: minima of sub-windows, the floor can't stay
+        # below the smallest of them
+        self._sub_frames = max(1, noise_window_ms // frame_ms // 6)
+        self._sub_min = float("inf")
+        self._sub_count = 0
+        self._minima: Deque[float] = deque(maxlen=6)
+        self._voiced_run = 0
+        self._silent_run = 0
+        self.speaking = False
+
+        self.speech_start_callbacks: List[Callable[[], None]] = []
+        self.speech_end_callbacks: List[Callable[[], None]] = []
+
+        # Stats
+        self.frames = 0
+        self.speech_frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def on_speech_start(self, callback: Callable[[], None]):
+        self.speech_start_callbacks.append(callback)
+        return callback
+
+    def on_speech_end(self, callback: Callable[[], None]):
+        self.speech_end_callbacks.append(callback)
+        return callback
+
+    def scores(self, frames: np.ndarray):
+        """(speech score in [0, 1], energy dB) for each row of int16 frames"""
+        x = frames.astype(np.float32) * (1 / 32768)
+        energy = np.einsum("ij,ij->i", x, x) / self.frame_len
+        db = 10 * np.log10(energy + 1e-10)
+        score = 1 / (1 + np.exp(-(db - self._noise_db - self.snr_db) / 3))
+
+        # The spectral factor is <= 1, only frames loud enough need the FFT
+        loud = score > self.threshold
+        if loud.any():
+            spectrum = np.fft.rfft(x[loud] * self._window, axis=1)
+            power = spectrum.real**2 + spectrum.imag**2
+            band_ratio = power[:, self._band].sum(axis=1) / (
+                power.sum(axis=1) + 1e-12
+            )
+            score[loud] *= np.minimum(1.0, band_ratio / 0.5)
+        return score, db
+
+    def write(self, pcm_bytes: bytes) -> int:
+        start = time.perf_counter()
+        self.bytes_in += len(pcm_bytes)
+        self._pending += pcm_bytes
+        frame_bytes = 2 * self.frame_len
+        n_frames = len(self._pending) // frame_bytes
+        if not n_frames:
+            self.cpu_seconds += time.perf_counter() - start
+            return 0
+
+        frames = np.frombuffer(
+            bytes(self._pending[: n_frames * frame_bytes]), dtype=np.int16
+        ).reshape(n_frames, -1)
+        del self._pending[: n_frames * frame_bytes]
+
+        out: List[bytes] = []
+        # Calibration frames first, the rest is scored on their floor
+        head = min(n_frames, max(0, self.calibration_frames - self.frames))
+        for batch in (frames[:head], frames[head:]):
+            if not len(batch):
+                continue
+            scores, energy_db = self.scores(batch)
+            for frame, score, db in zip(batch, scores, energy_db):
+                self._step(frame, score > self.threshold, float(db), out)
+
+        forwarded = 0
+        if out:
+            data = b"".join(out)
+            self.downstream.write(data)
+            forwarded = len(data)
+            self.bytes_out += forwarded
+        self.cpu_seconds += time.perf_counter() - start
+        return forwarded
+
+    def _track_minimum(self, db: float):
+        self._sub_min = min(self._sub_min, db)
+        self._sub_count += 1
+        if self._sub_count < self._sub_frames:
+            return
+        self._minima.append(self._sub_min)
+        self._sub_min = float("inf")
+        self._sub_count = 0
+        if len(self._minima) == self._minima.maxlen:
+            self._noise_db = max(self._noise_db, min(self._minima))
+
+    def _step(self, frame: np.ndarray, voiced: bool, db: float, out):
+        self.frames += 1
+        self._track_minimum(db)
+        if self.frames <= self.calibration_frames:
+            # Startup: the floor is the quietest frame so far
+            if self.frames == 1 or db < self._noise_db:
+                self._noise_db = db
+            self._prefix.append(frame)
+            return
+        if not voiced:
+            # Track the noise floor on non-speech frames: fast down, slow up
+            if db < self._noise_db:
+                self._noise_db = db
+            else:
+                self._noise_db += 0.05 * (db - self._noise_db)
+
+        if not self.speaking:
+            self._prefix.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.min_speech_frames:
+                self.speaking = True
+                self._silent_run = 0
+                self.speech_frames += len(self._prefix)
+                out.extend(f.tobytes() for f in self._prefix)
+                self._prefix.clear()
+                for callback in self.speech_start_callbacks:
+                    callback()
+            return
+
+        self.speech_frames += 1
+        out.append(frame.tobytes())
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.hangover_frames:
+            self.speaking = False
+            self._voiced_run = 0
+            out.append(self.flush)
+            for callback in self.speech_end_callbacks:
+                callback()
+
+    def close(self):
+        self.downstream.close()
+
+    @property
+    def suppressed(self) -> float:
+        """Fraction of input audio never sent to the recognizer"""
+        if not self.bytes_in:
+            return 0.0
+        speech_bytes = self.speech_frames * self.frame_len * 2
+        return 1 - speech_bytes / self.bytes_in
+
+    def stats(self) -> str:
+        return (
+            f"{self.frames} frames, {self.suppressed:.0%} suppressed, "
+            f"{self.cpu_seconds * 1e6 / max(1, self.frames):.1f} us/frame"
+        )
@@ -1,5 +1,4 @@
 import asyncio
-import openai
 from contextlib import asynccontextmanager
 import json
 from fastapi import FastAPI, Request, WebSocket
@@ -7,48 +6,33 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from aiortc import RTCPeerConnection, RTCSessionDescription, RTCDataChannel
 from fastapi.middleware.cors import CORSMiddleware
-import numpy as np
 import uvicorn
-import time
-
-import sounddevice as sd
-
-import numpy as np
-from scipy.signal import resample_poly
+import logging
 
 import azure.cognitiveservices.speech as speechsdk
 
-TARGET_SR = 48000
-
-
-def float32_to_pcm16_resampled(float32_bytes, input_sr, target_sr=TARGET_SR):
-    """
-    Convert raw float32 audio bytes (mono) into PCM16 at target sample rate.
-    """
-    # Interpret as float32
-    audio = np.frombuffer(float32_bytes, dtype=np.float32)
-
-    # Handle silence or NaN
-    if audio.size == 0:
-        return b""
-    audio = np.nan_to_num(audio)
-
-    # If sample rates differ, resample
-    if input_sr != target_sr:
-        audio = resample_poly(audio, target_sr, input_sr)
-
-    # Clip to [-1,1]
-    audio = np.clip(audio, -1.0, 1.0)
+from audio_ring import AudioRing, RingPlayer
+from llm_clients import registry
+from log_setup import configure_logging, log_sampled
+from audio_ingest import (
+    FRAME_PROTOCOL,
+    AudioIngest,
+    negotiate_sample_rate,
+)
+from turn_tracing import add_metrics_route, tracer
+from voice_supervisor import add_load_route
+from vad import VAD_ENABLED, VADGate, load_turn_detection
 
-    # Convert to PCM16
-    pcm16 = (audio * 32767).astype(np.int16)
-    return pcm16.tobytes()
+configure_logging()
+logger = logging.getLogger("voice")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code (optional)
     print("Server starting...")
+    # TLS to the LLM provider in the background, kept up when idle
+    registry.start(warm=True)
     yield
     # Shutdown code
     print("Server shutting down...")
@@ -57,9 +41,11 @@ async def lifespan(app: FastAPI):
         recognizer, push_stream = recognizers[pc]
         push_stream.close()
         recognizer.stop_continuous_recognition()
+    await registry.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
+add_metrics_route(app)
 
 # Allow all origins (for development)
 app.add_middleware(
@@ -73,6 +59,8 @@ app.add_middleware(
 )
 
 pcs = set()
+# Sessions and CPU, for voice_supervisor's /offer routing
+add_load_route(app, pcs)
 
 # -----------------------------
 # Azure Speech SDK Setup
@@ -85,13 +73,15 @@ BUFFER_SIZE = 16000  # 0.5 second at 16kHz, PCM16
 # per channel buffer
 chunk_buffers = {}
 input_sample_rate = 48000
+# Recognizer rate: Azure's speech models run at 16 kHz, no need for more
+STT_SR = negotiate_sample_rate("azure", input_sample_rate)
 
 endpoint = "https://swedencentral.api.cognitive.microsoft.com/"
 speech_config = speechsdk.SpeechConfig(
     subscription=speech_key, endpoint=endpoint
 )
 stream_format = speechsdk.audio.AudioStreamFormat(
-    samples_per_second=TARGET_SR, bits_per_sample=16, channels=1
+    samples_per_second=STT_SR, bits_per_sample=16, channels=1
 )
 
 speech_config.speech_recognition_language = "fr-FR"
@@ -103,23 +93,28 @@ speech_syn_config.speech_synthesis_language = "fr-FR"
 speech_syn_config.set_speech_synthesis_output_format(
     speechsdk.SpeechSynthesisOutputFormat.Raw48Khz16BitMonoPcm
 )
+TTS_SR = 48000
 speech_syn_config.speech_synthesis_voice_name = (
     "fr-FR-Vivienne:DragonHDLatestNeural"
 )
 
 
 class RealTimePushCallback(speechsdk.audio.PushAudioOutputStreamCallback):
-    def __init__(self):
+    def __init__(self, sample_rate: int = TTS_SR):
         super().__init__()
-        self.audio_data = bytearray()
+        # SDK thread -> PortAudio callback thread, 10 s of audio
+        self.ring = AudioRing(10 * sample_rate)
+        self.sample_rate = sample_rate
+        self.player = None
 
     def write(self, audio_buffer: memoryview) -> int:
-        # Called as soon as a chunk of audio is ready
-        self.audio_data += audio_buffer
-        print(f"Received {audio_buffer.nbytes} bytes of audio")
-        # Here you could send audio_buffer to a speaker or data channel
-        audio_array = np.frombuffer(audio_buffer, dtype=np.int16)
-        sd.play(audio_array, 16000, blocking=False)
+        # Called as soon as a chunk of audio is ready, on an SDK thread
+        log_sampled(logger, "tts audio", "%d bytes", audio_buffer.nbytes)
+        if self.player is None:
+            # Opened on first audio, so headless servers never touch it
+            self.player = RingPlayer(self.ring, self.sample_rate).start()
+        # Blocks while the ring is full: synthesis waits for playback
+        self.ring.write(audio_buffer, block=True)
         return audio_buffer.nbytes
 
     def close(self) -> None:
@@ -132,7 +127,8 @@ audio_sys_config = speechsdk.audio.AudioOutputConfig(stream=push_stream)
 # audio_sys_config = None
 
 
-client = openai.OpenAI()
+# Shared pool, warmed in lifespan
+client = registry.sync_client("openai")
 
 
 # -----------------------------
@@ -156,6 +152,12 @@ async def offer(request: Request):
         speech_config=speech_config, audio_config=audio_config
     )
     recognizers[pc] = (recognizer, push_stream)
+    if VAD_ENABLED:
+        vad_gate = VADGate(push_stream, STT_SR, **load_turn_detection())
+        vad_gate.on_speech_start(tracer.speech_started)
+        audio_ingest = AudioIngest(vad_gate, input_sample_rate, STT_SR)
+    else:
+        audio_ingest = AudioIngest(push_stream, input_sample_rate, STT_SR)
 
     # recognizer.recognizing.connect(
     #     lambda evt: print(
@@ -168,7 +170,7 @@ async def offer(request: Request):
     def on_recognizing(evt):
         text = evt.result.text
         if text:
-            print(f"[Recognizing Text] {text}")
+            log_sampled(logger, "[Recognizing Text]", "%s", text)
 
             # TTS for recognized chunk
             # synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_syn_config)
@@ -197,32 +199,35 @@ async def offer(request: Request):
         ]
 
         if text:
-            print(f"[Recognized Text] {text}")
+            turn = tracer.start_turn(
+                audio_ingest.clock.since(
+                    evt.result.offset + evt.result.duration
+                )
+            )
+            print(f"[Recognized Text] turn {turn.turn_id}: {text}")
 
             # TTS for recognized chunk
             synthesizer = speechsdk.SpeechSynthesizer(
                 speech_config=speech_syn_config
             )
             # synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_syn_config)
-            start_time = time.time()
             conversation.append({"role": "user", "content": text})
 
             try:
+                turn.llm_started()
                 stream = client.chat.completions.create(
                     model="gpt-4o-mini", messages=conversation, stream=True
                 )
 
-                print(stream)
-
                 buffer = ""
                 for event in stream:
                     # print(event)
-                    end_time = time.time()
-                    print("TTFT " + str(end_time - start_time), "s")
+                    turn.llm_token()
                     delta_text = event.choices[0].delta.content
                     if delta_text:
                         buffer += delta_text
-                    print("buffer", buffer)
+                    log_sampled(logger, "buffer", "%r", buffer)
+                turn.llm_finished()
 
                 # response = client.chat.completions.create(
                 #     model="gpt-4o-mini", messages=conversation
@@ -231,18 +236,13 @@ async def offer(request: Request):
             except Exception as e:
                 print(e)
 
-            start_voice_time = time.time()
-
-            def handle_synth(evt, start_voice_time=start_voice_time):
-                print(f"[audio] {time.time() - start_voice_time:.3f}s")
+            def handle_synth(evt, turn=turn):
+                turn.tts_audio()
 
             synthesizer.synthesizing.connect(handle_synth)
 
-            start_voice_time_ = time.time()
             result = synthesizer.speak_text_async(buffer).get()
-            print("result time ", time.time() - start_voice_time_)
-            end_time_ = time.time()
-            print("voice " + str(end_time_ - start_voice_time), "s")
+            turn.finish()
             # result = synthesizer.speak_text_async(
             #     response.choices[0].message.content
             # ).get()
@@ -287,44 +287,19 @@ async def offer(request: Request):
         def on_close():
             print(f"[LOG] Data channel {channel.label} closed.")
 
-        @channel.on("message")
-        def on_message(message):
-            # Log message type and length
-            if isinstance(message, bytes):
-                if channel not in chunk_buffers:
-                    chunk_buffers[channel] = bytearray()
-                if len(message) % 2 != 0:
-                    print(
-                        f"[ERROR] Received chunk length {len(message)} is not divisible by 2 (invalid PCM16)"
-                    )
-                else:
-                    # Optional: check first few samples
-                    import struct
-
-                    first_samples = struct.unpack(
-                        "<5h", message[:10]
-                    )  # little-endian 16-bit
-                    # print(
-                    #     f"[LOG] Checked {len(message)} bytes, first 5 samples: {first_samples}"
-                    # )
-
-                # print(
-                #     f"[LOG] Received audio chunk: {len(message)} bytes, first 10 bytes: {list(message[:10])}"
-                # )
-                # print("chuck", (message[:5]))
-                pcm_bytes = float32_to_pcm16_resampled(
-                    message, input_sr=input_sample_rate
-                )
-                push_stream.write(pcm_bytes)
-            else:
-                print(f"[WARN] Received non-bytes message: {message}")
+        channel.on("message", audio_ingest.handler_for(channel))
 
     await pc.setRemoteDescription(offer)
     answer = await pc.createAnswer()
     await pc.setLocalDescription(answer)
     print("[LOG] SDP answer created and set.")
 
-    return {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
+    return {
+        "sdp": pc.localDescription.sdp,
+        "type": pc.localDescription.type,
+        # pcm16 frame clients capture at this rate (processor.js)
+        "audio": {"protocol": FRAME_PROTOCOL, "sample_rate": STT_SR},
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+"""
+Local stand-ins for Azure STT, the LLM and the TTS, for offline benches
+Each stub mimics the API surface the voice servers use, with fixed,
+configurable latencies so runs are deterministic:
+  FakeRecognizer  energy-segmented partial/final events after a delay
+  FakeLLM         chat.completions.create(stream=True), TTFT + tokens/s
+  FakeTTS         PCM chunks at a configurable real-time factor
+  Uplink          shared server -> STT link of limited bandwidth
+"""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, List, Optional
+
+import numpy as np
+
+# Azure offsets/durations are in 100 ns ticks
+TICKS_PER_SECOND = 10_000_000
+
+TRANSCRIPTS = [
+    "va sur la page paramètres",
+    "envoie un message à Paul",
+    "active le mode éco",
+    "quelle est la météo demain",
+]
+REPLY = (
+    "Bien sûr, c'est fait. J'ai ouvert la page demandée et tout est prêt, "
+    "dis-moi si tu veux autre chose."
+)
+
+
+class Signal:
+    """speechsdk EventSignal look-alike: connect() works as a decorator"""
+
+    def __init__(self):
+        self.callbacks: List[Callable] = []
+
+    def connect(self, callback: Callable) -> Callable:
+        self.callbacks.append(callback)
+        return callback
+
+    def emit(self, evt):
+        for callback in self.callbacks:
+            callback(evt)
+
+
+def recognition_event(text: str, offset: int = 0, duration: int = 0):
+    result = SimpleNamespace(text=text, offset=offset, duration=duration)
+    return SimpleNamespace(result=result)
+
+
+class Uplink:
+    """FIFO link shared by all streams: bytes leave at `mbps`"""
+
+    def __init__(self, mbps: float):
+        self.bytes_per_second = mbps * 1e6 / 8
+        self.free_at = 0.0
+
+    def send(self, n_bytes: int, deliver: Callable, *args):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.free_at = max(now, self.free_at) + n_bytes / self.bytes_per_second
+        loop.call_at(self.free_at, deliver, *args)
+
+
+class FakePushAudioInputStream:
+    """
+    PushAudioInputStream look-alike, feeds its recognizer directly or,
+    with an `uplink`, once the bytes made it through the link
+    """
+
+    def __init__(self, uplink: Optional[Uplink] = None):
+        self.recognizer: Optional["FakeRecognizer"] = None
+        self.uplink = uplink
+        self.closed = False
+        self.bytes = 0
+
+    def write(self, pcm_bytes: bytes):
+        if self.recognizer is None or self.closed:
+            return
+        self.bytes += len(pcm_bytes)
+        if self.uplink is None:
+            self.recognizer.feed(pcm_bytes)
+        else:
+            self.uplink.send(
+                len(pcm_bytes), self.recognizer.feed, bytes(pcm_bytes)
+            )
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRecognizer:
+    """
+    SpeechRecognizer look-alike. Speech is segmented on frame RMS: speech
+    start fires at once, partials every `partial_every` seconds of speech,
+    and the final `final_delay` seconds after `silence_ms` of silence.
+    """
+
+    def __init__(
+        self,
+        push_stream: FakePushAudioInputStream,
+        sample_rate: int = 48000,
+        frame_ms: int = 20,
+        threshold: float = 0.02,
+        silence_ms: int = 200,
+        partial_every: float = 0.3,
+        partial_delay: float = 0.05,
+        final_delay: float = 0.15,
+        transcripts: List[str] = TRANSCRIPTS,
+    ):
+        push_stream.recognizer = self
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.threshold = threshold * 32767
+        self.silence_frames = silence_ms // frame_ms
+        self.partial_every_frames = max(
+            1, int(partial_every * 1000) // frame_ms
+        )
+        self.partial_delay = partial_delay
+        self.final_delay = final_delay
+        self.transcripts = itertools.cycle(transcripts)
+
+        self.recognizing = Signal()
+        self.recognized = Signal()
+        self.speech_start_detected = Signal()
+        self.canceled = Signal()
+        self.session_stopped = Signal()
+
+        self.running = False
+        self._pending = np.empty(0, dtype=np.int16)
+        self._frame_index = 0
+        self._speech_start: Optional[int] = None
+        self._silent = 0
+        self._text = ""
+
+    def start_continuous_recognition(self):
+        self.running = True
+
+    def stop_continuous_recognition(self):
+        self.running = False
+        self.session_stopped.emit(recognition_event(""))
+
+    def _ticks(self, frame: int) -> int:
+        return frame * self.frame_len * TICKS_PER_SECOND // self.sample_rate
+
+    def _later(self, delay: float, signal: Signal, evt):
+        # Azure raises events from its own threads after a service delay
+        asyncio.get_running_loop().call_later(delay, signal.emit, evt)
+
+    def feed(self, pcm_bytes: bytes):
+        if not self.running:
+            return
+        samples = np.concatenate(
+            (self._pending, np.frombuffer(pcm_bytes, dtype=np.int16))
+        )
+        n_frames = len(samples) // self.frame_len
+        self._pending = samples[n_frames * self.frame_len :]
+        if n_frames == 0:
+            return
+
+        frames = samples[: n_frames * self.frame_len].reshape(n_frames, -1)
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        for voiced in rms > self.threshold:
+            self._step(bool(voiced))
+            self._frame_index += 1
+
+    def _step(self, voiced: bool):
+        frame = self._frame_index
+        if self._speech_start is None:
+            if voiced:
+                self._speech_start = frame
+                self._silent = 0
+                self._text = next(self.transcripts)
+                self.speech_start_detected.emit(recognition_event(""))
+            return
+
+        self._silent = 0 if voiced else self._silent + 1
+        spoken = frame - self._speech_start
+        if voiced and spoken and spoken % self.partial_every_frames == 0:
+            words = self._text.split()
+            n = min(len(words), spoken // self.partial_every_frames)
+            self._later(
+                self.partial_delay,
+                self.recognizing,
+                recognition_event(" ".join(words[:n])),
+            )
+
+        if self._silent >= self.silence_frames:
+            end = frame - self._silent + 1
+            offset = self._ticks(self._speech_start)
+            self._later(
+                self.final_delay,
+                self.recognized,
+                recognition_event(
+                    self._text, offset, self._ticks(end) - offset
+                ),
+            )
+            self._speech_start = None
+
+
+def text_chunk(content: Optional[str], finish_reason: Optional[str] = None):
+    """Chunk shaped like an openai ChatCompletionChunk"""
+    delta = SimpleNamespace(content=content, tool_calls=None)
+    choice = SimpleNamespace(delta=delta, finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice])
+
+
+class FakeLLM:
+    """AsyncOpenAI look-alike: client.chat.completions.create(stream=True)"""
+
+    def __init__(self, ttft: float = 0.3, tps: float = 80.0, reply=REPLY):
+        self.ttft = ttft
+        self.tps = tps
+        # ~1 token per word piece, close enough for pacing
+        self.tokens = [word + " " for word in reply.split()]
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create)
+        )
+
+    async def create(
+        self, model=None, messages=None, stream=True, max_tokens=None, **kwargs
+    ):
+        return self._stream(max_tokens)
+
+    async def _stream(self, max_tokens: Optional[int] = None):
+        # max_tokens counts the word pieces
+        tokens = self.tokens[:max_tokens] if max_tokens else self.tokens
+        await asyncio.sleep(self.ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(1 / self.tps)
+            yield text_chunk(token)
+        yield text_chunk(None, "length" if tokens != self.tokens else "stop")
+
+
+class FakeTTS:
+    """Streams PCM16 for incoming text at `rtf` x real time"""
+
+    def __init__(
+        self,
+        sample_rate: int = 48000,
+        rtf: float = 0.2,
+        first_byte: float = 0.08,
+        chunk_ms: int = 40,
+        chars_per_second: float = 15.0,
+    ):
+        self.rtf = rtf
+        self.first_byte = first_byte
+        self.chunk_seconds = chunk_ms / 1000
+        self.chars_per_second = chars_per_second
+        self.chunk = np.zeros(
+            sample_rate * chunk_ms // 1000, dtype=np.int16
+        ).tobytes()
+
+    async def synthesize(
+        self, text_stream: AsyncIterator[str]
+    ) -> AsyncIterator[bytes]:
+        owed = 0.0  # seconds of audio not produced yet
+        first = True
+        async for text in text_stream:
+            owed += len(text) / self.chars_per_second
+            while owed >= self.chunk_seconds:
+                if first:
+                    await asyncio.sleep(self.first_byte)
+                    first = False
+                await asyncio.sleep(self.chunk_seconds * self.rtf)
+                owed -= self.chunk_seconds
+                yield self.chunk
+        if owed > 0:
+            await asyncio.sleep(owed * self.rtf)
+            yield self.chunk
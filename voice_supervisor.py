@@ -0,0 +1,300 @@
+"""
+Voice sessions over N worker processes behind one /offer endpoint
+The front process only routes signaling: each /offer is forwarded to the
+least-loaded worker (active sessions first, then CPU), which creates the
+aiortc peer itself. ICE/DTLS/SCTP, resampling, SDK callbacks and LLM
+streaming then all run in that worker, on its own GIL, and media goes
+straight to the worker's UDP ports, never through the front.
+Workers are uvicorn servers of an existing voice app on 127.0.0.1
+(base_port + i), one per core and pinned to it (Linux), restarted when
+they die. Each app reports its load with add_load_route.
+Run: python voice_supervisor.py --workers 4 --app stream_voice_clean:app
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger("voice-supervisor")
+
+# RTCPeerConnection.connectionState values that no longer cost anything
+ENDED_STATES = ("closed", "failed")
+
+
+def add_load_route(app, sessions, path: str = "/load"):
+    """
+    Serve this worker's load on a FastAPI app: active sessions among
+    `sessions` (the app's pcs set) and CPU used since the last call
+    """
+    last = [time.perf_counter(), time.process_time()]
+
+    async def load():
+        now, cpu = time.perf_counter(), time.process_time()
+        busy = (cpu - last[1]) / max(now - last[0], 1e-6)
+        last[:] = [now, cpu]
+        active = sum(
+            1
+            for pc in list(sessions)
+            if getattr(pc, "connectionState", "new") not in ENDED_STATES
+        )
+        return {"pid": os.getpid(), "sessions": active, "cpu": busy}
+
+    app.add_api_route(path, load, methods=["GET"])
+
+
+def run_worker(app_path: str, port: int, core: Optional[int]):
+    """Worker process entry point"""
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    from serve import serve
+
+    serve(app_path, host="127.0.0.1", port=port, log_level="warning")
+
+
+class Worker:
+    def __init__(self, index: int, port: int, core: Optional[int]):
+        self.index = index
+        self.port = port
+        self.core = core
+        self.url = f"http://127.0.0.1:{port}"
+        self.process: Optional[multiprocessing.Process] = None
+        self.healthy = False
+        # Last /load report, plus offers routed since (not counted yet)
+        self.sessions = 0
+        self.cpu = 0.0
+        self.pending = 0
+        self.routed = 0
+        self.restarts = 0
+
+    def load_key(self):
+        return (self.sessions + self.pending, self.cpu)
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "pid": self.process.pid if self.process else None,
+            "core": self.core,
+            "healthy": self.healthy,
+            "sessions": self.sessions,
+            "pending": self.pending,
+            "cpu": round(self.cpu, 3),
+            "routed": self.routed,
+            "restarts": self.restarts,
+        }
+
+
+class Supervisor:
+    def __init__(
+        self,
+        app_path: str,
+        workers: Optional[int] = None,
+        base_port: int = 8100,
+        cores: Optional[Sequence[int]] = None,
+        poll_interval: float = 0.5,
+        offer_timeout: float = 10.0,
+    ):
+        if cores is None:
+            cores = (
+                sorted(os.sched_getaffinity(0))
+                if hasattr(os, "sched_getaffinity")
+                else [None] * (os.cpu_count() or 1)
+            )
+        workers = workers or len(cores)
+        self.app_path = app_path
+        self.workers: List[Worker] = [
+            Worker(i, base_port + i, cores[i % len(cores)])
+            for i in range(workers)
+        ]
+        self.poll_interval = poll_interval
+        self.offer_timeout = offer_timeout
+        # Workers import the voice app themselves, nothing inherited
+        self._context = multiprocessing.get_context("spawn")
+        self._client = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def _spawn(self, worker: Worker):
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(self.app_path, worker.port, worker.core),
+            name=f"voice-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.healthy = False
+        logger.info(
+            "worker %d: pid %d on core %s, %s",
+            worker.index,
+            worker.process.pid,
+            worker.core,
+            worker.url,
+        )
+
+    async def start(self, ready_timeout: float = 60.0):
+        import httpx
+
+        self._client = httpx.AsyncClient(timeout=self.offer_timeout)
+        for worker in self.workers:
+            self._spawn(worker)
+        deadline = time.monotonic() + ready_timeout
+        while not all(w.healthy for w in self.workers):
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    "workers not ready: "
+                    + ", ".join(w.url for w in self.workers if not w.healthy)
+                )
+            await self.poll()
+            await asyncio.sleep(0.1)
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                await asyncio.to_thread(worker.process.join, 5)
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def _poll_worker(self, worker: Worker):
+        if worker.process is not None and not worker.process.is_alive():
+            logger.warning(
+                "worker %d died (exit %s), restarting",
+                worker.index,
+                worker.process.exitcode,
+            )
+            worker.restarts += 1
+            worker.sessions = worker.pending = 0
+            self._spawn(worker)
+            return
+        try:
+            response = await self._client.get(
+                worker.url + "/load", timeout=self.poll_interval * 2
+            )
+            report = response.json()
+        except Exception:
+            worker.healthy = False
+            return
+        worker.healthy = True
+        worker.sessions = report["sessions"]
+        worker.cpu = report["cpu"]
+
+    async def poll(self):
+        await asyncio.gather(*(self._poll_worker(w) for w in self.workers))
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("load poll failed")
+
+    def pick(self, exclude=()) -> Optional[Worker]:
+        candidates = [
+            w for w in self.workers if w.healthy and w not in exclude
+        ]
+        return min(candidates, key=Worker.load_key, default=None)
+
+    async def route(self, params: dict) -> dict:
+        """
+        Forward an /offer body to the least-loaded worker. A worker that
+        cannot be reached or times out is marked unhealthy and the next
+        one is tried; an HTTP error it answers with (bad offer, app
+        error) is raised as httpx.HTTPStatusError for the client.
+        """
+        import httpx
+
+        tried = []
+        while (worker := self.pick(tried)) is not None:
+            tried.append(worker)
+            # Counted right away, so a burst of offers spreads out
+            worker.pending += 1
+            try:
+                response = await self._client.post(
+                    worker.url + "/offer", json=params
+                )
+            except httpx.TransportError as e:  # connect, read, timeouts
+                logger.warning("worker %d unreachable: %r", worker.index, e)
+                worker.healthy = False
+                continue
+            finally:
+                worker.pending -= 1
+            response.raise_for_status()
+            # Until the next /load report
+            worker.sessions += 1
+            worker.routed += 1
+            return response.json()
+        raise RuntimeError("no healthy voice worker")
+
+
+def create_app(supervisor: Supervisor):
+    """Front app: signaling only"""
+    import httpx
+    from fastapi import FastAPI, HTTPException, Request, Response
+    from fastapi.middleware.cors import CORSMiddleware
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await supervisor.start()
+        yield
+        await supervisor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.post("/offer")
+    async def offer(request: Request):
+        try:
+            return await supervisor.route(await request.json())
+        except httpx.HTTPStatusError as e:
+            # The worker's own answer, e.g. 400 for a malformed offer
+            return Response(
+                e.response.content,
+                status_code=e.response.status_code,
+                media_type=e.response.headers.get("content-type"),
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    @app.get("/workers")
+    async def workers():
+        return [worker.status() for worker in supervisor.workers]
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default="stream_voice_clean:app")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="0 = one per usable core"
+    )
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--base-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    from log_setup import configure_logging
+
+    configure_logging()
+    supervisor = Supervisor(args.app, args.workers or None, args.base_port)
+    print(
+        f"[LOG] Routing /offer on http://0.0.0.0:{args.port} to"
+        f" {len(supervisor.workers)} x {args.app}"
+    )
+    uvicorn.run(create_app(supervisor), host="0.0.0.0", port=args.port)